@@ -31,5 +31,8 @@ setup(
     package_dir = {'': 'src'},
     zip_safe=False,
     setup_requires=['nose'],
-    install_requires=['restkit>=3.2']
+    install_requires=['restkit>=3.2'],
+    entry_points={
+        'console_scripts': ['sprintkit = sprintkit.cli:main']
+    }
 )
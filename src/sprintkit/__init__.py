@@ -8,10 +8,43 @@ Provides access to Sprint's Network APIs through the Sandbox Services.
 :License: MIT, see LICENSE for more details.
 """
 
-from sprintkit.services import Account
-from sprintkit.services import Config
-from sprintkit.services import GeoFence
-from sprintkit.services import Location
-from sprintkit.services import Perimeter
-from sprintkit.services import Presence
-from sprintkit.services import SMS
+import sys
+from types import ModuleType
+
+
+_lazy = {'Account': 'sprintkit.services',
+         'Config': 'sprintkit.services',
+         'FrozenConfig': 'sprintkit.services',
+         'GeoFence': 'sprintkit.services',
+         'Location': 'sprintkit.services',
+         'Perimeter': 'sprintkit.services',
+         'Presence': 'sprintkit.services',
+         'SMS': 'sprintkit.services'}
+
+
+class _Package(ModuleType):
+    """The sprintkit package, which imports the service classes (and with
+    them restkit) the first time one of them is used, so that importing a
+    module such as sprintkit.gps stays cheap."""
+
+    def __getattr__(self, name):
+        try:
+            module = _lazy[name]
+        except KeyError:
+            raise AttributeError("'module' object has no attribute '%s'" %
+                                 name)
+        value = getattr(__import__(module, fromlist=[name]), name)
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_lazy))
+
+
+_package = _Package(__name__, __doc__)
+_package.__dict__.update(sys.modules[__name__].__dict__)
+_package.__all__ = sorted(_lazy)
+# Keep the original module alive, Python 2 clears the globals of a module
+# that is garbage collected.
+_package._module = sys.modules[__name__]
+sys.modules[__name__] = _package
@@ -0,0 +1,217 @@
+"""
+sprintkit.breaker
+=================
+
+Circuit breakers that stop calling a Sandbox endpoint while it is failing.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import collections
+import threading
+import time
+
+from sprintkit import errors
+
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+FAILURE_CODES = frozenset(['SERVICE_TEMPORARILY_UNAVAILABLE',
+                           'UNEXPECTED_ERROR', 'FAILURE', 'ERROR'])
+"""The Sandbox error codes that count as a failure of the endpoint."""
+
+
+def is_failure(error):
+    """Decide if an exception means the endpoint is unhealthy.
+
+    :Returns: (bool) - True for connection errors and timeouts, HTTP 5xx
+        responses, and Sandbox errors in :data:`FAILURE_CODES`. Errors
+        caused by the request itself, such as an invalid MDN, are not
+        failures.
+    """
+    if isinstance(error, errors.ConnectionError):
+        return True
+    if isinstance(error, errors.SandboxError):
+        return error.error in FAILURE_CODES
+    if isinstance(error, errors.HttpError):
+        return error.status >= 500
+    return False
+
+
+class CircuitBreaker(object):
+    """The circuit breaker of one endpoint.
+
+    :Parameters:
+        * endpoint (string) - The endpoint, for example 'location.json'.
+        * failure_rate (float) - The fraction of failed requests that opens
+            the circuit.
+        * window (integer) - The number of recent requests considered.
+        * min_requests (integer) - The fewest requests in the window before
+            the circuit can open.
+        * reset_timeout (float) - Seconds the circuit stays open before a
+            probe request is let through.
+        * probes (integer) - The probe requests allowed at once while
+            half-open.
+
+    :Attributes:
+        * state (string) - 'closed', 'open' or 'half-open'.
+        * opened (integer) - The number of times the circuit has opened.
+        * rejected (integer) - The calls refused while it was open.
+
+    """
+
+    def __init__(self, endpoint, failure_rate=0.5, window=20, min_requests=10,
+                 reset_timeout=30, probes=1):
+        self.endpoint = endpoint
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.reset_timeout = reset_timeout
+        self.probes = probes
+        self.state = CLOSED
+        self.opened = 0
+        self.rejected = 0
+        self._results = collections.deque(maxlen=window)
+        self._opened_at = None
+        self._probing = 0
+        self._round = 0
+        self._lock = threading.Lock()
+
+    def before(self):
+        """Call before each request.
+
+        :Returns: (integer) - A token to pass to `record`, which marks the
+            request as a probe of the half-open circuit, or None for a
+            request let through while the circuit was closed.
+
+        :Raises: :class:`sprintkit.errors.CircuitOpenError` - If the circuit
+            is open, or half-open with every probe already in flight.
+        """
+        self._lock.acquire()
+        try:
+            if self.state == OPEN:
+                if time.time() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise errors.CircuitOpenError(self.endpoint,
+                                                  self.retry_after())
+                self.state = HALF_OPEN
+                self._probing = 0
+                self._round += 1
+            if self.state == HALF_OPEN:
+                if self._probing >= self.probes:
+                    self.rejected += 1
+                    raise errors.CircuitOpenError(self.endpoint, 0)
+                self._probing += 1
+                return self._round
+            return None
+        finally:
+            self._lock.release()
+
+    def record(self, error=None, token=None):
+        """Call after each request that `before` let through, with the
+        exception it raised or None and the token `before` returned.
+
+        .. note::
+            Only the probes of the current half-open round close or reopen
+            the circuit. The results of requests let through before it
+            opened, or of probes from an earlier round, arrive late and are
+            ignored while the circuit is open or half-open.
+        """
+        failed = error is not None and is_failure(error)
+        self._lock.acquire()
+        try:
+            if self.state != CLOSED:
+                if self.state == HALF_OPEN and token == self._round:
+                    self._probing -= 1
+                    if failed:
+                        self._open()
+                    else:
+                        self.state = CLOSED
+                        self._results.clear()
+                return
+            self._results.append(failed)
+            if (self.state == CLOSED and
+                len(self._results) >= self.min_requests and
+                self.failures() >= self.failure_rate):
+                self._open()
+        finally:
+            self._lock.release()
+
+    def _open(self):
+        self.state = OPEN
+        self.opened += 1
+        self._opened_at = time.time()
+        self._results.clear()
+
+    def failures(self):
+        """Returns the fraction of failed requests in the window."""
+        if not self._results:
+            return 0.0
+        return float(sum(self._results)) / len(self._results)
+
+    def retry_after(self):
+        """Returns the seconds until an open circuit lets a probe through."""
+        if self.state != OPEN:
+            return 0
+        return max(self.reset_timeout - (time.time() - self._opened_at), 0)
+
+    def snapshot(self):
+        """Returns a dict describing the breaker, for monitoring."""
+        self._lock.acquire()
+        try:
+            return {'endpoint': self.endpoint,
+                    'state': self.state,
+                    'failure_rate': self.failures(),
+                    'requests': len(self._results),
+                    'opened': self.opened,
+                    'rejected': self.rejected,
+                    'retry_after': self.retry_after()}
+        finally:
+            self._lock.release()
+
+
+class Breakers(object):
+    """A circuit breaker for each Sandbox endpoint.
+
+    :Parameters: The keyword arguments of :class:`CircuitBreaker`, used for
+        every endpoint.
+
+    .. note::
+        Pass one Breakers to each resource that should share it, for
+        example ``Location(config, breakers=breakers)``. An endpoint that
+        keeps failing is then refused at once with
+        :class:`sprintkit.errors.CircuitOpenError` instead of tying up
+        threads waiting on timeouts, while the other endpoints are not
+        affected.
+    """
+
+    def __init__(self, **options):
+        self.options = options
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, endpoint):
+        """Returns the :class:`CircuitBreaker` of `endpoint`."""
+        breaker = self._breakers.get(endpoint)
+        if breaker is None:
+            self._lock.acquire()
+            try:
+                breaker = self._breakers.get(endpoint)
+                if breaker is None:
+                    breaker = CircuitBreaker(endpoint, **self.options)
+                    self._breakers[endpoint] = breaker
+            finally:
+                self._lock.release()
+        return breaker
+
+    def states(self):
+        """Returns a dict mapping each endpoint to the state of its
+        breaker."""
+        return dict((endpoint, breaker.state)
+                    for endpoint, breaker in self._breakers.items())
+
+    def snapshot(self):
+        """Returns the :meth:`CircuitBreaker.snapshot` of every endpoint."""
+        return [breaker.snapshot() for breaker in self._breakers.values()]
@@ -0,0 +1,182 @@
+"""
+sprintkit.bulk
+==============
+
+Helpers for running a Sandbox operation over many MDNs concurrently.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import os
+import Queue
+import threading
+
+from sprintkit import deadline, errors, hooks
+
+
+_STOP = object()
+
+
+def error_code(error):
+    """Reduce an exception raised by a sprintkit api to a short error code.
+
+    :Parameters: error (:class:`sprintkit.errors.SprintkitError`)
+
+    :Returns: (string) - The Sandbox error code for a
+        :class:`sprintkit.errors.SandboxError`, otherwise the name of the
+        exception class.
+
+    """
+    if isinstance(error, errors.SprintkitError):
+        return error.code
+    return error.__class__.__name__
+
+
+class BulkSummary(object):
+    """The outcome of a bulk operation.
+
+    :Attributes:
+        * succeeded (list) - The MDNs that were processed successfully.
+        * failed (dict) - Maps each MDN that failed to its error code.
+        * skipped (list) - The MDNs skipped because the checkpoint file
+            already listed them as completed.
+        * records (dict) - Maps each MDN that failed to the
+            :class:`sprintkit.errors.ErrorRecord` of its error, when they
+            were asked for.
+
+    """
+
+    def __init__(self):
+        self.succeeded = []
+        self.failed = {}
+        self.skipped = []
+        self.records = {}
+
+    @property
+    def errors(self):
+        """(dict) - Maps each error code to the number of MDNs that failed
+        with it."""
+        counts = {}
+        for code in self.failed.values():
+            counts[code] = counts.get(code, 0) + 1
+        return counts
+
+    def __str__(self):
+        txt = "Succeeded: %i\nFailed: %i\nSkipped: %i\n" % (
+            len(self.succeeded), len(self.failed), len(self.skipped))
+        for code, count in sorted(self.errors.items()):
+            txt += "    %s: %i\n" % (code, count)
+        return txt
+
+
+def run_bulk(func, mdns, concurrency=8, progress=None, checkpoint=None,
+             records=False):
+    """Call `func` once for every MDN in `mdns` using a pool of threads.
+
+    :Parameters:
+        * func (callable) - Called as ``func(mdn)``. It signals a failure by
+            raising a :class:`sprintkit.errors.SprintkitError`.
+        * mdns (iterable) - The MDNs to process.
+        * concurrency (integer) - The number of calls kept in flight.
+        * progress (callable) - Called as ``progress(summary, mdn, error)``
+            after each MDN completes, `error` is None on success.
+        * checkpoint (string) - Path to a file of completed MDNs.
+        * records (bool) - Keep an :class:`sprintkit.errors.ErrorRecord`
+            of each failure in `summary.records`.
+
+    :Returns: (:class:`BulkSummary`) - The summary of the run.
+
+    .. note::
+        When a `checkpoint` file is given, every MDN found in it is skipped
+        and every MDN that succeeds is appended to it as soon as it
+        completes, one MDN per line. Re-running an interrupted job with the
+        same checkpoint resumes where it left off, retrying only the MDNs
+        that failed or never ran.
+
+        Exceptions other than :class:`sprintkit.errors.SprintkitError` stop
+        the run and are re-raised once the workers have finished. When run
+        inside a :class:`sprintkit.deadline.Deadline`, MDNs still waiting
+        when it passes fail with `TimeoutError`. `func` runs with the
+        caller's trace context, see :func:`sprintkit.hooks.bind`.
+
+    """
+    summary = BulkSummary()
+    completed = set()
+    if checkpoint is not None and os.path.exists(checkpoint):
+        checkpoint_file = open(checkpoint, 'r')
+        try:
+            completed = set(line.strip() for line in checkpoint_file)
+        finally:
+            checkpoint_file.close()
+    checkpoint_file = None
+    if checkpoint is not None:
+        checkpoint_file = open(checkpoint, 'a')
+    lock = threading.Lock()
+    queue = Queue.Queue(maxsize=concurrency * 2)
+    crashed = []
+    within = deadline.current()
+    context = hooks.context()
+
+    def worker():
+        while True:
+            mdn = queue.get()
+            if mdn is _STOP:
+                return
+            if crashed:
+                continue
+            try:
+                with deadline.within(within):
+                    with hooks.restore(context):
+                        deadline.check()
+                        func(mdn)
+            except errors.SprintkitError as e:
+                error = error_code(e)
+                if records:
+                    record = e.record(mdn)
+            except Exception as e:
+                crashed.append(e)
+                continue
+            else:
+                error = None
+            lock.acquire()
+            try:
+                if error is None:
+                    summary.succeeded.append(mdn)
+                    if checkpoint_file is not None:
+                        checkpoint_file.write("%s\n" % mdn)
+                        checkpoint_file.flush()
+                else:
+                    summary.failed[mdn] = error
+                    if records:
+                        summary.records[mdn] = record
+                if progress is not None:
+                    try:
+                        progress(summary, mdn, error)
+                    except Exception as e:
+                        crashed.append(e)
+            finally:
+                lock.release()
+
+    workers = [threading.Thread(target=worker) for i in range(concurrency)]
+    for thread in workers:
+        thread.daemon = True
+        thread.start()
+    try:
+        for mdn in mdns:
+            if crashed:
+                break
+            if mdn in completed:
+                summary.skipped.append(mdn)
+                continue
+            queue.put(mdn)
+    finally:
+        for thread in workers:
+            queue.put(_STOP)
+        for thread in workers:
+            thread.join()
+        if checkpoint_file is not None:
+            checkpoint_file.close()
+    if crashed:
+        raise crashed[0]
+    return summary
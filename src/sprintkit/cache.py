@@ -0,0 +1,206 @@
+"""
+sprintkit.cache
+===============
+
+A persistent cache of the Sandbox responses that list fences and devices.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import hashlib
+import sqlite3
+import threading
+import time
+import urllib
+
+
+UNCACHED_PARAMS = ('timestamp', 'sig', 'key')
+"""The request parameters left out of a cache key, they change with every
+request or are given separately as the key's `scope`."""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    scope TEXT NOT NULL,
+    endpoint TEXT NOT NULL,
+    query TEXT NOT NULL,
+    body BLOB NOT NULL,
+    digest TEXT NOT NULL,
+    stored REAL NOT NULL,
+    PRIMARY KEY (scope, endpoint, query)
+)
+"""
+
+
+def query(params):
+    """Returns the canonical query string of `params`, the part of a cache
+    key that identifies the request."""
+    return urllib.urlencode(sorted((key, value)
+                                   for key, value in params.items()
+                                   if key not in UNCACHED_PARAMS))
+
+
+class ResponseCache(object):
+    """Response bodies stored in an SQLite database, which outlives the
+    process and can be shared by several processes.
+
+    :Parameters:
+        * path (string) - The database file, created if it does not exist
+            (default=':memory:', a cache private to this instance).
+        * ttl (float) - Seconds a response is used before it is fetched
+            again.
+        * stale_if_error (float) - Seconds past the `ttl` that a response
+            is still used when the Sandbox cannot be reached.
+
+    :Attributes:
+        * hits (integer) - The lookups answered with a fresh response.
+        * misses (integer) - The lookups that found no fresh response.
+        * stale (integer) - The stale responses used because of a
+            connection error.
+        * unchanged (integer) - The refreshed responses that were the same
+            as the stored ones.
+
+    .. note::
+        Give the cache to the resources that should use it, for example
+        ``GeoFence(config, cache=ResponseCache('/var/cache/sprintkit.db'))``.
+        It is used by :meth:`sprintkit.services.GeoFence.get_fences`,
+        :meth:`sprintkit.services.Fence.get_devices`,
+        :meth:`sprintkit.services.Fence.get_recipients` and
+        :meth:`sprintkit.services.Account.get_devices`, and so by the
+        methods built on them such as `fences()`, `records()` and
+        `devices()`. The methods that add or delete fences, devices and
+        recipients (or change the status of a fence) invalidate the
+        responses they make stale. Changes made through another Sandbox
+        client are only seen once the `ttl` passes.
+
+        Only the raw response bodies of successful requests are stored, so
+        a response is decoded again on every hit. A refreshed response that
+        is the same as the stored one only has its time updated.
+    """
+
+    def __init__(self, path=':memory:', ttl=300, stale_if_error=0):
+        self.path = path
+        self.ttl = ttl
+        self.stale_if_error = stale_if_error
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.unchanged = 0
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        if path == ':memory:':
+            # Each connection to ':memory:' is a separate database, so
+            # every thread has to share one.
+            self._shared = self._connect()
+        else:
+            self._shared = None
+            self._connection()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30,
+                                     isolation_level=None,
+                                     check_same_thread=False)
+        connection.text_factory = str
+        if self.path != ':memory:':
+            connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(_SCHEMA)
+        return connection
+
+    def _connection(self):
+        if self._shared is not None:
+            return self._shared
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = self._local.connection = self._connect()
+        return connection
+
+    def _execute(self, sql, args):
+        """Returns the rows and the row count of a statement."""
+        if self._shared is None:
+            cursor = self._connection().execute(sql, args)
+            return cursor.fetchall(), cursor.rowcount
+        self._lock.acquire()
+        try:
+            cursor = self._shared.execute(sql, args)
+            return cursor.fetchall(), cursor.rowcount
+        finally:
+            self._lock.release()
+
+    def _count(self, name):
+        self._lock.acquire()
+        try:
+            setattr(self, name, getattr(self, name) + 1)
+        finally:
+            self._lock.release()
+
+    def lookup(self, scope, endpoint, params):
+        """Find the stored response to a request.
+
+        :Parameters:
+            * scope (string) - Separates the responses of Sandbox accounts,
+                the resources use their key.
+            * endpoint (string) - The endpoint, for example
+                'geofence/list.json'.
+            * params (dict) - The unsigned request parameters.
+
+        :Returns: (tuple) - The (body, age) of the response, or None if
+            none is stored.
+        """
+        rows, count = self._execute(
+            "SELECT body, stored FROM responses "
+            "WHERE scope = ? AND endpoint = ? AND query = ?",
+            (scope, endpoint, query(params)))
+        if not rows:
+            return None
+        return (str(rows[0][0]), time.time() - rows[0][1])
+
+    def fresh(self, found):
+        """Decide if a response found with `lookup` can be used, and count
+        the hit or miss."""
+        if found is not None and found[1] < self.ttl:
+            self._count('hits')
+            return True
+        self._count('misses')
+        return False
+
+    def usable(self, found):
+        """Decide if a response found with `lookup` can be used in place of
+        a request that could not reach the Sandbox."""
+        if found is not None and found[1] < self.ttl + self.stale_if_error:
+            self._count('stale')
+            return True
+        return False
+
+    def store(self, scope, endpoint, params, body):
+        """Store the response `body` of a request.
+
+        :Returns: (bool) - False if the stored response was the same.
+        """
+        args = (scope, endpoint, query(params))
+        digest = hashlib.sha1(body).hexdigest()
+        now = time.time()
+        rows, count = self._execute(
+            "UPDATE responses SET stored = ? WHERE scope = ? AND "
+            "endpoint = ? AND query = ? AND digest = ?",
+            (now,) + args + (digest,))
+        if count:
+            self._count('unchanged')
+            return False
+        self._execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, "
+                      "?, ?)", args + (sqlite3.Binary(body), digest, now))
+        return True
+
+    def invalidate(self, scope, endpoint, params=None):
+        """Forget the responses of an `endpoint`, only the one to the
+        request with `params` if they are given."""
+        if params is None:
+            self._execute("DELETE FROM responses WHERE scope = ? AND "
+                          "endpoint = ?", (scope, endpoint))
+        else:
+            self._execute("DELETE FROM responses WHERE scope = ? AND "
+                          "endpoint = ? AND query = ?",
+                          (scope, endpoint, query(params)))
+
+    def clear(self):
+        """Forget every stored response."""
+        self._execute("DELETE FROM responses", ())
@@ -0,0 +1,301 @@
+"""
+sprintkit.cli
+=============
+
+The `sprintkit` command, which runs a Sandbox service over files of MDNs.
+
+Usage::
+
+    sprintkit locate mdns.txt > fixes.jsonl
+    cat mdns.txt | sprintkit --concurrency 16 --rate 20 presence
+    sprintkit --resume done.txt --format csv perimeter --lat 38.9 \\
+        --lon -94.6 --radius 2000 mdns.txt
+    sprintkit sms --message "Hello" mdns.txt
+    sprintkit fences
+    sprintkit --record run.rec.gz locate mdns.txt
+    sprintkit --replay run.rec.gz locate mdns.txt
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+from array import array
+import argparse
+import csv
+import errno
+import fileinput
+import json
+import sys
+import threading
+import time
+
+from sprintkit import errors
+from sprintkit.bulk import run_bulk
+
+
+class Writer(object):
+    """Writes result rows as JSON lines or CSV, one thread at a time.
+
+    :Parameters:
+        * stream (file) - Where the rows are written.
+        * fields (list) - The fields of a row, in CSV column order.
+        * format (string) - 'jsonl' or 'csv'.
+    """
+
+    def __init__(self, stream, fields, format='jsonl'):
+        self.stream = stream
+        self.fields = fields
+        self.format = format
+        self._lock = threading.Lock()
+        if format == 'csv':
+            self._csv = csv.writer(stream)
+            self._csv.writerow(fields + ['error'])
+
+    def write(self, row):
+        self._lock.acquire()
+        try:
+            if self.format == 'csv':
+                self._csv.writerow([row.get(field, '')
+                                    for field in self.fields + ['error']])
+            else:
+                self.stream.write(json.dumps(row, sort_keys=True) + '\n')
+            self.stream.flush()
+        finally:
+            self._lock.release()
+
+
+def read_mdns(files):
+    """Yield the MDNs listed one per line in `files` (or stdin), skipping
+    blank lines and lines starting with '#'."""
+    for line in fileinput.input(files or ['-']):
+        mdn = line.strip()
+        if mdn and not mdn.startswith('#'):
+            yield mdn
+
+
+def percentile(values, percent):
+    """Returns the `percent` percentile of a sorted sequence."""
+    if not values:
+        return 0.0
+    index = int(round((len(values) - 1) * percent / 100.0))
+    return values[index]
+
+
+def report(summary, latencies, elapsed, stream):
+    """Print the outcome, throughput and latency of a run."""
+    done = len(summary.succeeded) + len(summary.failed)
+    stream.write(str(summary))
+    stream.write("Elapsed: %.2f s\n" % elapsed)
+    stream.write("Throughput: %.1f requests/s\n" % (done / max(elapsed, 1e-9)))
+    latencies = sorted(latencies)
+    stream.write("Latency (ms): p50 %.0f  p90 %.0f  p99 %.0f  max %.0f\n" % (
+        1000 * percentile(latencies, 50), 1000 * percentile(latencies, 90),
+        1000 * percentile(latencies, 99), 1000 * percentile(latencies, 100)))
+
+
+def locate(args, config, **options):
+    from sprintkit.services import Location
+    location = Location(config, **options)
+
+    def func(mdn):
+        data = location.get_location(mdn, timeout=args.timeout)
+        try:
+            return {'mdn': mdn, 'latitude': float(data['lat']),
+                    'longitude': float(data['lon']),
+                    'accuracy': int(data['accuracy'])}
+        except (KeyError, ValueError) as e:
+            raise errors.ParsingError(e, data)
+    return ['mdn', 'latitude', 'longitude', 'accuracy'], func
+
+
+def presence(args, config, **options):
+    from sprintkit.services import Presence
+    service = Presence(config, **options)
+
+    def func(mdn):
+        result = service.status(mdn, timeout=args.timeout)
+        return {'mdn': mdn, 'reachable': result.reachable}
+    return ['mdn', 'reachable'], func
+
+
+def perimeter(args, config, **options):
+    from sprintkit.services import Perimeter
+    service = Perimeter((args.lat, args.lon), args.radius, config, **options)
+
+    def func(mdn):
+        result = service.status(mdn, timeout=args.timeout)
+        return {'mdn': mdn, 'inside': result.inside,
+                'latitude': result.latitude, 'longitude': result.longitude,
+                'accuracy': result.accuracy}
+    return ['mdn', 'inside', 'latitude', 'longitude', 'accuracy'], func
+
+
+def sms(args, config, **options):
+    from sprintkit.services import SMS
+    service = SMS(config, **options)
+
+    def func(mdn):
+        result = service.send(mdn, args.message, timeout=args.timeout)
+        message = result.messages[0]
+        return {'mdn': mdn, 'status': message.status,
+                'tranno': message.tranno}
+    return ['mdn', 'status', 'tranno'], func
+
+
+FENCE_FIELDS = ['fenceid', 'name', 'latitude', 'longitude', 'radius', 'days',
+                'start_time', 'end_time', 'status', 'notify_event']
+
+
+def fences(args, config, writer, **options):
+    """List the geofences of the account."""
+    from sprintkit.services import GeoFence
+    geofence = GeoFence(config, **options)
+    for record in geofence.records(timeout=args.timeout):
+        writer.write(dict((field, getattr(record, field))
+                          for field in FENCE_FIELDS))
+    return 0
+
+
+COMMANDS = {'locate': locate, 'presence': presence, 'perimeter': perimeter,
+            'sms': sms}
+
+
+def make_parser():
+    parser = argparse.ArgumentParser(
+        prog='sprintkit',
+        description="Run Sprint Sandbox services over lists of MDNs.")
+    parser.add_argument('--config', help="The config file (default: "
+                        "./sprintkit.conf or ~/.sprintkit.conf).")
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help="The number of requests in flight (default: 8).")
+    parser.add_argument('--rate', type=float,
+                        help="The most requests per second.")
+    parser.add_argument('--timeout', type=float,
+                        help="Seconds allowed for each MDN.")
+    parser.add_argument('--resume', metavar='FILE',
+                        help="A checkpoint file of completed MDNs. They are "
+                        "skipped, and MDNs that succeed are added to it.")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], default='jsonl',
+                        help="The output format (default: jsonl).")
+    parser.add_argument('--output', type=argparse.FileType('w'),
+                        default=sys.stdout, help="The output file (default: "
+                        "stdout).")
+    parser.add_argument('--quiet', action='store_true',
+                        help="Do not print the summary to stderr.")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument('--record', metavar='FILE',
+                           help="Record the Sandbox responses to FILE.")
+    transport.add_argument('--replay', metavar='FILE',
+                           help="Answer the requests with the responses "
+                           "recorded in FILE, at the recorded speed, instead "
+                           "of calling the Sandbox.")
+    commands = parser.add_subparsers(dest='command')
+
+    def add(name, help):
+        command = commands.add_parser(name, help=help)
+        command.add_argument('files', nargs='*', help="Files of MDNs, one per "
+                             "line (default: stdin).")
+        return command
+
+    add('locate', "Locate each MDN.")
+    add('presence', "Check if each MDN is reachable.")
+    command = add('perimeter', "Check if each MDN is inside a perimeter.")
+    command.add_argument('--lat', type=float, required=True)
+    command.add_argument('--lon', type=float, required=True)
+    command.add_argument('--radius', type=int, required=True,
+                         help="The radius in meters.")
+    command = add('sms', "Send a text message to each MDN.")
+    command.add_argument('--message', required=True)
+    commands.add_parser('fences', help="List the geofences of the account.")
+    return parser
+
+
+def main(argv=None):
+    """Run the `sprintkit` command.
+
+    :Returns: (integer) - The exit status, 0 if every MDN succeeded, 1 if
+        some failed and 2 on a usage or configuration error.
+    """
+    args = make_parser().parse_args(argv)
+    from sprintkit.services import Config
+    try:
+        if args.config:
+            config = Config(args.config).load().freeze()
+        else:
+            config = Config.default()
+    except errors.SprintkitError as e:
+        sys.stderr.write("%s\n" % e)
+        return 2
+    options = {}
+    if args.rate:
+        from sprintkit.governor import RateLimiter
+        options['governor'] = RateLimiter(args.rate)
+    try:
+        if args.replay:
+            from sprintkit.transport import Replayer
+            options['transport'] = Replayer(args.replay)
+        elif args.record:
+            from sprintkit.transport import Recorder
+            options['transport'] = Recorder(args.record)
+    except IOError as e:
+        sys.stderr.write("%s\n" % e)
+        return 2
+    try:
+        return run(args, config, options)
+    finally:
+        if args.record:
+            options['transport'].close()
+
+
+def run(args, config, options):
+    """Run the command of `args` with resources made from `config` and the
+    resource keyword arguments `options`, see `main`."""
+    if args.command == 'fences':
+        try:
+            return fences(args, config,
+                          Writer(args.output, FENCE_FIELDS, args.format),
+                          **options)
+        except errors.SprintkitError as e:
+            sys.stderr.write("%s\n" % e)
+            return 1
+
+    fields, func = COMMANDS[args.command](args, config, **options)
+    writer = Writer(args.output, fields, args.format)
+    latencies = array('d')
+    lock = threading.Lock()
+
+    def process(mdn):
+        start = time.time()
+        try:
+            row = func(mdn)
+        finally:
+            elapsed = time.time() - start
+            lock.acquire()
+            try:
+                latencies.append(elapsed)
+            finally:
+                lock.release()
+        writer.write(row)
+
+    def progress(summary, mdn, error):
+        if error is not None:
+            writer.write({'mdn': mdn, 'error': error})
+
+    start = time.time()
+    try:
+        summary = run_bulk(process, read_mdns(args.files), args.concurrency,
+                           progress, args.resume)
+    except KeyboardInterrupt:
+        return 1
+    except IOError as e:
+        # The reader of the output went away, as with `sprintkit ... | head`.
+        if e.errno != errno.EPIPE:
+            raise
+        return 1
+    if not args.quiet:
+        report(summary, latencies, time.time() - start, sys.stderr)
+    return summary.failed and 1 or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+sprintkit.deadline
+==================
+
+Deadlines that bound the total time spent in a service call, including the
+follow-up requests it makes.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import functools
+import inspect
+import threading
+import time
+
+from sprintkit.errors import TimeoutError
+
+
+_local = threading.local()
+
+
+def _stack():
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+class Deadline(object):
+    """A point in time by which Sandbox requests must finish.
+
+    :Parameters: timeout (float) - Seconds from now.
+
+    .. note::
+        A Deadline is used as a context manager. Every Sandbox request made
+        by the thread inside the ``with`` block (and by the worker threads
+        it hands requests to) must finish before it passes, or
+        :class:`sprintkit.errors.TimeoutError` is raised::
+
+            with Deadline(2.0):
+                fence.delete_device(mdn)
+
+        Nested deadlines never extend an outer one.
+    """
+    __slots__ = ['expires']
+
+    def __init__(self, timeout):
+        self.expires = time.time() + timeout
+
+    def remaining(self):
+        """Returns the seconds left, which may be negative."""
+        return self.expires - time.time()
+
+    @property
+    def expired(self):
+        """(bool) - True once the deadline has passed."""
+        return time.time() >= self.expires
+
+    def check(self):
+        """Raise :class:`sprintkit.errors.TimeoutError` if the deadline has
+        passed."""
+        if self.expired:
+            raise TimeoutError("The deadline passed.")
+
+    def __enter__(self):
+        stack = _stack()
+        if stack and stack[-1].expires < self.expires:
+            stack.append(stack[-1])
+        else:
+            stack.append(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _stack().pop()
+        return False
+
+
+def current():
+    """Returns the :class:`Deadline` of the current thread, or None."""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        return stack[-1]
+    return None
+
+
+def remaining():
+    """Returns the seconds left before the current deadline, or None if
+    there is no deadline."""
+    deadline = current()
+    if deadline is None:
+        return None
+    return deadline.remaining()
+
+
+def check():
+    """Raise :class:`sprintkit.errors.TimeoutError` if the current deadline
+    has passed."""
+    deadline = current()
+    if deadline is not None:
+        deadline.check()
+
+
+class _Within(object):
+    """Enters an existing Deadline, or nothing if it is None."""
+    __slots__ = ['deadline']
+
+    def __init__(self, deadline):
+        self.deadline = deadline
+
+    def __enter__(self):
+        if self.deadline is not None:
+            self.deadline.__enter__()
+
+    def __exit__(self, *exc_info):
+        if self.deadline is not None:
+            self.deadline.__exit__(*exc_info)
+        return False
+
+
+def within(deadline):
+    """A context manager that enters `deadline` if it is not None, used to
+    carry a deadline over to another thread."""
+    return _Within(deadline)
+
+
+def bounded(method):
+    """Decorator adding a `timeout` keyword argument to a service method.
+
+    When `timeout` is given the method runs inside a new :class:`Deadline`.
+    For generator methods the deadline covers every item.
+    """
+    if inspect.isgeneratorfunction(method):
+        @functools.wraps(method)
+        def iterate(*args, **kwargs):
+            timeout = kwargs.pop('timeout', None)
+            items = method(*args, **kwargs)
+            if timeout is None:
+                deadline = current()
+            else:
+                deadline = Deadline(timeout)
+            while True:
+                with within(deadline):
+                    try:
+                        item = next(items)
+                    except StopIteration:
+                        return
+                yield item
+        return iterate
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        timeout = kwargs.pop('timeout', None)
+        if timeout is None:
+            return method(*args, **kwargs)
+        with Deadline(timeout):
+            return method(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,204 @@
+"""
+sprintkit.decoding
+==================
+
+JSON decoding of Sandbox responses.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import json
+
+
+_backends = {'json': json.loads}
+try:
+    import simplejson
+    _backends['simplejson'] = simplejson.loads
+except ImportError:
+    pass
+try:
+    import ujson
+    _backends['ujson'] = ujson.loads
+except ImportError:
+    pass
+
+backend = None
+"""The name of the JSON library used by :func:`loads`."""
+
+loads = None
+"""Decode a JSON document, using the backend chosen with :func:`use`."""
+
+
+def use(name=None):
+    """Choose the JSON library used to decode Sandbox responses.
+
+    :Parameters: name (string) - One of 'ujson', 'simplejson' or 'json'.
+        By default the fastest one installed is used.
+
+    :Raises: ValueError - If the library is not installed.
+
+    .. note::
+        `ujson` and `simplejson` (with its C speedups) are optional, when
+        neither is installed the standard library `json` module is used.
+    """
+    global backend, loads
+    if name is None:
+        for name in ('ujson', 'simplejson', 'json'):
+            if name in _backends:
+                break
+    if name not in _backends:
+        raise ValueError("JSON backend is not installed: %s" % name)
+    backend = name
+    loads = _backends[name]
+
+use()
+
+
+class _Scanner(object):
+    """Reads JSON tokens from a file-like object, buffering only as much of
+    it as is needed to decode the next value."""
+
+    def __init__(self, stream, chunk_size=8192):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.decoder = json.JSONDecoder()
+        self.buf = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        chunk = self.stream.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in ' \t\r\n':
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON data")
+
+    def next(self):
+        """Consume and return the next non-whitespace character."""
+        char = self.peek()
+        self.pos += 1
+        return char
+
+    def expect(self, char):
+        if self.next() != char:
+            raise ValueError("Expected '%s' at %i" % (char, self.pos - 1))
+
+    def value(self):
+        """Decode and consume the next complete JSON value."""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+            except ValueError:
+                if self.eof or not self._fill():
+                    raise
+                continue
+            # A number may continue into the next chunk, as when "1.5" is
+            # split after "1." and only "1" has been decoded.
+            if (isinstance(value, (int, long, float)) and not self.eof and
+                    _is_number_tail(self.buf, end) and self._fill()):
+                continue
+            self.pos = end
+            return value
+
+
+_NUMBER_CHARS = frozenset('0123456789.eE+-')
+
+
+def _is_number_tail(buf, end):
+    """Check if everything in `buf` after `end` could still be part of the
+    number that ends there."""
+    for char in buf[end:]:
+        if char not in _NUMBER_CHARS:
+            return False
+    return True
+
+
+def _members(scanner):
+    """Yield the keys of a JSON object, the caller must consume each value."""
+    scanner.expect('{')
+    if scanner.peek() == '}':
+        scanner.next()
+        return
+    while True:
+        key = scanner.value()
+        scanner.expect(':')
+        yield key
+        char = scanner.next()
+        if char == '}':
+            return
+        if char != ',':
+            raise ValueError("Expected ',' or '}' at %i" % (scanner.pos - 1))
+
+
+def _elements(scanner):
+    """Yield the decoded elements of a JSON array."""
+    scanner.expect('[')
+    if scanner.peek() == ']':
+        scanner.next()
+        return
+    while True:
+        yield scanner.value()
+        char = scanner.next()
+        if char == ']':
+            return
+        if char != ',':
+            raise ValueError("Expected ',' or ']' at %i" % (scanner.pos - 1))
+
+
+def iter_list(stream, name, extra):
+    """Incrementally decode the list named `name` in a JSON object.
+
+    :Parameters:
+        * stream (file) - The response body.
+        * name (string) - The field holding the list.
+        * extra (dict) - Receives the other fields of the object.
+
+    :Returns: (generator) - The items of the list, decoded one at a time.
+
+    :Raises: ValueError - If the JSON data is malformed.
+    """
+    scanner = _Scanner(stream)
+    for key in _members(scanner):
+        if key == name and scanner.peek() == '[':
+            for item in _elements(scanner):
+                yield item
+        else:
+            extra[key] = scanner.value()
+
+
+def iter_groups(stream, name, extra):
+    """Incrementally decode an object of lists named `name` in a JSON
+    object.
+
+    :Parameters:
+        * stream (file) - The response body.
+        * name (string) - The field holding the object of lists.
+        * extra (dict) - Receives the other fields of the object.
+
+    :Returns: (generator) - (group, item) pairs, where `group` is the name
+        of the list that holds `item`.
+
+    :Raises: ValueError - If the JSON data is malformed.
+    """
+    scanner = _Scanner(stream)
+    for key in _members(scanner):
+        if key == name and scanner.peek() == '{':
+            for group in _members(scanner):
+                for item in _elements(scanner):
+                    yield (group, item)
+        else:
+            extra[key] = scanner.value()
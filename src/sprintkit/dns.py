@@ -0,0 +1,69 @@
+"""
+sprintkit.dns
+=============
+
+A small in-process DNS cache shared by every Sandbox resource.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import socket
+import threading
+import time
+
+
+class DnsCache(object):
+    """Caches the results of ``socket.getaddrinfo``.
+
+    :Parameters: ttl (float) - Seconds an answer is kept.
+
+    .. note::
+        Python has no access to the TTL of DNS records, so every answer is
+        kept for the same `ttl`. An address that refuses a connection is
+        dropped with :meth:`invalidate` so the next connection resolves the
+        name again.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    def getaddrinfo(self, host, port, family=0, socktype=0, proto=0,
+                    flags=0):
+        """Like ``socket.getaddrinfo``, but answered from the cache while
+        the answer is fresh."""
+        key = (host, port, family, socktype, proto, flags)
+        now = time.time()
+        self._lock.acquire()
+        try:
+            answer = self._answers.get(key)
+        finally:
+            self._lock.release()
+        if answer is not None and answer[0] > now:
+            return answer[1]
+        addresses = socket.getaddrinfo(host, port, family, socktype, proto,
+                                       flags)
+        self._lock.acquire()
+        try:
+            self._answers[key] = (now + self.ttl, addresses)
+        finally:
+            self._lock.release()
+        return addresses
+
+    def invalidate(self, host=None):
+        """Forget the answers for `host`, or every answer."""
+        self._lock.acquire()
+        try:
+            if host is None:
+                self._answers.clear()
+            else:
+                for key in [key for key in self._answers if key[0] == host]:
+                    del self._answers[key]
+        finally:
+            self._lock.release()
+
+
+cache = DnsCache()
+"""The :class:`DnsCache` shared by every resource."""
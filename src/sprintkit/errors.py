@@ -8,13 +8,118 @@ Exceptions used in sprintkit.
 :License: MIT, see LICENSE for more details.
 """
 
+import collections
+
+
+ErrorRecord = collections.namedtuple(
+    'ErrorRecord', 'code message endpoint mdn elapsed attempt')
+"""A compact, immutable copy of the diagnostics of an exception, see
+:meth:`SprintkitError.record`."""
+
+
 class SprintkitError(Exception):
-    """Base Exception for errors raised by sprintkit apis"""
+    """Base Exception for errors raised by sprintkit apis
+
+    :Attributes:
+        * endpoint (string) - The endpoint of the failed request.
+        * mdn (string) - The MDN the request was about.
+        * elapsed (float) - Seconds the request took before it failed.
+        * attempt (integer) - 1 for the first request, 2 for a hedged
+            request.
+
+    The attributes are None when the error was not raised by a request.
+
+    .. note::
+        The attributes are kept in slots rather than in the instance
+        dict, which Exception creates only when it is used. Errors pickle
+        with their attributes, so they can be passed between processes.
+    """
+    __slots__ = ['endpoint', 'mdn', 'elapsed', 'attempt']
+
+    def __init__(self, *args):
+        Exception.__init__(self, *args)
+        self.endpoint = None
+        self.mdn = None
+        self.elapsed = None
+        self.attempt = None
+
+    def __reduce__(self):
+        # Exception only pickles its args and dict, not the slots.
+        state = {}
+        for cls in self.__class__.__mro__:
+            for name in getattr(cls, '__slots__', ()):
+                state[name] = getattr(self, name, None)
+        return (self.__class__, self.args, state)
+
+    @property
+    def code(self):
+        """(string) - A short code for the error, the name of its class."""
+        return self.__class__.__name__
+
+    def record(self, mdn=None):
+        """Returns an :class:`ErrorRecord` of this error, which keeps its
+        diagnostics without the exception.
+
+        :Parameters: mdn (string) - The MDN to record if the error does not
+            know it.
+        """
+        return ErrorRecord(self.code, str(self), self.endpoint,
+                           self.mdn or mdn, self.elapsed, self.attempt)
 
 
 class ConnectionError(SprintkitError):
     """Exception raised when there was a problem opening a connection to the
     Sandbox."""
+    __slots__ = []
+
+
+class TimeoutError(ConnectionError):
+    """Exception raised when a Sandbox request did not finish in time."""
+    __slots__ = []
+
+
+class CircuitOpenError(ConnectionError):
+    """Exception raised without calling the Sandbox, because the circuit
+    breaker of the endpoint is open.
+
+    :Parameters:
+        * endpoint (string) - The endpoint that was refused.
+        * retry_after (float) - Seconds until a probe request is allowed.
+    """
+    __slots__ = ['retry_after']
+
+    def __init__(self, endpoint, retry_after):
+        ConnectionError.__init__(self, endpoint, retry_after)
+        self.endpoint = endpoint
+        self.retry_after = retry_after
+
+    def __str__(self):
+        return "The circuit for %s is open, retry in %.1f seconds." % (
+            self.endpoint, self.retry_after)
+
+
+class HttpError(SprintkitError):
+    """Exception raised when the Sandbox answers a request with an HTTP
+    error status.
+
+    :Parameters:
+        * status (integer) - The HTTP status, 400 or more.
+        * body (string) - The body of the response.
+    """
+    __slots__ = ['status']
+
+    def __init__(self, status, body=None):
+        SprintkitError.__init__(self, status, body)
+        self.status = status
+
+    @property
+    def code(self):
+        """(string) - 'HTTP_' followed by the status, for example
+        'HTTP_503'."""
+        return 'HTTP_%d' % self.status
+
+    def __str__(self):
+        return "The Sandbox answered with HTTP status %d." % self.status
 
 
 class ParsingError(SprintkitError):
@@ -24,7 +129,10 @@ class ParsingError(SprintkitError):
     which case the SprintKit method that threw the exception needs
     updated. You should really never see this one, if so please report
     it as a bug."""
-    def __init__(self, error, data):
+    __slots__ = ['error', 'data']
+
+    def __init__(self, error, data=None):
+        SprintkitError.__init__(self, error, data)
         self.error = error
         self.data = data
 
@@ -38,47 +146,59 @@ class SandboxError(SprintkitError):
     
     :Paramters:
         * error (string) - The error string returned from Sandbox.
-        * response (:class:`sprintkit.services.SandboxResponse`) - A Sandbox Response object.
     """
-
-    def __init__(self, error):
-        self.error_text = { 
-            'INVALID_KEY': "Invalid Sandbox key.",
-            'EXPIRED_KEY': "Expired Sandbox Key.",
-            'MDN_NOTVALID': "You are not authorized to use this MDN.",
-            'MDN_NOTOPTEDIN': "You are not authorized to use this MDN.",
-            'INVALID_MDN': "This is not a valid 10 digit MDN.",
-            'INVALID_SIGNATURE': "Invalid signature, perhaps your secret is wrong?",
-            'FAILURE': "Generic Sandbox failure.",
-            'ERROR': "Generic Sandbox error.",
-            'EXHAUSTED_DIPS': "You have exhausted your Sandbox usage limits.",
-            'SERVICE_TEMPORARILY_UNAVAILABLE': "Oops, that Sandbox service is \
+    __slots__ = ['error']
+
+    error_text = {
+        'INVALID_KEY': "Invalid Sandbox key.",
+        'EXPIRED_KEY': "Expired Sandbox Key.",
+        'MDN_NOTVALID': "You are not authorized to use this MDN.",
+        'MDN_NOTOPTEDIN': "You are not authorized to use this MDN.",
+        'INVALID_MDN': "This is not a valid 10 digit MDN.",
+        'INVALID_SIGNATURE': "Invalid signature, perhaps your secret is wrong?",
+        'FAILURE': "Generic Sandbox failure.",
+        'ERROR': "Generic Sandbox error.",
+        'EXHAUSTED_DIPS': "You have exhausted your Sandbox usage limits.",
+        'SERVICE_TEMPORARILY_UNAVAILABLE': "Oops, that Sandbox service is \
 down at the moment.",
-            'RADIUS_LESS_THAN_MIN_RADIUS': "The requested radius is less than \
+        'RADIUS_LESS_THAN_MIN_RADIUS': "The requested radius is less than \
 the minimum radius allowed, 2000m",
-            'UNEXPECTED_ERROR': "The Sandbox encountered an unexpected error.",
-            "DEVICE_NOT_FOUND": "Could not find the MDN."}
+        'UNEXPECTED_ERROR': "The Sandbox encountered an unexpected error.",
+        "DEVICE_NOT_FOUND": "Could not find the MDN."}
+    """Maps each Sandbox error code to its message, shared by every
+    instance."""
+
+    def __init__(self, error):
+        SprintkitError.__init__(self, error)
         self.error = error.upper()
         """The error returned from the sandbox."""
-        self.msg = self.error_text.get(self.error, 
-                                       "Unknown Sandbox Error: %s" % self.error)
+
+    @property
+    def code(self):
+        """(string) - The Sandbox error code."""
+        return self.error
+
+    @property
+    def msg(self):
+        """(string) - The message for the error code."""
+        return self.error_text.get(self.error,
+                                   "Unknown Sandbox Error: %s" % self.error)
 
     def __str__(self):
         return self.msg
 
 
 class GeoFenceError(SandboxError):
-    """"""
-    def __init__(self, error):
-        text = super(GeoFenceError, self).__init__(error)
-        self.error_text.update({ 
-            'UNKNOWN_RECIPIENT': "This recipient is not in the list of \
-recipients associated with this fence.",
-            'FENCE_NOTADDED': "Fence was not added by the Sandbox.",
-            'DEVICE_NOTFOUND': "This GeoFence device does not exist.",
-            'FENCE_NOTFOUND': "Could not find a fence with this Fence ID.",
-            'INVALID_FENCE_ID': "This is not a valid Fence ID.",
-            'FENCE_NOTACTIVATED': 'Could not activate this fence.',
-
-            'DEVICE_NOTDELETED': "Error deleting this GeoFence device."})
+    """Exception for errors returned by the Sandbox geofence services."""
+    __slots__ = []
 
+    error_text = dict(SandboxError.error_text)
+    error_text.update({
+        'UNKNOWN_RECIPIENT': "This recipient is not in the list of \
+recipients associated with this fence.",
+        'FENCE_NOTADDED': "Fence was not added by the Sandbox.",
+        'DEVICE_NOTFOUND': "This GeoFence device does not exist.",
+        'FENCE_NOTFOUND': "Could not find a fence with this Fence ID.",
+        'INVALID_FENCE_ID': "This is not a valid Fence ID.",
+        'FENCE_NOTACTIVATED': 'Could not activate this fence.',
+        'DEVICE_NOTDELETED': "Error deleting this GeoFence device."})
@@ -0,0 +1,299 @@
+"""
+sprintkit.events
+================
+
+Receives the geofence notifications the Sandbox posts to recipient URLs
+(see :meth:`sprintkit.services.Fence.add_recipient`) and dispatches them to
+subscribers.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import json
+import logging
+import Queue
+import threading
+import time
+import urlparse
+from SocketServer import ThreadingMixIn
+from wsgiref.simple_server import WSGIServer, make_server
+
+from sprintkit import errors
+
+
+_STOP = object()
+
+log = logging.getLogger(__name__)
+
+
+class FenceEvent(object):
+    """A single geofence notification.
+
+    :Attributes:
+        * fenceid (integer) - The id of the fence that triggered the event.
+        * mdn (string) - The MDN of the device that crossed the fence.
+        * event (string) - Either 'in' or 'out'.
+        * timestamp (string) - The event time as sent by the Sandbox.
+        * fence - The matching fence, a
+            :class:`sprintkit.results.FenceRecord` from the
+            :class:`FenceCatalog` (or the :class:`sprintkit.services.Fence`
+            for events from :class:`sprintkit.monitor.Monitor`), or None if
+            it could not be found.
+
+    """
+    __slots__ = ['fenceid', 'mdn', 'event', 'timestamp', 'fence']
+
+    def __init__(self, fenceid, mdn, event, timestamp=None, fence=None):
+        self.fenceid = fenceid
+        self.mdn = mdn
+        self.event = event
+        self.timestamp = timestamp
+        self.fence = fence
+
+    def __repr__(self):
+        return "FenceEvent(%i, %s, %s)" % (self.fenceid, self.mdn, self.event)
+
+
+def parse_events(body, content_type=''):
+    """Parse the body of a Sandbox geofence notification.
+
+    :Parameters:
+        * body (string) - The raw request body.
+        * content_type (string) - The request Content-Type header.
+
+    :Returns: (list) - A list of :class:`FenceEvent`.
+
+    :Raises: :class:`sprintkit.errors.ParsingError`
+
+    .. note::
+        The body is either JSON (a single notification or a list of them)
+        or a url encoded form. Field names are matched without regard to
+        case, so `fenceId`, `FenceID` and `fenceid` are all accepted.
+
+    """
+    try:
+        if 'json' in content_type or body.lstrip()[:1] in ('{', '['):
+            data = json.loads(body)
+        else:
+            data = dict(urlparse.parse_qsl(body))
+    except ValueError:
+        raise errors.ParsingError("Malformed notification", body)
+    if not isinstance(data, list):
+        data = [data]
+    events = []
+    for item in data:
+        try:
+            fields = dict((key.lower(), val) for key, val in item.items())
+            events.append(FenceEvent(int(fields['fenceid']),
+                                     str(fields['mdn']),
+                                     str(fields['event']).lower(),
+                                     fields.get('timestamp')))
+        except (AttributeError, KeyError, ValueError) as e:
+            raise errors.ParsingError("Bad notification field %s" % e, item)
+    return events
+
+
+class FenceCatalog(object):
+    """A cache of the account's fences used to correlate events.
+
+    :Parameters:
+        * geofence (:class:`sprintkit.services.GeoFence`) - Used to load
+            the fences.
+        * ttl (integer) - Seconds before the catalog is reloaded.
+        * retry (integer) - Seconds before a failed reload is tried again.
+
+    .. note::
+        The catalog holds the :class:`sprintkit.results.FenceRecord` of
+        each fence, as listed by :meth:`sprintkit.services.GeoFence.records`.
+        It is reloaded on the first lookup after it is `ttl` seconds old,
+        by the thread making that lookup, while lookups on other threads
+        keep using the last catalog. When the Sandbox cannot be reached
+        the last catalog is kept, and the reload is not tried again for
+        `retry` seconds, so an outage does not hold up every event.
+
+        Looking up a fence id that is not in the catalog returns None
+        rather than forcing a reload, so a burst of events for a deleted
+        fence does not turn into a burst of Sandbox requests.
+
+    """
+
+    def __init__(self, geofence, ttl=300, retry=30):
+        self.geofence = geofence
+        self.ttl = ttl
+        self.retry = retry
+        self._fences = {}
+        self._loaded = None
+        self._due = 0
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        """Reload the fences from the Sandbox."""
+        # Should the reload fail, it is tried again after `retry` seconds.
+        self._due = time.time() + self.retry
+        fences = dict((record.fenceid, record)
+                      for record in self.geofence.records())
+        self._fences = fences
+        self._loaded = time.time()
+        self._due = self._loaded + self.ttl
+
+    def _update(self):
+        # Wait for the first load, later ones are left to a single thread.
+        if not self._lock.acquire(self._loaded is None):
+            return
+        try:
+            if time.time() < self._due:
+                return
+            try:
+                self.refresh()
+            except errors.SprintkitError:
+                if self._loaded is None:
+                    raise
+                log.warning("Could not reload the fence catalog, using the "
+                            "one loaded %.0f seconds ago",
+                            time.time() - self._loaded, exc_info=True)
+        finally:
+            self._lock.release()
+
+    def get(self, fenceid):
+        """Return the :class:`sprintkit.results.FenceRecord` with
+        `fenceid`, or None if there is none."""
+        if time.time() >= self._due:
+            self._update()
+        return self._fences.get(fenceid)
+
+
+class Dispatcher(object):
+    """Delivers events to subscribers in batches from a bounded queue.
+
+    :Parameters:
+        * maxsize (integer) - The most events held in the queue.
+        * batch_size (integer) - The most events delivered in one batch.
+        * batch_wait (float) - Seconds to wait for a batch to fill up.
+
+    .. note::
+        :meth:`publish` blocks while the queue is full, which pushes back on
+        the HTTP server instead of dropping events. Subscribers are called
+        from a single dispatch thread as ``callback(events)`` with a list
+        of :class:`FenceEvent`. An exception raised by a subscriber is
+        logged, and the batch is still delivered to the other subscribers.
+
+    """
+
+    def __init__(self, maxsize=10000, batch_size=500, batch_wait=0.05):
+        self.queue = Queue.Queue(maxsize)
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.subscribers = []
+        self._thread = None
+
+    def subscribe(self, callback):
+        """Register `callback` to receive batches of events."""
+        self.subscribers.append(callback)
+
+    def publish(self, event, timeout=None):
+        """Queue an event for delivery, blocking while the queue is full.
+
+        :Raises: :class:`Queue.Full` if `timeout` passes first.
+        """
+        self.queue.put(event, True, timeout)
+
+    def start(self):
+        """Start the dispatch thread."""
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Deliver the events already queued and stop the dispatch thread."""
+        self.queue.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.time() + self.batch_wait
+            while batch[-1] is not _STOP and len(batch) < self.batch_size:
+                remaining = deadline - time.time()
+                try:
+                    if remaining > 0:
+                        batch.append(self.queue.get(True, remaining))
+                    else:
+                        batch.append(self.queue.get_nowait())
+                except Queue.Empty:
+                    break
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            if batch:
+                for callback in self.subscribers:
+                    try:
+                        callback(batch)
+                    except Exception:
+                        log.exception("Subscriber %r failed on a batch of "
+                                      "%d events", callback, len(batch))
+            if stop:
+                return
+
+
+class EventReceiver(object):
+    """A WSGI application that receives Sandbox geofence notifications.
+
+    :Parameters:
+        * dispatcher (:class:`Dispatcher`) - Where parsed events are sent.
+        * catalog (:class:`FenceCatalog`) - Used to attach the fence to
+            each event (default=None).
+
+    Any WSGI server can host the receiver, or use :func:`serve` to run it
+    standalone.
+
+    """
+
+    def __init__(self, dispatcher, catalog=None):
+        self.dispatcher = dispatcher
+        self.catalog = catalog
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] != 'POST':
+            start_response('405 Method Not Allowed', [('Allow', 'POST')])
+            return []
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        body = environ['wsgi.input'].read(length)
+        try:
+            events = parse_events(body, environ.get('CONTENT_TYPE', ''))
+        except errors.ParsingError:
+            start_response('400 Bad Request', [('Content-Type', 'text/plain')])
+            return ['Malformed notification\n']
+        for event in events:
+            if self.catalog is not None:
+                try:
+                    event.fence = self.catalog.get(event.fenceid)
+                except errors.SprintkitError:
+                    pass
+            self.dispatcher.publish(event)
+        start_response('200 OK', [('Content-Type', 'text/plain')])
+        return ['OK\n']
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """A WSGI server that handles each request in its own thread."""
+    daemon_threads = True
+
+
+def serve(receiver, host='', port=8080):
+    """Create a standalone threaded HTTP server for `receiver`.
+
+    :Parameters:
+        * receiver (:class:`EventReceiver`) - The WSGI application.
+        * host (string) - The interface to listen on.
+        * port (integer) - The port to listen on.
+
+    :Returns: (:class:`ThreadingWSGIServer`) - Call its
+        ``serve_forever()`` method to start serving.
+
+    """
+    return make_server(host, port, receiver, server_class=ThreadingWSGIServer)
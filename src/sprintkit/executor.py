@@ -0,0 +1,219 @@
+"""
+sprintkit.executor
+==================
+
+A small thread pool for keeping several Sandbox requests in flight.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import Queue
+import sys
+import threading
+
+from sprintkit import deadline, hooks
+from sprintkit.errors import TimeoutError
+
+
+class Future(object):
+    """The pending result of a request submitted to an :class:`Executor`."""
+
+    def __init__(self):
+        self._done = threading.Event()
+        self._result = None
+        self._exception = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+        self._started = False
+
+    def done(self):
+        """Returns True once the request has finished."""
+        return self._done.is_set()
+
+    def cancel(self):
+        """Cancel the request if it has not started yet.
+
+        :Returns: (bool) - True if the request was cancelled, in which case
+            `result` raises :class:`sprintkit.errors.TimeoutError`.
+        """
+        self._lock.acquire()
+        try:
+            if self._started or self._done.is_set():
+                return False
+            self._started = True
+        finally:
+            self._lock.release()
+        self.set_exception(TimeoutError("The request was cancelled."))
+        return True
+
+    def _start(self):
+        self._lock.acquire()
+        try:
+            if self._started:
+                return False
+            self._started = True
+            return True
+        finally:
+            self._lock.release()
+
+    def result(self, timeout=None):
+        """Wait for the request to finish and return its result.
+
+        :Parameters: timeout (float) - Seconds to wait (default=None, wait
+            forever).
+
+        :Raises: The exception raised by the request, or
+            :class:`sprintkit.errors.TimeoutError` if `timeout` passes
+            first.
+        """
+        if not self._done.wait(timeout) and not self._done.is_set():
+            raise TimeoutError("The request did not finish in time.")
+        if self._exception is not None:
+            raise self._exception
+        return self._result
+
+    def exception(self, timeout=None):
+        """Wait for the request to finish and return the exception it
+        raised, or None."""
+        if not self._done.wait(timeout) and not self._done.is_set():
+            raise TimeoutError("The request did not finish in time.")
+        return self._exception
+
+    def add_done_callback(self, callback):
+        """Call ``callback(future)`` once the request finishes (at once if
+        it already has)."""
+        self._lock.acquire()
+        try:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        finally:
+            self._lock.release()
+        callback(self)
+
+    def set_result(self, result):
+        self._result = result
+        self._finish()
+
+    def set_exception(self, exception):
+        self._exception = exception
+        self._finish()
+
+    def _finish(self):
+        self._lock.acquire()
+        try:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        finally:
+            self._lock.release()
+        for callback in callbacks:
+            callback(self)
+
+
+class Executor(object):
+    """Runs submitted calls on a pool of worker threads.
+
+    :Parameters: workers (integer) - The number of worker threads, which
+        is also the most requests kept in flight.
+
+    .. note::
+        The worker threads are started on the first :meth:`submit` and are
+        daemon threads, so an idle Executor does not keep a process alive.
+
+        A call submitted inside a :class:`sprintkit.deadline.Deadline` runs
+        within the same deadline, and is dropped if the deadline passes
+        before a worker gets to it. It also runs with the caller's trace
+        context, see :func:`sprintkit.hooks.bind`.
+    """
+
+    def __init__(self, workers=8):
+        self.workers = workers
+        self._queue = Queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def submit(self, func, *args):
+        """Schedule ``func(*args)`` and return a :class:`Future` for its
+        result."""
+        self._start()
+        future = Future()
+        self._queue.put((future, deadline.current(), hooks.context(), func,
+                         args))
+        return future
+
+    def _start(self):
+        if len(self._threads) == self.workers:
+            return
+        self._lock.acquire()
+        try:
+            while len(self._threads) < self.workers:
+                thread = threading.Thread(target=self._work)
+                thread.daemon = True
+                thread.start()
+                self._threads.append(thread)
+        finally:
+            self._lock.release()
+
+    def _work(self):
+        while True:
+            future, within, context, func, args = self._queue.get()
+            if not future._start():
+                continue
+            try:
+                if within is not None:
+                    within.check()
+                with deadline.within(within):
+                    with hooks.restore(context):
+                        result = func(*args)
+            except Exception:
+                future.set_exception(sys.exc_info()[1])
+            else:
+                future.set_result(result)
+
+
+def spawn(func, *args):
+    """Run ``func(*args)`` on a thread of its own and return a
+    :class:`Future` for its result.
+
+    Unlike :meth:`Executor.submit` the call never waits for a free worker,
+    which suits the few calls that must start at once, such as hedged
+    requests. It runs within the caller's deadline and trace context.
+    """
+    future = Future()
+    future._start()
+    within = deadline.current()
+    context = hooks.context()
+
+    def run():
+        try:
+            with deadline.within(within):
+                with hooks.restore(context):
+                    result = func(*args)
+        except Exception:
+            future.set_exception(sys.exc_info()[1])
+        else:
+            future.set_result(result)
+
+    thread = threading.Thread(target=run)
+    thread.daemon = True
+    thread.start()
+    return future
+
+
+_default = None
+_default_lock = threading.Lock()
+
+
+def default_executor():
+    """Returns the :class:`Executor` shared by every resource that was not
+    given one of its own."""
+    global _default
+    if _default is None:
+        _default_lock.acquire()
+        try:
+            if _default is None:
+                _default = Executor()
+        finally:
+            _default_lock.release()
+    return _default
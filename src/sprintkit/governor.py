@@ -0,0 +1,80 @@
+"""
+sprintkit.governor
+==================
+
+Keeps the rate of Sandbox requests within a quota.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import threading
+import time
+
+from sprintkit import deadline, errors
+
+
+class RateLimiter(object):
+    """A token bucket shared by the resources (and threads) that use it.
+
+    :Parameters:
+        * rate (float) - The requests allowed per second.
+        * burst (integer) - The most requests allowed at once after an idle
+            period (default=`rate`, at least 1).
+
+    .. note::
+        Give the same RateLimiter to every resource that draws on one
+        Sandbox key, for example ``Location(config, governor=limiter)``.
+        Every HTTP request, including retries and hedged requests, takes a
+        token.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = max(burst or int(rate), 1)
+        self._tokens = float(self.burst)
+        self._updated = time.time()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = max(now - self._updated, 0)
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def try_acquire(self):
+        """Take a token if one is available.
+
+        :Returns: (bool) - True if a token was taken.
+        """
+        self._lock.acquire()
+        try:
+            self._refill(time.time())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+        finally:
+            self._lock.release()
+
+    def acquire(self):
+        """Take a token, waiting until one is available.
+
+        :Raises: :class:`sprintkit.errors.TimeoutError` - At once, without
+            taking a token, if none is available before the current
+            deadline passes.
+        """
+        while True:
+            self._lock.acquire()
+            try:
+                self._refill(time.time())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            finally:
+                self._lock.release()
+            remaining = deadline.remaining()
+            if remaining is not None and wait > remaining:
+                raise errors.TimeoutError("The deadline passes before the "
+                                          "rate limit allows a request.")
+            time.sleep(wait)
@@ -82,6 +82,24 @@ class GeoSecond(float):
         return "%.2f\"" % self
 
 
+EARTH_RADIUS = 6371009 #Earth mean radius as defined by IUGG
+
+
+def haversine(lat1, lon1, lat2, lon2):
+    """Haversine formula for the distance between two points given in
+    decimal degrees.
+
+    :Returns: (float) - The distance in meters.
+    """
+    dist_lat = math.radians(lat2-lat1)
+    dist_lon = math.radians(lon2-lon1)
+    a = math.sin(dist_lat/2) * math.sin(dist_lat/2) +\
+            math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *\
+            math.sin(dist_lon/2) * math.sin(dist_lon/2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    return EARTH_RADIUS * c
+
+
 class Latitude(float):
     """ Latitude value """
 
@@ -324,15 +342,7 @@ class Coordinates(tuple):
         :Returns: (int) - The distance in meters."""
         lat1, lon1 = self
         lat2, lon2 = other
-        radius = 6371009 #Earth mean radius as defined by IUGG
-        dist_lat = math.radians(lat2-lat1)
-        dist_lon = math.radians(lon2-lon1)
-        a = math.sin(dist_lat/2) * math.sin(dist_lat/2) +\
-                math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) *\
-                math.sin(dist_lon/2) * math.sin(dist_lon/2)
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-        distance = radius * c
-        return int(distance)
+        return int(haversine(lat1, lon1, lat2, lon2))
    
     @property
     def latitude(self):
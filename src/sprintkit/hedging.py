@@ -0,0 +1,174 @@
+"""
+sprintkit.hedging
+=================
+
+Hedged requests, which trade a few extra Sandbox requests for a shorter
+tail latency.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import collections
+import Queue
+import threading
+import time
+
+from sprintkit import deadline
+from sprintkit.errors import TimeoutError
+from sprintkit.executor import spawn
+
+
+class HedgePolicy(object):
+    """Sends a second request when the first one is slow.
+
+    :Parameters:
+        * percentile (float) - The percentile of recent latencies to wait
+            before hedging.
+        * window (integer) - The number of recent latencies kept.
+        * min_delay (float) - The shortest wait in seconds before hedging.
+        * initial_delay (float) - The wait used until `min_samples`
+            latencies have been seen.
+        * min_samples (integer)
+
+    :Attributes:
+        * requests (integer) - The calls made through this policy.
+        * hedged (integer) - The calls that sent a second request.
+        * hedge_wins (integer) - The calls won by the second request.
+
+    .. note::
+        Pass a policy to :class:`sprintkit.services.Location`,
+        :class:`sprintkit.services.Presence` or
+        :class:`sprintkit.services.Perimeter` to enable hedging, for example
+        ``Location(config, hedge=HedgePolicy())``. When a request has not
+        finished after the delay, an identical request with a fresh
+        signature is sent, and whichever succeeds first is returned. Both
+        requests run on threads of their own rather than on the resource's
+        executor, so that a hedge never waits behind busy workers. An error is only raised when both
+        requests fail. At the 95th percentile about one request in twenty
+        is hedged. Hedged requests take a token from the resource's
+        `governor` like any other. The hedged requests and their wins are
+        also counted per endpoint in the resource's `metrics` registry, see
+        :class:`sprintkit.metrics.EndpointMetrics`.
+
+    """
+
+    def __init__(self, percentile=95, window=500, min_delay=0.05,
+                 initial_delay=1.0, min_samples=20):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.initial_delay = initial_delay
+        self.min_samples = min_samples
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latencies = collections.deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    @property
+    def hedge_rate(self):
+        """(float) - The fraction of calls that were hedged."""
+        if not self.requests:
+            return 0.0
+        return float(self.hedged) / self.requests
+
+    def delay(self):
+        """Returns the seconds to wait before hedging a request."""
+        self._lock.acquire()
+        try:
+            latencies = sorted(self._latencies)
+        finally:
+            self._lock.release()
+        if len(latencies) < self.min_samples:
+            return self.initial_delay
+        index = int(len(latencies) * self.percentile / 100.0)
+        return max(latencies[min(index, len(latencies) - 1)], self.min_delay)
+
+    def _record(self, latency=None, hedged=False, won=False):
+        self._lock.acquire()
+        try:
+            if latency is not None:
+                self._latencies.append(latency)
+            if hedged:
+                self.hedged += 1
+            if won:
+                self.hedge_wins += 1
+        finally:
+            self._lock.release()
+
+    def call(self, resource, endpoint, params, decoder=None):
+        """Make a hedged :meth:`sprintkit.services.SandboxResource.call`."""
+        self._lock.acquire()
+        try:
+            self.requests += 1
+        finally:
+            self._lock.release()
+        delay = self.delay()
+        remaining = deadline.remaining()
+        if remaining is not None and remaining <= delay:
+            # There is no time to hedge, so send the request from here.
+            start = time.time()
+            data = resource.perform(endpoint, resource.sign(endpoint, params),
+                                    decoder)
+            self._record(time.time() - start)
+            return data
+        start = time.time()
+        finished = Queue.Queue()
+        sent = {}
+
+        def send(attempt):
+            signed = resource.sign(endpoint, params)
+            sent_at = time.time()
+            future = spawn(resource.perform, endpoint, signed, decoder,
+                           attempt)
+            sent[future] = sent_at
+            future.add_done_callback(finished.put)
+            return future
+
+        first = send(1)
+        attempts = 1
+        try:
+            try:
+                future = finished.get(timeout=delay)
+            except Queue.Empty:
+                send(2)
+                attempts = 2
+                self._record(hedged=True)
+                if resource.metrics is not None:
+                    resource.metrics.endpoint(endpoint).hedge()
+                future = self._next(finished)
+            failure = None
+            pending = attempts
+            while True:
+                pending -= 1
+                if future.exception() is None:
+                    won = future is not first
+                    # The latency of the request that won, not of the call,
+                    # which includes the delay before the hedge was sent.
+                    self._record(time.time() - sent[future], won=won)
+                    if won and resource.metrics is not None:
+                        resource.metrics.endpoint(endpoint).hedge(won=True)
+                    return future.result()
+                if failure is None:
+                    failure = future
+                if not pending:
+                    return failure.result()
+                future = self._next(finished)
+        except TimeoutError as e:
+            if e.endpoint is None:
+                # Raised while waiting here, not by one of the requests.
+                e.endpoint = endpoint
+                e.mdn = params.get('mdn')
+                e.elapsed = time.time() - start
+                e.attempt = attempts
+            raise
+
+    def _next(self, finished):
+        """Wait for the next finished future, within the current deadline."""
+        remaining = deadline.remaining()
+        if remaining is None:
+            return finished.get()
+        try:
+            return finished.get(timeout=max(remaining, 0))
+        except Queue.Empty:
+            raise TimeoutError("The deadline passed.")
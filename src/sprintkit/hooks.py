@@ -0,0 +1,140 @@
+"""
+sprintkit.hooks
+===============
+
+Callbacks around every Sandbox request, for tracing and profiling.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import threading
+
+
+REDACTED = ('key', 'sig', 'secret')
+"""The parameters hidden from hooks."""
+
+
+def redact(params):
+    """Returns a copy of `params` with the credentials replaced by '***'."""
+    return dict((key, key in REDACTED and '***' or value)
+                for key, value in params.items())
+
+
+_local = threading.local()
+
+
+def context():
+    """Returns the trace context of the current thread, a dict of the
+    values bound with :func:`bind`."""
+    return getattr(_local, 'context', None) or {}
+
+
+class _Bound(object):
+    """Adds values to the trace context while it is entered."""
+    __slots__ = ['values', 'previous']
+
+    def __init__(self, values):
+        self.values = values
+        self.previous = None
+
+    def __enter__(self):
+        self.previous = getattr(_local, 'context', None)
+        merged = dict(self.previous or {})
+        merged.update(self.values)
+        _local.context = merged
+        return merged
+
+    def __exit__(self, *exc_info):
+        _local.context = self.previous
+        return False
+
+
+def bind(**values):
+    """A context manager that adds values to the trace context.
+
+    Requests made inside the ``with`` block, including the ones handed to
+    the worker threads of a :class:`sprintkit.executor.Executor` or of
+    :func:`sprintkit.bulk.run_bulk`, see the values in
+    :attr:`RequestEvent.context`::
+
+        with bind(trace_id=request_id):
+            location.locate(mdn)
+    """
+    return _Bound(values)
+
+
+def restore(captured):
+    """A context manager that re-enters a trace context captured with
+    :func:`context`, used to carry it over to another thread."""
+    return _Bound(captured)
+
+
+class RequestEvent(object):
+    """What a hook is told about a request.
+
+    :Attributes:
+        * endpoint (string) - The endpoint, for example 'location.json'.
+        * params (dict) - The request parameters, with the credentials
+            redacted.
+        * context (dict) - The trace context of the caller.
+        * start (float) - When the request started, from ``time.time()``.
+        * elapsed (float) - Seconds the request took, None before it
+            finishes.
+        * result - The parsed Sandbox data, after a successful request.
+        * error (Exception) - The exception raised, after a failure.
+    """
+    __slots__ = ['endpoint', 'params', 'context', 'start', 'elapsed',
+                 'result', 'error']
+
+    def __init__(self, endpoint, params, start):
+        self.endpoint = endpoint
+        self.params = redact(params)
+        self.context = context()
+        self.start = start
+        self.elapsed = None
+        self.result = None
+        self.error = None
+
+    def __repr__(self):
+        return "RequestEvent(%r, %r)" % (self.endpoint, self.elapsed)
+
+
+class Hooks(object):
+    """The callbacks run around the requests of the resources sharing it.
+
+    :Parameters:
+        * before_request (callable) - Called with a :class:`RequestEvent`
+            before the request is sent.
+        * after_response (callable) - Called after a request succeeds.
+        * on_error (callable) - Called after a request fails.
+
+    .. note::
+        Give the Hooks to a resource with
+        ``Location(config, hooks=hooks)``. More callbacks can be added with
+        :meth:`register`. Callbacks run on the thread that sends the
+        request (a worker thread for requests made with `submit`), and
+        exceptions they raise propagate to the caller, so they should be
+        quick and not fail.
+    """
+
+    def __init__(self, before_request=None, after_response=None,
+                 on_error=None):
+        self.before_request = []
+        self.after_response = []
+        self.on_error = []
+        self.register(before_request, after_response, on_error)
+
+    def register(self, before_request=None, after_response=None,
+                 on_error=None):
+        """Add callbacks."""
+        if before_request is not None:
+            self.before_request.append(before_request)
+        if after_response is not None:
+            self.after_response.append(after_response)
+        if on_error is not None:
+            self.on_error.append(on_error)
+
+    def fire(self, callbacks, event):
+        for callback in callbacks:
+            callback(event)
@@ -0,0 +1,260 @@
+"""
+sprintkit.membership
+====================
+
+An index of which geofences monitor each device and notify each recipient.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import random
+import threading
+import time
+
+from sprintkit.bulk import run_bulk
+
+
+class Membership(object):
+    """An inverted index of the devices and recipients of every fence.
+
+    :Parameters:
+        * geofence (:class:`sprintkit.services.GeoFence`) - Used to list
+            the fences of the account.
+        * ttl (integer) - Seconds before a fence's entries are reloaded.
+        * concurrency (integer) - The number of fences loaded at once.
+        * jitter (float) - The most a fence's expiry is brought forward, as
+            a fraction of the `ttl`.
+        * retry (integer) - Seconds before a fence that failed to load is
+            tried again (at most the `ttl`).
+
+    .. note::
+        Each fence is loaded with :meth:`sprintkit.services.Fence.devices`
+        and :meth:`sprintkit.services.Fence.recipients`, and expires on its
+        own. A query reloads only the fences that have expired (and the
+        list of fences itself), so after the first load a query costs at
+        most the fences that changed rather than one round trip per fence.
+        Each expiry is brought forward by a random part of `jitter`, so
+        fences loaded together are reloaded a few at a time rather than
+        all at once. Fences that fail to load keep their previous entries
+        and are tried again after `retry` seconds, so a fence that keeps
+        failing does not hold up every query.
+
+        Only the first query waits for the index to load. A query made
+        while another thread refreshes the index uses the entries already
+        loaded. Adding or deleting a fence, device or recipient through
+        the fences of the same :class:`sprintkit.services.GeoFence`
+        expires the entries it changed.
+
+    """
+
+    def __init__(self, geofence, ttl=300, concurrency=8, jitter=0.2,
+                 retry=30):
+        self.geofence = geofence
+        self.concurrency = concurrency
+        self.jitter = jitter
+        self.retry = retry
+        self.fences = {}
+        """Maps each fenceid to its :class:`sprintkit.services.Fence`."""
+        self._ttl = ttl
+        self._devices = {}
+        self._recipients = {}
+        self._by_mdn = {}
+        self._by_recipient = {}
+        self._loaded = {}
+        self._spread = {}
+        self._failed = {}
+        self._listed = None
+        self._due = 0
+        self._ready = False
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+
+    @property
+    def ttl(self):
+        """(integer) - Seconds before a fence's entries are reloaded."""
+        return self._ttl
+
+    @ttl.setter
+    def ttl(self, ttl):
+        self._ttl = ttl
+        # Check every fence against the new ttl on the next query.
+        self._due = 0
+
+    def _expires(self, fenceid):
+        # A fence that failed to load is not tried again before its retry
+        # time, whether or not it was loaded before.
+        retry = self._failed.get(fenceid, 0)
+        loaded = self._loaded.get(fenceid)
+        if loaded is None:
+            return retry
+        return max(retry,
+                   loaded + self._ttl * (1 - self._spread.get(fenceid, 0)))
+
+    def refresh(self, force=False):
+        """Reload the list of fences and every fence that has expired.
+
+        :Parameters: force (bool) - Reload every fence, expired or not.
+
+        :Returns: (:class:`sprintkit.bulk.BulkSummary`) - The outcome of
+            loading the expired fences.
+
+        """
+        self._refreshing.acquire()
+        try:
+            return self._refresh(force)
+        finally:
+            self._refreshing.release()
+
+    def _refresh(self, force):
+        if force or self._listed is None or (
+                time.time() - self._listed > self._ttl):
+            fences = dict((fence.fenceid, fence)
+                          for fence in self.geofence.fences())
+            self._lock.acquire()
+            try:
+                for fenceid in set(self.fences) - set(fences):
+                    self._index(fenceid, set(), set())
+                    self._loaded.pop(fenceid, None)
+                    self._spread.pop(fenceid, None)
+                    self._failed.pop(fenceid, None)
+                self.fences = fences
+                self._listed = time.time()
+            finally:
+                self._lock.release()
+        now = time.time()
+        self._lock.acquire()
+        try:
+            expired = [fence for fenceid, fence in self.fences.items()
+                       if force or self._expires(fenceid) <= now]
+        finally:
+            self._lock.release()
+        summary = run_bulk(self.refresh_fence, expired, self.concurrency)
+        retry = time.time() + min(self._ttl, self.retry)
+        self._lock.acquire()
+        try:
+            for fence in summary.failed:
+                if fence.fenceid in self.fences:
+                    self._failed[fence.fenceid] = retry
+            self._due = min([self._expires(fenceid)
+                             for fenceid in self.fences] +
+                            [(self._listed or 0) + self._ttl])
+            self._ready = True
+        finally:
+            self._lock.release()
+        return summary
+
+    def _update(self):
+        """Refresh the index before a query if it has expired."""
+        if self._ready and time.time() < self._due:
+            return
+        # Only the first load is waited for, later queries use the entries
+        # already loaded while another thread refreshes them.
+        if not self._refreshing.acquire(not self._ready):
+            return
+        try:
+            if not self._ready or time.time() >= self._due:
+                self._refresh(False)
+        finally:
+            self._refreshing.release()
+
+    def refresh_fence(self, fence):
+        """Reload the devices and recipients of a single fence.
+
+        :Parameters: fence (:class:`sprintkit.services.Fence`)
+        """
+        devices = set(fence.devices())
+        recipients = set(fence.recipients())
+        self._lock.acquire()
+        try:
+            self._index(fence.fenceid, devices, recipients)
+            self._loaded[fence.fenceid] = time.time()
+            self._failed.pop(fence.fenceid, None)
+            self._spread[fence.fenceid] = random.random() * self.jitter
+            self._due = min(self._due, self._expires(fence.fenceid))
+        finally:
+            self._lock.release()
+
+    def invalidate(self, fenceid=None):
+        """Expire one fence (or all fences) so the next query reloads it."""
+        self._lock.acquire()
+        try:
+            if fenceid is None:
+                self._loaded.clear()
+                self._failed.clear()
+                self._listed = None
+            else:
+                self._loaded.pop(fenceid, None)
+                self._failed.pop(fenceid, None)
+            self._due = 0
+        finally:
+            self._lock.release()
+
+    def invalidate_list(self):
+        """Expire the list of fences, after a fence was added or deleted, so
+        the next query reloads it (and loads only the new fences)."""
+        self._lock.acquire()
+        try:
+            self._listed = None
+            self._due = 0
+        finally:
+            self._lock.release()
+
+    def _index(self, fenceid, devices, recipients):
+        self._reindex(self._by_mdn, self._devices, fenceid, devices)
+        self._reindex(self._by_recipient, self._recipients, fenceid,
+                      recipients)
+
+    def _reindex(self, index, members, fenceid, current):
+        previous = members.get(fenceid, set())
+        for member in previous - current:
+            fenceids = index[member]
+            fenceids.discard(fenceid)
+            if not fenceids:
+                del index[member]
+        for member in current - previous:
+            index.setdefault(member, set()).add(fenceid)
+        if current:
+            members[fenceid] = current
+        else:
+            members.pop(fenceid, None)
+
+    def fences_for_mdn(self, mdn):
+        """Returns the set of fenceids that monitor the device `mdn`."""
+        self._update()
+        self._lock.acquire()
+        try:
+            return set(self._by_mdn.get(mdn, ()))
+        finally:
+            self._lock.release()
+
+    def fences_for_recipient(self, recipient):
+        """Returns the set of fenceids that notify `recipient` (an MDN or
+        URL)."""
+        self._update()
+        self._lock.acquire()
+        try:
+            return set(self._by_recipient.get(recipient, ()))
+        finally:
+            self._lock.release()
+
+    def devices(self):
+        """Returns a dict mapping every monitored MDN to its set of
+        fenceids."""
+        self._update()
+        self._lock.acquire()
+        try:
+            return dict((mdn, set(fenceids))
+                        for mdn, fenceids in self._by_mdn.items())
+        finally:
+            self._lock.release()
+
+    def recipients(self):
+        """Returns a dict mapping every recipient to its set of fenceids."""
+        self._update()
+        self._lock.acquire()
+        try:
+            return dict((recipient, set(fenceids))
+                        for recipient, fenceids in self._by_recipient.items())
+        finally:
+            self._lock.release()
@@ -0,0 +1,237 @@
+"""
+sprintkit.metrics
+=================
+
+Request counters and latency histograms for each Sandbox endpoint.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import bisect
+import threading
+
+from sprintkit.bulk import error_code
+
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0,
+                   2.5, 5.0, 10.0)
+"""The upper bounds, in seconds, of the latency histogram buckets."""
+
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+"""The upper bounds, in bytes, of the response size histogram buckets."""
+
+PHASES = ('sign', 'network', 'decode', 'check')
+"""The phases of a request: signing the parameters, sending the request and
+reading the response, decoding the JSON, and checking it for Sandbox
+errors."""
+
+
+class Histogram(object):
+    """Counts observations in buckets.
+
+    :Parameters: buckets (tuple) - The sorted upper bounds of the buckets.
+        Larger observations are counted in a final, unbounded bucket.
+    """
+    __slots__ = ['buckets', 'counts', 'count', 'sum']
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def snapshot(self):
+        """Returns a dict of the `count`, `sum` and cumulative `buckets`,
+        a list of (upper bound, count) pairs ending with ('+Inf', count)."""
+        cumulative = []
+        total = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            total += count
+            cumulative.append((bound, total))
+        return {'count': self.count, 'sum': self.sum, 'buckets': cumulative}
+
+
+class EndpointMetrics(object):
+    """The metrics of one endpoint.
+
+    :Attributes:
+        * requests (integer) - The requests made.
+        * errors (dict) - Maps each error code to the number of requests
+            that failed with it, see :func:`sprintkit.bulk.error_code`.
+        * phases (dict) - Maps each of :data:`PHASES` to a
+            :class:`Histogram` of its latency.
+        * sizes (:class:`Histogram`) - The response body sizes.
+        * hedged (integer) - The calls that sent a second, hedged request,
+            see :class:`sprintkit.hedging.HedgePolicy`.
+        * hedge_wins (integer) - The calls won by the hedged request.
+    """
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+        self.requests = 0
+        self.errors = {}
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.phases = dict((phase, Histogram(LATENCY_BUCKETS))
+                           for phase in PHASES)
+        self.sizes = Histogram(SIZE_BUCKETS)
+        self._lock = threading.Lock()
+
+    def sign(self, seconds):
+        """Record the time spent signing a request."""
+        self._lock.acquire()
+        try:
+            self.phases['sign'].observe(seconds)
+        finally:
+            self._lock.release()
+
+    def record(self, network, decode=None, check=None, size=None):
+        """Record a request that reached the Sandbox."""
+        self._lock.acquire()
+        try:
+            self.requests += 1
+            self.phases['network'].observe(network)
+            if decode is not None:
+                self.phases['decode'].observe(decode)
+            if check is not None:
+                self.phases['check'].observe(check)
+            if size is not None:
+                self.sizes.observe(size)
+        finally:
+            self._lock.release()
+
+    def error(self, error, counted=False):
+        """Record a request that failed with `error`.
+
+        :Parameters: counted (bool) - True if the request was already
+            counted by `record`.
+        """
+        code = error_code(error)
+        self._lock.acquire()
+        try:
+            if not counted:
+                self.requests += 1
+            self.errors[code] = self.errors.get(code, 0) + 1
+        finally:
+            self._lock.release()
+
+    def hedge(self, won=False):
+        """Record a call that sent a hedged request, or with `won` a call
+        won by the hedged request."""
+        self._lock.acquire()
+        try:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedged += 1
+        finally:
+            self._lock.release()
+
+    def snapshot(self):
+        """Returns a dict of the endpoint's metrics."""
+        self._lock.acquire()
+        try:
+            return {'requests': self.requests,
+                    'errors': dict(self.errors),
+                    'hedged': self.hedged,
+                    'hedge_wins': self.hedge_wins,
+                    'phases': dict((phase, histogram.snapshot())
+                                   for phase, histogram
+                                   in self.phases.items()),
+                    'sizes': self.sizes.snapshot()}
+        finally:
+            self._lock.release()
+
+
+class Registry(object):
+    """The metrics of every endpoint used by the resources that share it.
+
+    .. note::
+        Metrics are only recorded by resources that are given a registry,
+        for example ``Location(config, metrics=registry)``. Without one a
+        request costs a single extra ``is None`` check. With one, each
+        request takes a few timer reads and a short lock per endpoint.
+        The module level :data:`registry` can be shared by a whole
+        process.
+    """
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def endpoint(self, endpoint):
+        """Returns the :class:`EndpointMetrics` of `endpoint`."""
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            self._lock.acquire()
+            try:
+                metrics = self._endpoints.get(endpoint)
+                if metrics is None:
+                    metrics = EndpointMetrics(endpoint)
+                    self._endpoints[endpoint] = metrics
+            finally:
+                self._lock.release()
+        return metrics
+
+    def snapshot(self):
+        """Returns a dict mapping each endpoint to its
+        :meth:`EndpointMetrics.snapshot`."""
+        return dict((endpoint, metrics.snapshot())
+                    for endpoint, metrics in self._endpoints.items())
+
+    def reset(self):
+        """Forget every recorded metric."""
+        self._lock.acquire()
+        try:
+            self._endpoints = {}
+        finally:
+            self._lock.release()
+
+    def prometheus(self, prefix='sprintkit'):
+        """Export the metrics in the Prometheus text format.
+
+        :Returns: (string)
+        """
+        snapshot = sorted(self.snapshot().items())
+        lines = ['# TYPE %s_requests_total counter' % prefix]
+        for endpoint, metrics in snapshot:
+            lines.append('%s_requests_total{endpoint="%s"} %i' % (
+                prefix, endpoint, metrics['requests']))
+        lines.append('# TYPE %s_errors_total counter' % prefix)
+        for endpoint, metrics in snapshot:
+            for code, count in sorted(metrics['errors'].items()):
+                lines.append('%s_errors_total{endpoint="%s",code="%s"} %i' % (
+                    prefix, endpoint, code, count))
+        for name in ('hedged', 'hedge_wins'):
+            lines.append('# TYPE %s_%s_total counter' % (prefix, name))
+            for endpoint, metrics in snapshot:
+                lines.append('%s_%s_total{endpoint="%s"} %i' % (
+                    prefix, name, endpoint, metrics[name]))
+        lines.append('# TYPE %s_phase_seconds histogram' % prefix)
+        for endpoint, metrics in snapshot:
+            for phase in PHASES:
+                labels = 'endpoint="%s",phase="%s"' % (endpoint, phase)
+                _histogram(lines, '%s_phase_seconds' % prefix, labels,
+                           metrics['phases'][phase])
+        lines.append('# TYPE %s_response_bytes histogram' % prefix)
+        for endpoint, metrics in snapshot:
+            _histogram(lines, '%s_response_bytes' % prefix,
+                       'endpoint="%s"' % endpoint, metrics['sizes'])
+        return '\n'.join(lines) + '\n'
+
+
+def _histogram(lines, name, labels, histogram):
+    for bound, count in histogram['buckets']:
+        lines.append('%s_bucket{%s,le="%s"} %i' % (name, labels, bound, count))
+    lines.append('%s_sum{%s} %s' % (name, labels, histogram['sum']))
+    lines.append('%s_count{%s} %i' % (name, labels, histogram['count']))
+
+
+registry = Registry()
+"""A :class:`Registry` that can be shared by every resource."""
@@ -0,0 +1,207 @@
+"""
+sprintkit.monitor
+=================
+
+Emulates the Sandbox geofence notifications on the client, from location
+fixes polled with :meth:`sprintkit.services.Location.locate` or any other
+stream of fixes.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import math
+
+from sprintkit.bulk import run_bulk
+from sprintkit.events import FenceEvent
+from sprintkit.gps import haversine
+
+
+METERS_PER_DEGREE = 111320.0
+"""The approximate length of one degree of latitude in meters."""
+
+
+class FenceIndex(object):
+    """A grid index for finding the fences near a point.
+
+    :Parameters:
+        * fences (list) - The :class:`sprintkit.services.Fence` objects to
+            index, as returned by :meth:`sprintkit.services.GeoFence.fences`.
+        * cell_size (float) - The size of a grid cell in degrees.
+
+    .. note::
+        Each fence is added to every grid cell that its bounding box
+        overlaps, so finding the fences that might contain a point is a
+        single dictionary lookup no matter how many fences are indexed.
+
+    """
+
+    def __init__(self, fences=(), cell_size=0.05):
+        self.cell_size = cell_size
+        self.fences = {}
+        """Maps each fenceid to its Fence."""
+        self.geometry = {}
+        """Maps each fenceid to a (latitude, longitude, radius) tuple."""
+        self._cells = {}
+        self._fence_cells = {}
+        for fence in fences:
+            self.add(fence)
+
+    def _cell(self, lat, lon):
+        return (int(math.floor(lat / self.cell_size)),
+                int(math.floor(lon / self.cell_size)))
+
+    def add(self, fence):
+        """Add a fence to the index (replacing any fence with its fenceid)."""
+        self.remove(fence.fenceid)
+        lat, lon = fence.coordinates
+        lat, lon = float(lat), float(lon)
+        dlat = fence.radius / METERS_PER_DEGREE
+        dlon = dlat / max(math.cos(math.radians(lat)), 0.01)
+        (row0, col0) = self._cell(lat - dlat, lon - dlon)
+        (row1, col1) = self._cell(lat + dlat, lon + dlon)
+        cells = [(row, col) for row in range(row0, row1 + 1)
+                 for col in range(col0, col1 + 1)]
+        for cell in cells:
+            self._cells.setdefault(cell, []).append(fence.fenceid)
+        self._fence_cells[fence.fenceid] = cells
+        self.fences[fence.fenceid] = fence
+        self.geometry[fence.fenceid] = (lat, lon, fence.radius)
+
+    def remove(self, fenceid):
+        """Remove the fence with `fenceid` from the index, if it is there."""
+        for cell in self._fence_cells.pop(fenceid, ()):
+            fenceids = self._cells[cell]
+            fenceids.remove(fenceid)
+            if not fenceids:
+                del self._cells[cell]
+        self.fences.pop(fenceid, None)
+        self.geometry.pop(fenceid, None)
+
+    def candidates(self, lat, lon):
+        """Returns the fenceids of the fences that might contain a point."""
+        return self._cells.get(self._cell(lat, lon), ())
+
+
+class Monitor(object):
+    """Tracks which fences each device is inside and emits enter and exit
+    events.
+
+    :Parameters:
+        * index (:class:`FenceIndex`) - The fences to monitor.
+        * dispatcher (:class:`sprintkit.events.Dispatcher`) - Where events
+            are published (default=None).
+        * hysteresis (float) - How many HEPEs a fix must move past the edge
+            of a fence before its state changes.
+        * use_schedule (bool) - Only evaluate fences while they are active,
+            see :meth:`sprintkit.services.Fence.is_active_at`.
+
+    .. note::
+        A device enters a fence when its distance from the center is less
+        than the radius minus `hysteresis` times the fix's HEPE (but never
+        less than half the radius), and leaves it when the distance is
+        more than the radius plus `hysteresis` times the HEPE. This keeps
+        a device sitting near an edge from flapping in and out with every
+        noisy fix. A device with no previous fix is treated as outside
+        every fence.
+
+        Events are :class:`sprintkit.events.FenceEvent` objects and are
+        only emitted when they match the fence's `notify_event`, just as
+        the Sandbox would post them. Only the fenceids of the fences a
+        device is inside are kept per device.
+
+        One Monitor can be shared between threads as long as the fixes for
+        any one MDN are fed from one thread at a time.
+
+    """
+
+    def __init__(self, index, dispatcher=None, hysteresis=1.0,
+                 use_schedule=True):
+        self.index = index
+        self.dispatcher = dispatcher
+        self.hysteresis = hysteresis
+        self.use_schedule = use_schedule
+        self._inside = {}
+
+    def inside(self, mdn):
+        """Returns the fenceids of the fences `mdn` is currently inside."""
+        return self._inside.get(mdn, ())
+
+    def update(self, mdn, fix):
+        """Process a new fix for a device.
+
+        :Parameters:
+            * mdn (string) - The MDN of the device.
+            * fix (:class:`sprintkit.gps.Gps2dFix`) - The device's location.
+
+        :Returns: (list) - The :class:`sprintkit.events.FenceEvent` objects
+            triggered by the fix.
+
+        """
+        lat, lon = fix.coordinates
+        hepe = (fix.errors or {}).get('hepe', 0)
+        margin = self.hysteresis * hepe
+        previous = self._inside.get(mdn, ())
+        fences = self.index.fences
+        geometry = self.index.geometry
+        inside = []
+        events = []
+        checked = set()
+        for fenceid in previous + tuple(self.index.candidates(lat, lon)):
+            if fenceid in checked or fenceid not in geometry:
+                continue
+            checked.add(fenceid)
+            fence = fences[fenceid]
+            was_inside = fenceid in previous
+            if self.use_schedule and not fence.is_active_at(fix.timestamp):
+                if was_inside:
+                    inside.append(fenceid)
+                continue
+            (fence_lat, fence_lon, radius) = geometry[fenceid]
+            distance = haversine(lat, lon, fence_lat, fence_lon)
+            if was_inside:
+                now_inside = distance <= radius + margin
+            else:
+                now_inside = distance <= radius - min(margin, radius / 2.0)
+            if now_inside:
+                inside.append(fenceid)
+            if now_inside != was_inside:
+                event = now_inside and 'in' or 'out'
+                if fence.notify_event in (event, 'both'):
+                    events.append(FenceEvent(fenceid, mdn, event,
+                                             fix.timestamp, fence))
+        if inside:
+            self._inside[mdn] = tuple(inside)
+        else:
+            self._inside.pop(mdn, None)
+        if self.dispatcher is not None:
+            for event in events:
+                self.dispatcher.publish(event)
+        return events
+
+    def feed(self, fixes):
+        """Process a stream of fixes.
+
+        :Parameters: fixes (iterable) - (mdn, fix) pairs.
+
+        :Returns: (generator) - The events triggered by the fixes.
+        """
+        for mdn, fix in fixes:
+            for event in self.update(mdn, fix):
+                yield event
+
+    def track(self, location, mdns, concurrency=8):
+        """Locate each MDN once and process the fixes.
+
+        :Parameters:
+            * location (:class:`sprintkit.services.Location`) - Used to
+                locate the devices.
+            * mdns (iterable) - The MDNs to locate.
+            * concurrency (integer) - The number of requests kept in flight.
+
+        :Returns: (:class:`sprintkit.bulk.BulkSummary`) - The outcome of
+            locating the devices. Events go to the `dispatcher`.
+
+        """
+        return run_bulk(lambda mdn: self.update(mdn, location.locate(mdn)),
+                        mdns, concurrency)
@@ -0,0 +1,419 @@
+"""
+sprintkit.pipeline
+==================
+
+Locates many MDNs on a pool of threads and post-processes the fixes on a
+pool of processes.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+from array import array
+import collections
+import multiprocessing
+import Queue
+import threading
+import time
+
+from sprintkit import deadline, errors, hooks
+from sprintkit.bulk import BulkSummary, run_bulk
+from sprintkit.gps import Coordinates, haversine
+from sprintkit.metrics import Registry
+
+
+class FixBatch(object):
+    """A batch of location fixes in a compact form.
+
+    :Attributes:
+        * mdns (list) - The MDNs of the fixes.
+        * values (array) - An ``array('d')`` holding the latitude, longitude
+            and HEPE of each fix, one after the other.
+
+    .. note::
+        A FixBatch pickles to the MDNs and the raw bytes of `values`, which
+        is far smaller and faster to send to another process than a list
+        of :class:`sprintkit.gps.Gps2dFix` objects.
+    """
+    __slots__ = ['mdns', 'values']
+
+    def __init__(self, mdns=None, values=None):
+        self.mdns = mdns if mdns is not None else []
+        self.values = values if values is not None else array('d')
+
+    def append(self, mdn, lat, lon, hepe):
+        self.mdns.append(mdn)
+        self.values.extend((lat, lon, hepe))
+
+    def __len__(self):
+        return len(self.mdns)
+
+    def __iter__(self):
+        """Yields an (mdn, lat, lon, hepe) tuple for each fix."""
+        values = self.values
+        for i, mdn in enumerate(self.mdns):
+            yield (mdn, values[3 * i], values[3 * i + 1], values[3 * i + 2])
+
+    def __getstate__(self):
+        return (self.mdns, self.values.tostring())
+
+    def __setstate__(self, state):
+        (self.mdns, values) = state
+        self.values = array('d')
+        self.values.fromstring(values)
+
+
+def distances(batch, lat, lon):
+    """Computes the distance from each fix to a point.
+
+    :Returns: (list) - (mdn, meters) pairs.
+    """
+    return [(mdn, haversine(fix_lat, fix_lon, lat, lon))
+            for (mdn, fix_lat, fix_lon, hepe) in batch]
+
+
+def fences(batch, geometry):
+    """Finds the fences that contain each fix.
+
+    :Parameters:
+        * batch (:class:`FixBatch`)
+        * geometry (list) - (fenceid, lat, lon, radius) tuples, for example
+            from ``FenceIndex.geometry``.
+
+    :Returns: (list) - (mdn, fenceids) pairs for the fixes inside at least
+        one fence.
+    """
+    found = []
+    for (mdn, lat, lon, hepe) in batch:
+        fenceids = [fenceid for (fenceid, fence_lat, fence_lon, radius)
+                    in geometry
+                    if haversine(lat, lon, fence_lat, fence_lon) <= radius]
+        if fenceids:
+            found.append((mdn, fenceids))
+    return found
+
+
+def dms(batch):
+    """Formats each fix in degrees, minutes and seconds.
+
+    :Returns: (list) - (mdn, latitude, longitude) tuples of strings.
+    """
+    formatted = []
+    for (mdn, lat, lon, hepe) in batch:
+        coordinates = Coordinates((lat, lon))
+        formatted.append((mdn, str(coordinates.latitude),
+                          str(coordinates.longitude)))
+    return formatted
+
+
+def _apply(task):
+    (func, batch, args) = task
+    return func(batch, *args)
+
+
+_DONE = object()
+
+
+class _Cancelled(Exception):
+    """Stops locating once the consumer of the batches has gone."""
+
+
+class LocationPipeline(object):
+    """Locates MDNs on threads and processes the fixes on processes.
+
+    :Parameters:
+        * location (:class:`sprintkit.services.Location`) - Used to locate
+            the devices.
+        * concurrency (integer) - The number of requests kept in flight.
+        * batch_size (integer) - The number of fixes sent to a process at a
+            time.
+        * processes (integer) - The size of the process pool (default=the
+            number of CPUs).
+
+    :Attributes: summary (:class:`sprintkit.bulk.BulkSummary`) - The outcome
+        of locating the devices, set once every MDN has been processed.
+
+    .. note::
+        The requests are made by :func:`sprintkit.bulk.run_bulk`, and each
+        response is decoded straight into a :class:`FixBatch`. Full batches
+        are handed to a `multiprocessing` pool while the threads keep
+        locating, so the CPU bound work is not held back by the GIL and
+        the network is never idle. To find the distance of every device
+        from Sprint's headquarters::
+
+            pipeline = LocationPipeline(location)
+            for results in pipeline.map(distances, mdns, 38.9148, -94.6577):
+                for (mdn, meters) in results:
+                    print mdn, meters
+
+        `func` must be a module level function so that it can be sent to
+        the processes. It is called as ``func(batch, *args)``.
+
+    """
+
+    def __init__(self, location, concurrency=8, batch_size=1000,
+                 processes=None):
+        self.location = location
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.processes = processes
+        self.summary = None
+
+    def batches(self, mdns):
+        """Locate the MDNs.
+
+        :Returns: (generator) - :class:`FixBatch` objects, in the order the
+            fixes arrive.
+
+        .. note::
+            Closing the generator before the last batch (or dropping it)
+            stops locating the remaining MDNs. The requests already in
+            flight finish in the background and their fixes are dropped.
+
+            The MDNs are located within the deadline and trace context in
+            effect when the first batch is asked for.
+        """
+        queue = Queue.Queue(maxsize=self.concurrency)
+        lock = threading.Lock()
+        current = [FixBatch()]
+        outcome = []
+        cancelled = threading.Event()
+
+        def put(item):
+            # Nobody reads the queue once the consumer has gone.
+            while not cancelled.is_set():
+                try:
+                    queue.put(item, True, 0.1)
+                    return
+                except Queue.Full:
+                    pass
+
+        def locate(mdn):
+            if cancelled.is_set():
+                raise _Cancelled()
+            data = self.location.get_location(mdn)
+            try:
+                lat = float(data['lat'])
+                lon = float(data['lon'])
+                hepe = float(data['accuracy'])
+            except KeyError as e:
+                raise errors.ParsingError("Missing %s" % e, data)
+            except ValueError as e:
+                raise errors.ParsingError(e, data)
+            full = None
+            lock.acquire()
+            try:
+                current[0].append(mdn, lat, lon, hepe)
+                if len(current[0]) >= self.batch_size:
+                    full = current[0]
+                    current[0] = FixBatch()
+            finally:
+                lock.release()
+            if full is not None:
+                put(full)
+
+        within = deadline.current()
+        context = hooks.context()
+
+        def run():
+            try:
+                with deadline.within(within):
+                    with hooks.restore(context):
+                        outcome.append(run_bulk(locate, mdns,
+                                                self.concurrency))
+            except Exception as e:
+                outcome.append(e)
+            if len(current[0]):
+                put(current[0])
+            put(_DONE)
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        finished = False
+        try:
+            while True:
+                batch = queue.get()
+                if batch is _DONE:
+                    break
+                yield batch
+            finished = True
+        finally:
+            if not finished:
+                cancelled.set()
+        thread.join()
+        if isinstance(outcome[0], Exception):
+            raise outcome[0]
+        self.summary = outcome[0]
+
+    def map(self, func, mdns, *args):
+        """Locate the MDNs and call ``func(batch, *args)`` on each
+        :class:`FixBatch` in the process pool.
+
+        :Returns: (generator) - The result of each call, in the order of
+            the batches.
+        """
+        processes = self.processes or multiprocessing.cpu_count()
+        pool = multiprocessing.Pool(processes)
+        pending = collections.deque()
+        batches = self.batches(mdns)
+        try:
+            for batch in batches:
+                pending.append(pool.apply_async(_apply, ((func, batch, args),)))
+                while pending and (pending[0].ready() or
+                                   len(pending) > 2 * processes):
+                    yield pending.popleft().get()
+            while pending:
+                yield pending.popleft().get()
+        finally:
+            batches.close()
+            pool.terminate()
+            pool.join()
+
+
+UNREACHABLE = 'UNREACHABLE'
+"""The error code of the MDNs :class:`GatedLocator` did not locate because
+they are not reachable."""
+
+
+class GatedLocator(object):
+    """Locates only the MDNs that the Presence service finds reachable.
+
+    :Parameters:
+        * presence (:class:`sprintkit.services.Presence`) - Used to check
+            the devices.
+        * location (:class:`sprintkit.services.Location`) - Used to locate
+            the reachable devices.
+        * negative_ttl (float) - Seconds an MDN found unreachable is not
+            checked again.
+        * concurrency (integer) - The number of requests kept in flight by
+            each stage.
+        * metrics (:class:`sprintkit.metrics.Registry`) - Where the stages
+            are recorded (default=a new Registry).
+
+    :Attributes:
+        * summary (:class:`sprintkit.bulk.BulkSummary`) - The outcome of the
+            last call to :meth:`locate_if_reachable`. MDNs that are not
+            reachable fail with the code :data:`UNREACHABLE`.
+        * cached (integer) - The MDNs skipped because they were recently
+            found unreachable.
+
+    .. note::
+        A device that is turned off cannot be located, and a presence
+        check costs less than a location request. The two stages run at
+        once: each MDN is handed to the location stage as soon as it is
+        found reachable. Unreachable MDNs are remembered for
+        `negative_ttl` seconds and skip both stages until then.
+
+        The `metrics` record the stages as the endpoints 'presence' and
+        'location', with the time each MDN spent in the stage in the
+        'network' phase, so they can be exported like the request
+        metrics.
+    """
+
+    def __init__(self, presence, location, negative_ttl=60, concurrency=8,
+                 metrics=None):
+        self.presence = presence
+        self.location = location
+        self.negative_ttl = negative_ttl
+        self.concurrency = concurrency
+        self.metrics = metrics if metrics is not None else Registry()
+        self.summary = None
+        self.cached = 0
+        self._unreachable = {}
+        self._lock = threading.Lock()
+
+    def _known_unreachable(self, mdn, now):
+        expires = self._unreachable.get(mdn)
+        if expires is None:
+            return False
+        if expires > now:
+            return True
+        self._lock.acquire()
+        try:
+            if self._unreachable.get(mdn) == expires:
+                del self._unreachable[mdn]
+        finally:
+            self._lock.release()
+        return False
+
+    def _stage(self, name, func, mdn):
+        metrics = self.metrics.endpoint(name)
+        start = time.time()
+        try:
+            result = func(mdn)
+        except Exception as e:
+            metrics.error(e)
+            raise
+        metrics.record(time.time() - start)
+        return result
+
+    def locate_if_reachable(self, mdns):
+        """Check each MDN's presence and locate the reachable ones.
+
+        :Parameters: mdns (iterable) - The MDNs to locate.
+
+        :Returns: (dict) - Maps each MDN that was located to its
+            :class:`sprintkit.gps.Gps2dFix`. The other MDNs are in
+            `summary.failed`.
+        """
+        # Unbounded, so that the presence stage never waits on a location
+        # stage that has stopped.
+        reachable = Queue.Queue()
+        unreachable = []
+        fixes = {}
+        outcome = []
+
+        def check(mdn):
+            status = self._stage('presence', self.presence.status, mdn)
+            if status.reachable:
+                reachable.put(mdn)
+                return
+            self._lock.acquire()
+            try:
+                self._unreachable[mdn] = time.time() + self.negative_ttl
+                unreachable.append(mdn)
+            finally:
+                self._lock.release()
+
+        def locate(mdn):
+            fixes[mdn] = self._stage('location', self.location.locate, mdn)
+
+        def gate():
+            now = time.time()
+            for mdn in mdns:
+                if self._known_unreachable(mdn, now):
+                    self.cached += 1
+                    unreachable.append(mdn)
+                else:
+                    yield mdn
+
+        within = deadline.current()
+        context = hooks.context()
+
+        def run():
+            try:
+                with deadline.within(within):
+                    with hooks.restore(context):
+                        outcome.append(run_bulk(check, gate(),
+                                                self.concurrency))
+            except Exception as e:
+                outcome.append(e)
+            reachable.put(_DONE)
+
+        thread = threading.Thread(target=run)
+        thread.daemon = True
+        thread.start()
+        located = run_bulk(locate, iter(reachable.get, _DONE),
+                           self.concurrency)
+        thread.join()
+        if isinstance(outcome[0], Exception):
+            raise outcome[0]
+        summary = BulkSummary()
+        summary.succeeded = located.succeeded
+        summary.failed.update(outcome[0].failed)
+        summary.failed.update(located.failed)
+        for mdn in unreachable:
+            summary.failed[mdn] = UNREACHABLE
+        self.summary = summary
+        return fixes
@@ -0,0 +1,266 @@
+"""
+sprintkit.polling
+=================
+
+Polls the location of tracked devices, each as often as its movement
+calls for, within a budget of Sandbox requests.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import heapq
+import itertools
+import threading
+import time
+
+from sprintkit.bulk import run_bulk
+from sprintkit.governor import RateLimiter
+
+
+class Track(object):
+    """The polling state of one device.
+
+    :Attributes:
+        * mdn (string) - The MDN of the device.
+        * interval (float) - Seconds between polls.
+        * due (float) - When the device is next polled, from
+            ``time.time()``.
+        * fix (:class:`sprintkit.gps.Gps2dFix`) - The last fix, or None.
+        * located (float) - When the last fix was taken.
+        * failures (integer) - The polls that failed since the last fix.
+    """
+    __slots__ = ['mdn', 'interval', 'due', 'fix', 'located', 'failures']
+
+    def __init__(self, mdn, interval, due):
+        self.mdn = mdn
+        self.interval = interval
+        self.due = due
+        self.fix = None
+        self.located = None
+        self.failures = 0
+
+    def __repr__(self):
+        return "Track(%r, %r)" % (self.mdn, self.interval)
+
+
+class PollingScheduler(object):
+    """Keeps the tracked devices in a queue ordered by when each is due,
+    and locates the devices that are due concurrently.
+
+    :Parameters:
+        * location (:class:`sprintkit.services.Location`) - Used to locate
+            the devices.
+        * rate (float) - The most locate requests per second, for all the
+            devices together.
+        * on_fix (callable) - Called as ``on_fix(mdn, fix)`` with every new
+            fix, for example :meth:`sprintkit.monitor.Monitor.update`
+            (default=None).
+        * target_distance (float) - The meters a device should move
+            between two polls.
+        * min_interval (float) - The fewest seconds between polls of a
+            device.
+        * max_interval (float) - The most seconds between polls of a device.
+        * initial_interval (float) - The interval of a newly tracked device.
+        * concurrency (integer) - The number of requests kept in flight.
+
+    .. note::
+        After each fix the device's speed is estimated from the distance
+        to its previous fix (less the HEPE of both fixes, so that noise is
+        not mistaken for movement), and its interval moves half way towards
+        the time it takes to cover `target_distance` at that speed.
+        Stationary devices back off to `max_interval` while moving ones are
+        polled up to every `min_interval`. A failed poll doubles the
+        interval.
+
+        Devices are polled most overdue first. When the `rate` budget runs
+        out the remaining devices wait for the next :meth:`poll`, so a
+        fleet larger than the budget is polled as often as the budget
+        allows, favoring the devices that move.
+    """
+
+    def __init__(self, location, rate, on_fix=None, target_distance=500,
+                 min_interval=60, max_interval=3600, initial_interval=300,
+                 concurrency=8):
+        self.location = location
+        self.budget = RateLimiter(rate)
+        self.on_fix = on_fix
+        self.target_distance = target_distance
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.initial_interval = initial_interval
+        self.concurrency = concurrency
+        self.tracks = {}
+        """Maps each tracked MDN to its :class:`Track`."""
+        self._queue = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _push(self, track):
+        heapq.heappush(self._queue, (track.due, next(self._sequence), track))
+
+    def track(self, mdn, interval=None, due=None):
+        """Start polling a device.
+
+        :Parameters:
+            * mdn (string) - The MDN of the device.
+            * interval (float) - Its first interval
+                (default=`initial_interval`).
+            * due (float) - When it is first polled (default=now).
+        """
+        self._lock.acquire()
+        try:
+            track = Track(mdn, interval or self.initial_interval,
+                          due or time.time())
+            self.tracks[mdn] = track
+            self._push(track)
+        finally:
+            self._lock.release()
+
+    def untrack(self, mdn):
+        """Stop polling a device."""
+        self._lock.acquire()
+        try:
+            self.tracks.pop(mdn, None)
+        finally:
+            self._lock.release()
+
+    def next_due(self):
+        """Returns when the next device is due, or None if none are
+        tracked."""
+        self._lock.acquire()
+        try:
+            self._discard()
+            if not self._queue:
+                return None
+            return self._queue[0][0]
+        finally:
+            self._lock.release()
+
+    def _discard(self):
+        """Drop the queue entries of untracked or rescheduled devices."""
+        queue = self._queue
+        while queue:
+            (due, sequence, track) = queue[0]
+            if self.tracks.get(track.mdn) is track and track.due == due:
+                return
+            heapq.heappop(queue)
+
+    def due(self, now=None):
+        """Take the devices that are due, as many as the rate budget
+        allows.
+
+        :Returns: (list) - The :class:`Track` of each device taken.
+        """
+        if now is None:
+            now = time.time()
+        taken = []
+        self._lock.acquire()
+        try:
+            while True:
+                self._discard()
+                if not self._queue or self._queue[0][0] > now:
+                    break
+                if not self.budget.try_acquire():
+                    break
+                taken.append(heapq.heappop(self._queue)[2])
+        finally:
+            self._lock.release()
+        return taken
+
+    def poll(self, now=None):
+        """Locate the devices that are due and schedule their next polls.
+
+        :Returns: (:class:`sprintkit.bulk.BulkSummary`) - The outcome of
+            the polls.
+
+        .. note::
+            When an exception stops the polls, for example one raised by
+            `on_fix`, the devices that were not polled stay due.
+        """
+        tracks = dict((track.mdn, track) for track in self.due(now))
+        rescheduled = set()
+
+        def locate(mdn):
+            track = tracks[mdn]
+            try:
+                fix = self.location.locate(mdn)
+            except Exception:
+                self._reschedule(track, None)
+                rescheduled.add(mdn)
+                raise
+            self._reschedule(track, fix)
+            rescheduled.add(mdn)
+            if self.on_fix is not None:
+                self.on_fix(mdn, fix)
+
+        try:
+            return run_bulk(locate, list(tracks), self.concurrency)
+        finally:
+            # Put back the devices that were not polled, as when `on_fix`
+            # raises an exception that stops run_bulk.
+            self._lock.acquire()
+            try:
+                for mdn, track in tracks.items():
+                    if (mdn not in rescheduled and
+                            self.tracks.get(mdn) is track):
+                        self._push(track)
+            finally:
+                self._lock.release()
+
+    def _reschedule(self, track, fix):
+        now = time.time()
+        if fix is None:
+            track.failures += 1
+            interval = track.interval * 2
+        else:
+            interval = self.adapt(track, fix, now)
+            track.fix = fix
+            track.located = now
+            track.failures = 0
+        track.interval = min(max(interval, self.min_interval),
+                             self.max_interval)
+        self._lock.acquire()
+        try:
+            if self.tracks.get(track.mdn) is track:
+                track.due = now + track.interval
+                self._push(track)
+        finally:
+            self._lock.release()
+
+    def adapt(self, track, fix, now):
+        """Returns the interval of a device after a new `fix`, before it is
+        limited to `min_interval` and `max_interval`."""
+        if track.fix is None:
+            return track.interval
+        elapsed = max(now - track.located, 1e-3)
+        moved = fix.coordinates - track.fix.coordinates
+        noise = (_hepe(fix) + _hepe(track.fix)) / 2.0
+        moved = max(moved - noise, 0)
+        if moved == 0:
+            ideal = self.max_interval
+        else:
+            ideal = self.target_distance * elapsed / moved
+        return (track.interval + ideal) / 2.0
+
+    def run(self, stop, idle=1.0):
+        """Poll the devices as they come due until `stop` is set.
+
+        :Parameters:
+            * stop (:class:`threading.Event`) - Set it to stop polling.
+            * idle (float) - The most seconds to wait between checks for
+                due devices.
+        """
+        while not stop.is_set():
+            self.poll()
+            due = self.next_due()
+            if due is None:
+                wait = idle
+            else:
+                wait = min(max(due - time.time(), 1.0 / self.budget.rate),
+                           idle)
+            stop.wait(wait)
+
+
+def _hepe(fix):
+    return (fix.errors or {}).get('hepe', 0)
@@ -0,0 +1,261 @@
+"""
+sprintkit.results
+=================
+
+Compact result objects built from Sandbox responses.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+import collections
+
+from sprintkit import decoding, errors
+from sprintkit.gps import Coordinates
+
+
+def decoder(cls, *args):
+    """Build a response decoder that creates a `cls` result.
+
+    :Parameters:
+        * cls (class) - A :class:`Result` sub-class.
+        * args - Extra arguments passed on to ``cls.from_data``.
+
+    :Returns: (function) - A decoder for
+        :meth:`sprintkit.services.SandboxResource.parse_response`.
+
+    .. note::
+        Responses carrying a Sandbox `error` are returned as the decoded
+        dict, so that they are still raised by `parse_errors`.
+    """
+    def decode(body):
+        data = decoding.loads(body)
+        if 'error' in data:
+            return data
+        return cls.from_data(data, body, *args)
+    return decode
+
+
+class Result(object):
+    """Base class for result objects.
+
+    The Sandbox data a result was built from is available from its `raw`
+    attribute, which is only decoded again when first accessed. Results
+    can also be indexed like the raw data dict, for example
+    ``result['status']``.
+
+    """
+    __slots__ = ['_raw']
+
+    def __init__(self, raw):
+        self._raw = raw
+
+    @property
+    def raw(self):
+        """(dict) - The raw Sandbox JSON data."""
+        if isinstance(self._raw, basestring):
+            self._raw = decoding.loads(self._raw)
+        return self._raw
+
+    def __getitem__(self, key):
+        return self.raw[key]
+
+    def __contains__(self, key):
+        return key in self.raw
+
+    def get(self, key, default=None):
+        return self.raw.get(key, default)
+
+    def keys(self):
+        return self.raw.keys()
+
+
+SmsMessage = collections.namedtuple('SmsMessage', 'mdn status tranno gcode')
+"""The delivery status of a message to one MDN."""
+
+
+class SmsResult(Result):
+    """The result of sending an SMS message.
+
+    :Attributes:
+        * messages (tuple) - A :data:`SmsMessage` for each MDN.
+    """
+    __slots__ = ['messages']
+
+    def __init__(self, messages, raw=None):
+        self.messages = messages
+        Result.__init__(self, raw)
+
+    @classmethod
+    def from_data(cls, data, raw):
+        #We only report the first error we find
+        errs = [k for k in data.keys() if k != 'MessagingResponse']
+        if errs:
+            raise errors.SandboxError(errs[0])
+        try:
+            messages = tuple(SmsMessage(str(msg['mdn']), str(msg['status']),
+                                        msg.get('tranno'), msg.get('gcode'))
+                             for msg in data['MessagingResponse'])
+        except KeyError as e:
+            raise errors.ParsingError("Missing %s" % e, data)
+        return cls(messages, raw)
+
+    @property
+    def sent(self):
+        """(bool) - True if the message was accepted for every MDN."""
+        return all(msg.status == 'S' for msg in self.messages)
+
+    def __repr__(self):
+        return "SmsResult(%r)" % (self.messages,)
+
+
+class PresenceResult(Result):
+    """The presence status of an MDN.
+
+    :Attributes:
+        * mdn (string) - The MDN that was checked.
+        * reachable (bool) - True if the MDN is reachable.
+    """
+    __slots__ = ['mdn', 'reachable']
+
+    def __init__(self, mdn, reachable, raw=None):
+        self.mdn = mdn
+        self.reachable = reachable
+        Result.__init__(self, raw)
+
+    @classmethod
+    def from_data(cls, data, raw, mdn=None):
+        try:
+            status = data['status']
+        except KeyError:
+            raise errors.ParsingError("KeyError: 'status'.", data)
+        if status != 'Reachable' and status != 'Unreachable':
+            raise errors.ParsingError("ValueError: 'status' is incorrect.",
+                                      data)
+        return cls(mdn, status == 'Reachable', raw)
+
+    def __repr__(self):
+        return "PresenceResult(%r, %r)" % (self.mdn, self.reachable)
+
+
+class PerimeterResult(Result):
+    """The result of a perimeter check.
+
+    :Attributes:
+        * mdn (string) - The MDN that was checked.
+        * inside (bool) - True if the MDN is inside the perimeter.
+        * latitude (float) - The latitude of the device.
+        * longitude (float) - The longitude of the device.
+        * accuracy (float) - The HEPE of the location in meters.
+    """
+    __slots__ = ['mdn', 'inside', 'latitude', 'longitude', 'accuracy']
+
+    def __init__(self, mdn, inside, latitude, longitude, accuracy, raw=None):
+        self.mdn = mdn
+        self.inside = inside
+        self.latitude = latitude
+        self.longitude = longitude
+        self.accuracy = accuracy
+        Result.__init__(self, raw)
+
+    @classmethod
+    def from_data(cls, data, raw, mdn=None):
+        try:
+            lat = float(data['Latitude'])
+            lon = float(data['Longitude'])
+            accuracy = float(data['Accuracy'])
+            status = data['CurrentLocation']
+        except KeyError as e:
+            raise errors.ParsingError("Missing %s" % e, data)
+        except ValueError as e:
+            raise errors.ParsingError(e, data)
+        if status != 'INSIDE' and status != 'OUTSIDE':
+            raise errors.ParsingError("ValueError for CurrentLocation", data)
+        return cls(mdn, status == 'INSIDE', lat, lon, accuracy, raw)
+
+    @property
+    def coordinates(self):
+        """(:class:`sprintkit.gps.Coordinates`) - The device location."""
+        return Coordinates((self.latitude, self.longitude))
+
+    def __repr__(self):
+        return "PerimeterResult(%r, %r)" % (self.mdn, self.inside)
+
+
+class FenceRecord(Result):
+    """A geofence as listed by `geofence/list.json`.
+
+    :Attributes:
+        * fenceid (integer), name (string), latitude (float),
+          longitude (float), radius (integer), days (string),
+          start_time (string), end_time (string), status (string) and
+          notify_event (string) - See :class:`sprintkit.services.Fence`.
+    """
+    __slots__ = ['fenceid', 'name', 'latitude', 'longitude', 'radius', 'days',
+                 'start_time', 'end_time', 'status', 'notify_event']
+
+    def __init__(self, fenceid, name, latitude, longitude, radius, days,
+                 start_time, end_time, status, notify_event='both', raw=None):
+        self.fenceid = fenceid
+        self.name = name
+        self.latitude = latitude
+        self.longitude = longitude
+        self.radius = radius
+        self.days = days
+        self.start_time = start_time
+        self.end_time = end_time
+        self.status = status
+        self.notify_event = notify_event
+        Result.__init__(self, raw)
+
+    @classmethod
+    def from_data(cls, data, raw=None):
+        try:
+            return cls(int(data['FenceID']), data['Name'],
+                       float(data['Latitude']), float(data['Longitude']),
+                       int(data['Dimensions']), data['Days'],
+                       data['StartTime'], data['EndTime'],
+                       data['Status'].lower(),
+                       data.get('NotifyEvent', 'both').lower(),
+                       raw if raw is not None else data)
+        except KeyError as e:
+            raise errors.ParsingError("KeyError '%s'." % e, data)
+        except ValueError as e:
+            raise errors.ParsingError(e, data)
+
+    @property
+    def coordinates(self):
+        """(:class:`sprintkit.gps.Coordinates`) - The center of the fence."""
+        return Coordinates((self.latitude, self.longitude))
+
+    def __repr__(self):
+        return "FenceRecord(%r, %r)" % (self.fenceid, self.name)
+
+
+def fence_records(body):
+    """Decodes `geofence/list.json`, replacing each fence in the `Fence`
+    list with a :class:`FenceRecord`."""
+    data = decoding.loads(body)
+    if 'Fence' in data:
+        data['Fence'] = [FenceRecord.from_data(fence)
+                         for fence in data['Fence'] if 'Message' not in fence]
+    return data
+
+
+class DeviceStatus(Result):
+    """The authorization status of a device in a developer account.
+
+    :Attributes:
+        * mdn (string) - The MDN of the device.
+        * status (string) - One of 'approved', 'declined', 'pending' or
+            'deleted'.
+    """
+    __slots__ = ['mdn', 'status']
+
+    def __init__(self, mdn, status, raw=None):
+        self.mdn = mdn
+        self.status = status
+        Result.__init__(self, raw)
+
+    def __repr__(self):
+        return "DeviceStatus(%r, %r)" % (self.mdn, self.status)
@@ -0,0 +1,159 @@
+"""
+sprintkit.schedule
+==================
+
+Evaluates geofence schedules locally, without calling the Sandbox.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+from datetime import timedelta
+
+
+DAYS = 'SMTWHFA'
+"""The Sandbox day letters, starting with Sunday."""
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+_FULL_WEEK = (1 << MINUTES_PER_WEEK) - 1
+
+
+def parse_time(value):
+    """Convert a Sandbox "HHMM" time string into minutes after midnight.
+
+    :Raises: ValueError - If `value` is not a valid "HHMM" time.
+    """
+    value = str(value)
+    if len(value) != 4 or not value.isdigit():
+        raise ValueError("Time must be in the format HHMM: %s" % value)
+    hours, minutes = int(value[:2]), int(value[2:])
+    if hours > 23 or minutes > 59:
+        raise ValueError("Time must be in the range 0000 to 2359: %s" % value)
+    return hours * 60 + minutes
+
+
+def minute_of_week(when):
+    """The number of minutes `when` falls after midnight on Sunday."""
+    day = (when.weekday() + 1) % 7
+    return day * MINUTES_PER_DAY + when.hour * 60 + when.minute
+
+
+class Schedule(object):
+    """A fence schedule compiled into a bitmask of the minutes in a week.
+
+    :Parameters:
+        * days (string) - The days of the week the fence is monitored
+            [SMTWHFA].
+        * start_time (string) - The time the fence becomes active "HHMM".
+        * end_time (string) - The time the fence becomes inactive "HHMM".
+
+    .. note::
+        Bit `n` of `mask` is set when the fence is active `n` minutes after
+        midnight on Sunday. A fence whose `end_time` is earlier than its
+        `start_time` runs past midnight into the following day, and a fence
+        whose `start_time` equals its `end_time` runs for 24 hours.
+
+        Schedules are compared in the fence's own local time, so pass
+        datetimes in the same timezone the fence times were given in. Use
+        :meth:`compile` to share one instance between fences with the same
+        schedule.
+
+    """
+    __slots__ = ['days', 'start_time', 'end_time', 'mask']
+
+    _cache = {}
+
+    def __init__(self, days, start_time, end_time):
+        self.days = days.upper()
+        self.start_time = start_time
+        self.end_time = end_time
+        start = parse_time(start_time)
+        end = parse_time(end_time)
+        length = (end - start) % MINUTES_PER_DAY or MINUTES_PER_DAY
+        span = (1 << length) - 1
+        mask = 0
+        for letter in self.days:
+            try:
+                day = DAYS.index(letter)
+            except ValueError:
+                raise ValueError("Days must be in [SMTWHFA]: %s" % days)
+            mask |= span << (day * MINUTES_PER_DAY + start)
+        # Fold a Saturday night span over into Sunday morning
+        self.mask = (mask | (mask >> MINUTES_PER_WEEK)) & _FULL_WEEK
+
+    @classmethod
+    def compile(cls, days, start_time, end_time):
+        """Return the (shared) Schedule for these fence settings."""
+        key = (days, start_time, end_time)
+        schedule = cls._cache.get(key)
+        if schedule is None:
+            schedule = cls._cache[key] = cls(days, start_time, end_time)
+        return schedule
+
+    def __repr__(self):
+        return "Schedule(%r, %r, %r)" % (self.days, self.start_time,
+                                         self.end_time)
+
+    def is_active_at(self, when):
+        """Returns True if the schedule is active at the datetime `when`."""
+        return bool((self.mask >> minute_of_week(when)) & 1)
+
+    def next_transition(self, when):
+        """Find when the schedule next turns on or off after `when`.
+
+        :Returns: (datetime) - The start of the first minute after `when`
+            in which the schedule changes state, or None if it never does.
+
+        """
+        minute = minute_of_week(when)
+        rotated = ((self.mask >> minute) |
+                   (self.mask << (MINUTES_PER_WEEK - minute))) & _FULL_WEEK
+        if rotated & 1:
+            rotated = ~rotated & _FULL_WEEK
+        if not rotated:
+            return None
+        offset = (rotated & -rotated).bit_length() - 1
+        start = when.replace(second=0, microsecond=0)
+        return start + timedelta(minutes=offset)
+
+
+class ScheduleIndex(object):
+    """Evaluates the schedules of a whole catalog of fences at once.
+
+    :Parameters: fences (list) - The :class:`sprintkit.services.Fence`
+        objects, as returned by :meth:`sprintkit.services.GeoFence.fences`.
+
+    .. note::
+        Fences are grouped by their compiled :class:`Schedule`, so each
+        query costs one bit test per distinct schedule rather than one per
+        fence. Only fences whose status is 'active' are included.
+
+    """
+
+    def __init__(self, fences):
+        groups = {}
+        for fence in fences:
+            if fence.status != 'active':
+                continue
+            groups.setdefault(fence.schedule, []).append(fence)
+        self.groups = groups.items()
+
+    def active_at(self, when):
+        """Returns the list of fences being monitored at the datetime `when`."""
+        minute = minute_of_week(when)
+        active = []
+        for schedule, fences in self.groups:
+            if (schedule.mask >> minute) & 1:
+                active.extend(fences)
+        return active
+
+    def next_transition(self, when):
+        """Returns the earliest datetime after `when` at which any fence in
+        the index turns on or off, or None if none ever do."""
+        transitions = [schedule.next_transition(when)
+                       for schedule, fences in self.groups]
+        transitions = [t for t in transitions if t is not None]
+        if transitions:
+            return min(transitions)
+        return None
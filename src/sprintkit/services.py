@@ -8,20 +8,31 @@ Implementations of most Developer Sandbox Services.
 :License: MIT, see LICENSE for more details.
 """
 
-from ConfigParser import SafeConfigParser
 from datetime import datetime
 from hashlib import md5
-import json
 import os
+import socket
+import threading
 import time
 import urlparse
-import uuid
 
-from restkit import Resource
+from restkit import Client, Resource
+from restkit.client import _ssl_wrapper, have_ssl
 from restkit.errors import RequestError, RequestTimeout, ResourceError
+from restkit.sock import close, validate_ssl_args
+from restkit.util import parse_netloc
 
-from sprintkit import errors
+from sprintkit import deadline, decoding, dns, errors, results
+from sprintkit.hooks import RequestEvent
+from sprintkit.bulk import run_bulk
+from sprintkit.executor import default_executor
 from sprintkit.gps import Coordinates, Gps2dFix
+from sprintkit.membership import Membership
+from sprintkit.schedule import Schedule
+
+
+_membership_lock = threading.Lock()
+_default_lock = threading.Lock()
 
 
 class Config(dict):
@@ -57,19 +68,73 @@ class Config(dict):
 
     '''
 
+    reload_interval = 1.0
+    """Seconds between checks of the default config file for changes."""
+
+    _default = None
+    _default_key = None
+    _default_checked = 0
+
     def __init__(self, path=None):
         if path == None:
-            home_dir = os.path.expanduser('~')
-            run_dir = os.getcwd()
-            default_runpath = os.path.join(run_dir, "sprintkit.conf")
-            default_homepath = os.path.join(home_dir, ".sprintkit.conf")
-            if os.path.exists(default_runpath):
-                self.path = default_runpath
-            else:
-                self.path = default_homepath
+            self.path = self.default_path()
         else:
             self.path = path
 
+    @staticmethod
+    def default_path():
+        """Returns the path of the default config file, `sprintkit.conf` in
+        the current working directory if there is one, otherwise
+        `$HOME/.sprintkit.conf`."""
+        default_runpath = os.path.join(os.getcwd(), "sprintkit.conf")
+        if os.path.exists(default_runpath):
+            return default_runpath
+        return os.path.join(os.path.expanduser('~'), ".sprintkit.conf")
+
+    @classmethod
+    def default(cls):
+        """Returns the default configuration, loaded once per process.
+
+        :Returns: (:class:`FrozenConfig`)
+
+        :Raises: (:class:`sprintkit.errors.SprintKitError`) - If config
+            file could not be found.
+
+        .. note::
+            The config file is parsed on the first call only. Later calls
+            return the same FrozenConfig, and check at most every
+            `reload_interval` seconds whether the file or the `SPRINTKEY`
+            and `SPRINTSECRET` environment variables have changed, in which
+            case it is loaded again. This is what resources created without
+            a `config` use, so creating them does no file I/O.
+        """
+        now = time.time()
+        default = cls._default
+        if default is not None and now - cls._default_checked < cls.reload_interval:
+            return default
+        _default_lock.acquire()
+        try:
+            path = cls.default_path()
+            try:
+                mtime = os.stat(path).st_mtime
+            except OSError:
+                mtime = None
+            key = (path, mtime, os.environ.get('SPRINTKEY'),
+                   os.environ.get('SPRINTSECRET'))
+            if cls._default is None or key != cls._default_key:
+                cls._default = cls(path).load().freeze()
+                cls._default_key = key
+            cls._default_checked = now
+            return cls._default
+        finally:
+            _default_lock.release()
+
+    def freeze(self):
+        """Returns a :class:`FrozenConfig` copy of this config."""
+        frozen = FrozenConfig(self)
+        frozen.path = self.path
+        return frozen
+
     def load(self):
         """Read the configuration file from path stored in `self.path`.
         
@@ -78,6 +143,7 @@ class Config(dict):
         
         """
         if os.path.exists(self.path):
+            from ConfigParser import SafeConfigParser
             config = {}
             config_file = open(self.path, 'r')
             parser = SafeConfigParser()
@@ -92,6 +158,122 @@ class Config(dict):
         return self
 
 
+def _frozen(self, *args, **kwargs):
+    raise TypeError("A FrozenConfig can not be changed, use a Config instead.")
+
+
+class FrozenConfig(Config):
+    """A :class:`Config` that can not be changed once created.
+
+    :Parameters: config (dict) - The configuration values.
+
+    .. note::
+        A FrozenConfig is hashable, so it can be used as a dictionary key,
+        and can be shared by any number of resources and threads. Create
+        one with :meth:`Config.freeze` or :meth:`Config.default`.
+    """
+
+    def __init__(self, config=()):
+        dict.__init__(self, config)
+        self.path = None
+        self._hash = hash(frozenset(self.items()))
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),), {'path': self.path})
+
+    def load(self):
+        raise TypeError("A FrozenConfig can not be loaded, use a Config "
+                        "instead.")
+
+    def freeze(self):
+        return self
+
+    __setitem__ = __delitem__ = update = setdefault = pop = popitem = \
+        clear = _frozen
+
+
+def _limit_reads(response):
+    """Limit the socket timeout of a response still being read to the time
+    left before the deadline."""
+    timeout = deadline.remaining()
+    connection = getattr(response, 'connection', None)
+    if timeout is not None and connection is not None:
+        connection.socket().settimeout(max(timeout, 1e-3))
+
+
+class SandboxClient(Client):
+    """A restkit Client that resolves host names with the shared
+    :data:`sprintkit.dns.cache`."""
+
+    def connect(self, addr, is_ssl):
+        for res in dns.cache.getaddrinfo(addr[0], addr[1], 0,
+                                         socket.SOCK_STREAM):
+            af, socktype, proto, canonname, sa = res
+            sck = None
+            try:
+                sck = socket.socket(af, socktype, proto)
+                if self.timeout is not None:
+                    sck.settimeout(self.timeout)
+                sck.connect(sa)
+                if is_ssl:
+                    if not have_ssl:
+                        raise ValueError("https isn't supported.")
+                    validate_ssl_args(self.ssl_args)
+                    sck = _ssl_wrapper(sck, **self.ssl_args)
+                return sck
+            except socket.error:
+                close(sck)
+        dns.cache.invalidate(addr[0])
+        raise socket.error("Can't connect to %s" % str(addr))
+
+    def get_connection(self, request):
+        """Like restkit's, but inside a :mod:`sprintkit.deadline` limit the
+        socket timeout to the time left, so that connecting, sending and
+        reading the response (and each of restkit's own retries) are bounded
+        by the deadline on the calling thread.
+
+        :Raises: :class:`sprintkit.errors.TimeoutError`
+        """
+        configured = self.timeout
+        timeout = deadline.remaining()
+        if timeout is None:
+            timeout = configured
+        else:
+            if timeout <= 0:
+                raise errors.TimeoutError("The deadline passed.")
+            if configured is not None:
+                timeout = min(timeout, configured)
+            self.timeout = timeout
+        try:
+            connection = Client.get_connection(self, request)
+        except socket.timeout:
+            self._timed_out(None)
+            raise
+        finally:
+            self.timeout = configured
+        # A pooled socket may still have the timeout of an earlier deadline.
+        connection.socket().settimeout(timeout)
+        return connection
+
+    def get_response(self, request, connection):
+        try:
+            return Client.get_response(self, request, connection)
+        except socket.timeout:
+            self._timed_out(connection)
+            raise
+
+    def _timed_out(self, connection):
+        """Inside a deadline a socket timeout means the deadline passed, so
+        raise at once rather than let restkit pause and retry."""
+        if deadline.current() is not None:
+            if connection is not None:
+                connection.close()
+            raise errors.TimeoutError("The deadline passed.")
+
+
 class SandboxResource(Resource):
     """A class that manages connections to Sandbox Resources.
     
@@ -100,39 +282,483 @@ class SandboxResource(Resource):
 
     SandboxResource is a sub-class of a restkit Resource, so it accepts all its
     parameters.
+
+    :Parameters:
+        * config (:class:`Config`) - The Sandbox configuration
+            (default=:meth:`Config.default`).
+        * executor (:class:`sprintkit.executor.Executor`) - Runs the
+            requests passed to `submit` (default=the shared executor).
+        * governor (:class:`sprintkit.governor.RateLimiter`) - Limits the
+            rate of requests (default=None).
+        * hedge (:class:`sprintkit.hedging.HedgePolicy`) - Hedges the
+            requests of resources whose requests are safe to repeat
+            (default=None).
+        * breakers (:class:`sprintkit.breaker.Breakers`) - Circuit breakers
+            for the endpoints (default=None).
+        * metrics (:class:`sprintkit.metrics.Registry`) - Records the
+            requests to each endpoint (default=None).
+        * hooks (:class:`sprintkit.hooks.Hooks`) - Callbacks run around
+            each request (default=None).
+        * cache (:class:`sprintkit.cache.ResponseCache`) - Stores the
+            responses of the requests that list fences, devices and
+            recipients (default=None).
+        * transport - Sends the requests in place of restkit, for example
+            a :class:`sprintkit.transport.Replayer` (default=None).
+
+    .. note::
+        Every method that makes Sandbox requests accepts a `timeout`
+        keyword argument, the seconds the whole call may take including
+        any follow-up requests (see :class:`sprintkit.deadline.Deadline`).
+        When it passes, :class:`sprintkit.errors.TimeoutError` is raised.
+
+        A SandboxResource (and each of the service classes) can be shared
+        by any number of threads. Requests never modify the parameters
+        they are given or the `config`, each thread gets its own restkit
+        Client, and all Clients share restkit's global, locked connection
+        pool, so one instance serves a whole pool of worker threads with
+        the same connections. Do not change the `config` while requests
+        are in flight.
     
     """
+
+    idempotent = False
+    """True if requests to this resource can be safely repeated, which is
+    required for them to be hedged."""
     
-    def __init__(self, config=None, **kwargs):
+    def __init__(self, config=None, executor=None, governor=None, hedge=None,
+                 breakers=None, metrics=None, hooks=None, cache=None,
+                 transport=None, **kwargs):
         if config is None:
-            self.config = Config()
+            self.config = Config.default()
             """A :class:`Config` instance for storing Sandbox credentials."""
-            self.config.load()
         else:
             self.config = config
+        self.executor = executor
+        self.governor = governor
+        self.hedge = hedge
+        self.breakers = breakers
+        self.metrics = metrics
+        self.hooks = hooks
+        self.cache = cache
+        self.transport = transport
         self.api_url = urlparse.urlunparse((self.config['protocol'], 
                                             self.config['host'], 
                                             self.config['path'], '', '', '')) 
         super(SandboxResource, self).__init__(self.api_url, 
                                               follow_redirect=True,
                                               max_follow_redirect=10, **kwargs)
+        self.client = SandboxClient(**self.client_opts)
+
+    @property
+    def client(self):
+        """The restkit Client used by the current thread."""
+        local = self._local
+        client = getattr(local, 'client', None)
+        if client is None:
+            client = local.client = SandboxClient(**self.client_opts)
+        return client
+
+    @client.setter
+    def client(self, client):
+        if '_local' not in self.__dict__:
+            self._local = threading.local()
+        self._local.client = client
+
+    @deadline.bounded
+    def warmup(self, connections=1):
+        """Resolve the Sandbox host and open connections to it ahead of the
+        first request.
+
+        :Parameters: connections (integer) - The number of connections to
+            open, at most the size of restkit's connection pool.
+
+        :Returns: (integer) - The number of connections opened.
+
+        :Raises: :class:`sprintkit.errors.ConnectionError`
+
+        .. note::
+            The connections (including their TLS handshakes) are left in
+            restkit's shared connection pool, and the host's address in the
+            shared :data:`sprintkit.dns.cache`, so the first requests of
+            every resource run at their steady state latency. Call it when
+            a short-lived job starts, before it reads its input.
+        """
+        client = self.client
+        manager = client._manager
+        url = urlparse.urlparse(self.api_url)
+        addr = parse_netloc(url)
+        is_ssl = url.scheme == 'https'
+        connections = min(connections, manager.max_conn)
+        for i in range(connections):
+            try:
+                sck = client.connect(addr, is_ssl)
+            except socket.error as e:
+                raise errors.ConnectionError(str(e))
+            manager.store_socket(sck, addr, is_ssl)
+        return connections
+
+    def call(self, endpoint, params, decoder=None):
+        """Sign the `params`, request a Sandbox `endpoint` and parse the
+        response.
+
+        :Parameters:
+            * endpoint (string) - The path of the resource, for example
+                'location.json'.
+            * params (dict) - The URL query parameters, see `sign_params`.
+            * decoder (function) - Decodes the response body, see
+                `parse_response` (default=None).
+
+        :Returns: (dict) - The Sandbox JSON data.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.SandboxError`
 
-    def parse_response(self, response):
+        """
+        if self.hedge is not None and self.idempotent:
+            return self.hedge.call(self, endpoint, params, decoder)
+        params = self.sign(endpoint, params)
+        return self.perform(endpoint, params, decoder)
+
+    def cached_call(self, endpoint, params, decoder=None):
+        """Like `call`, but use the response stored in the resource's
+        `cache` while it is fresh, and store the new response otherwise.
+
+        When the Sandbox cannot be reached a stale response is used if the
+        cache allows it, see :class:`sprintkit.cache.ResponseCache`.
+        """
+        cache = self.cache
+        if cache is None:
+            return self.call(endpoint, params, decoder)
+        scope = self.config['key']
+        found = cache.lookup(scope, endpoint, params)
+        if cache.fresh(found):
+            return self.decode_body(found[0], decoder)
+        bodies = []
+
+        def capture(body):
+            bodies.append(body)
+            return (decoder or decoding.loads)(body)
+
+        try:
+            data = self.call(endpoint, params, capture)
+        except errors.ConnectionError:
+            if cache.usable(found):
+                return self.decode_body(found[0], decoder)
+            raise
+        cache.store(scope, endpoint, params, bodies[-1])
+        return data
+
+    def invalidate(self, endpoint, params=None):
+        """Forget the cached responses of `endpoint` (only the one to the
+        request with `params` if they are given), after a change that made
+        them stale."""
+        if self.cache is not None:
+            self.cache.invalidate(self.config['key'], endpoint, params)
+
+    def submit(self, endpoint, params, decoder=None, attempt=1):
+        """Like `call`, but return at once with a future for the result.
+
+        :Parameters: The same as `call`, and `attempt`, the number of
+            the request among the requests made for one call.
+
+        :Returns: (:class:`sprintkit.executor.Future`) - Call its
+            ``result()`` method to get the Sandbox JSON data, or to raise
+            the exception `call` would have raised.
+
+        .. note::
+            The request is signed on the calling thread and then sent and
+            parsed on a worker thread of the resource's `executor`. While
+            one worker waits on the network the others can sign, send or
+            parse, so submitting a batch of requests before collecting any
+            of their results keeps up to `workers` requests in flight::
+
+                futures = [location.submit('location.json', params)
+                           for params in batch]
+                data = [future.result() for future in futures]
+
+            Connections are reused from restkit's shared connection pool.
+        """
+        params = self.sign(endpoint, params)
+        executor = self.executor or default_executor()
+        return executor.submit(self.perform, endpoint, params, decoder,
+                               attempt)
+
+    def perform(self, endpoint, params, decoder=None, attempt=1):
+        """Request a Sandbox `endpoint` with already signed `params` and
+        parse the response. This is the part of `call` that `submit` runs
+        on a worker thread.
+
+        A :class:`sprintkit.errors.SprintkitError` it raises has its
+        `endpoint`, `mdn`, `elapsed` and `attempt` set."""
+        start = time.time()
+        hooks = self.hooks
+        if hooks is not None:
+            event = RequestEvent(endpoint, params, start)
+            hooks.fire(hooks.before_request, event)
+        breaker = token = None
+        try:
+            self.admit(endpoint)
+            breaker, token = self.breaker(endpoint)
+            if self.metrics is None:
+                response = self.fetch(endpoint, params)
+                data = self.parse_response(response, decoder)
+                self.parse_errors(data)
+            else:
+                data = self.measure(endpoint, params, decoder)
+        except Exception as e:
+            if isinstance(e, errors.SprintkitError):
+                e.endpoint = endpoint
+                e.mdn = params.get('mdn')
+                e.elapsed = time.time() - start
+                e.attempt = attempt
+            if breaker is not None:
+                breaker.record(e, token)
+            if hooks is not None:
+                event.elapsed = time.time() - event.start
+                event.error = e
+                hooks.fire(hooks.on_error, event)
+            raise
+        if breaker is not None:
+            breaker.record(None, token)
+        if hooks is not None:
+            event.elapsed = time.time() - event.start
+            event.result = data
+            hooks.fire(hooks.after_response, event)
+        return data
+
+    def measure(self, endpoint, params, decoder=None):
+        """Like `perform`, but record the time spent in each phase of the
+        request in the `metrics` registry."""
+        metrics = self.metrics.endpoint(endpoint)
+        start = time.time()
+        try:
+            response = self.fetch(endpoint, params)
+            body = self.read_body(response)
+        except Exception as e:
+            metrics.error(e)
+            raise
+        fetched = time.time()
+        try:
+            data = self.decode_body(body, decoder)
+            decoded = time.time()
+            self.parse_errors(data)
+        except Exception as e:
+            metrics.record(fetched - start, size=len(body))
+            metrics.error(e, counted=True)
+            raise
+        metrics.record(fetched - start, decoded - fetched,
+                       time.time() - decoded, len(body))
+        return data
+
+    def sign(self, endpoint, params):
+        """Sign the `params` of a request to `endpoint` with the configured
+        secret, see `sign_params`."""
+        if self.metrics is None:
+            return self.sign_params(params, self.config['secret'])
+        start = time.time()
+        params = self.sign_params(params, self.config['secret'])
+        self.metrics.endpoint(endpoint).sign(time.time() - start)
+        return params
+
+    def breaker(self, endpoint):
+        """Check that the :class:`sprintkit.breaker.CircuitBreaker` of
+        `endpoint` lets a request through.
+
+        :Returns: (tuple) - The breaker and the token its `before` method
+            returned, to pass to its `record` method, or (None, None) if
+            this resource has no `breakers`.
+
+        :Raises: :class:`sprintkit.errors.CircuitOpenError`
+        """
+        if self.breakers is None:
+            return None, None
+        breaker = self.breakers.get(endpoint)
+        return breaker, breaker.before()
+
+    @deadline.bounded
+    def iter_call(self, endpoint, params, items, name):
+        """Like `call`, but decode the response incrementally.
+
+        :Parameters:
+            * endpoint (string) - The path of the resource.
+            * params (dict) - The URL query parameters, see `sign_params`.
+            * items (function) - :func:`sprintkit.decoding.iter_list` or
+                :func:`sprintkit.decoding.iter_groups`.
+            * name (string) - The field holding the records.
+
+        :Returns: (generator) - The records, decoded one at a time while the
+            response body is read.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.SandboxError`
+
+        .. note::
+            The other fields of the response are checked for Sandbox errors
+            once the body has been read. Inside a deadline, the deadline is
+            checked before each record is returned and once the body has
+            been read, and every read from the socket is limited to the
+            time left, so a late response is never taken for an empty
+            one. The `after_response`
+            hooks run once every record has been read, with the other
+            fields of the response as the result.
+
+        """
+        params = self.sign(endpoint, params)
+        hooks = self.hooks
+        start = time.time()
+        if hooks is not None:
+            event = RequestEvent(endpoint, params, start)
+            hooks.fire(hooks.before_request, event)
+        breaker = token = None
+        try:
+            self.admit(endpoint)
+            breaker, token = self.breaker(endpoint)
+            try:
+                response = self.fetch(endpoint, params)
+            except Exception as e:
+                if breaker is not None:
+                    breaker.record(e, token)
+                if self.metrics is not None:
+                    self.metrics.endpoint(endpoint).error(e)
+                raise
+            if breaker is not None:
+                breaker.record(None, token)
+            if self.metrics is not None:
+                self.metrics.endpoint(endpoint).record(time.time() - start)
+            stream = response.body_stream()
+            extra = {}
+            try:
+                try:
+                    for item in items(stream, name, extra):
+                        deadline.check()
+                        _limit_reads(response)
+                        yield item
+                except ValueError as e:
+                    raise errors.ParsingError("Malformed JSON data (%s)" % e,
+                                              extra)
+                except socket.timeout as e:
+                    raise errors.TimeoutError(str(e))
+                except socket.error as e:
+                    raise errors.ConnectionError(str(e))
+            finally:
+                stream.close()
+            deadline.check()
+            self.parse_errors(extra)
+        except Exception as e:
+            if isinstance(e, errors.SprintkitError):
+                e.endpoint = endpoint
+                e.mdn = params.get('mdn')
+                e.elapsed = time.time() - start
+                e.attempt = 1
+            if hooks is not None:
+                event.elapsed = time.time() - start
+                event.error = e
+                hooks.fire(hooks.on_error, event)
+            raise
+        if hooks is not None:
+            event.elapsed = time.time() - start
+            event.result = extra
+            hooks.fire(hooks.after_response, event)
+
+    def admit(self, endpoint):
+        """Wait until the `governor` lets a request to `endpoint` through,
+        within the current deadline.
+
+        .. note::
+            This runs before the request takes its circuit breaker token,
+            so a caller whose deadline passes before anything is sent is
+            not counted as a failure of the endpoint. It is counted as an
+            error in the `metrics`.
+
+        :Raises: :class:`sprintkit.errors.TimeoutError`
+        """
+        try:
+            deadline.check()
+            if self.governor is not None:
+                self.governor.acquire()
+                deadline.check()
+        except errors.TimeoutError as e:
+            if self.metrics is not None:
+                self.metrics.endpoint(endpoint).error(e)
+            raise
+
+    def fetch(self, endpoint, params):
+        """Request a Sandbox `endpoint` with already signed `params`, once
+        `admit` has let the request through.
+
+        :Returns: (:class:`restkit.wrappers.Response`) - The response, with
+            its body not yet read.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.HttpError`
+            * :class:`sprintkit.errors.TimeoutError`
+        """
+        try:
+            if self.transport is None:
+                return self.get(endpoint, params_dict=params)
+            return self.transport.fetch(self, endpoint, params)
+        except RequestTimeout as e:
+            raise errors.TimeoutError(str(e))
+        except RequestError as e:
+            raise errors.ConnectionError(str(e))
+        except ResourceError as e:
+            raise errors.HttpError(e.status_int or 0, e.msg)
+
+    def parse_response(self, response, decoder=None):
         """Parse a restkit Response payload into a json data dict.
        
-        :Parameters: response (:class:`restkit.wrappers.Response`) - Response
+        :Parameters: 
+            * response (:class:`restkit.wrappers.Response`) - Response
+            * decoder (function) - Called with the raw response body to
+                decode it (default=:func:`sprintkit.decoding.loads`).
 
         :Returns: (dict) - The raw Sandbox JSON data.
 
         :Raises: :class:`sprintkit.errors.ParsingError`
 
+        .. note::
+            The body is passed to the decoder as the undecoded bytes read
+            from the connection. A decoder may also return one of the
+            result objects in :mod:`sprintkit.results`.
+
+        """
+        return self.decode_body(self.read_body(response), decoder)
+
+    def read_body(self, response):
+        """Read the whole body of a restkit Response.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.TimeoutError`
         """
         try:
             body = response.body_string()
-            data = json.loads(body)
+        except socket.timeout as e:
+            raise errors.TimeoutError(str(e))
+        except socket.error as e:
+            raise errors.ConnectionError(str(e))
+        except:
+            raise errors.ParsingError("Malformed JSON data", None)
+        deadline.check()
+        return body
+
+    def decode_body(self, body, decoder=None):
+        """Decode a response body, see `parse_response`.
+
+        :Raises: :class:`sprintkit.errors.ParsingError`
+        """
+        try:
+            return (decoder or decoding.loads)(body)
+        except errors.SprintkitError:
+            raise
         except:
             raise errors.ParsingError("Malformed JSON data", body)
-        return data
 
     def parse_errors(self, data):
         """Parse raw Sandbox JSON data looking for Sandbox thrown errors.
@@ -141,7 +767,7 @@ class SandboxResource(Resource):
 
         :Raises: :class:`sprintkit.errors.SandboxError`
         """
-        if 'error' in data.keys():
+        if isinstance(data, dict) and 'error' in data:
             raise errors.SandboxError(data['error'])
 
 
@@ -152,7 +778,8 @@ class SandboxResource(Resource):
             * params (dict) - Dictionary of URL query param key/val pairs
             * secret (str) - The API Secret used to create signature.
 
-        :Returns: (dict) - The parameters with a signature added.
+        :Returns: (dict) - A new dict of the parameters with a signature
+            added. `params` itself is left unchanged.
 
         .. note::
             Read the documentation; http://goo.gl/Wu7T5 for details on
@@ -160,6 +787,8 @@ class SandboxResource(Resource):
             url quoted, before generating the signature.
         
         """
+        params = dict(params)
+
         #Update the timestamp if there is one
         if 'timestamp' in params.keys():
             params['timestamp'] = self.make_timestamp()
@@ -208,6 +837,7 @@ class SandboxResource(Resource):
 class SMS(SandboxResource):
     """A Resource used to send SMS messages."""
 
+    @deadline.bounded
     def send(self, mdns, msg):
         """Sends an SMS text message to a device or list of devices.
         
@@ -222,9 +852,11 @@ class SMS(SandboxResource):
                 mdns = "0005551111"
                 mdns = "0005551111,0005551212"
 
-        :Returns: (dict) - The raw JSON Sandbox data.
+        :Returns: (:class:`sprintkit.results.SmsResult`) - The delivery
+            status of the message for each MDN.
        
         .. note:: 
+            The result can also be indexed like the raw JSON Sandbox data.
             Here is a sample response for a successful transaction::
                 {'MessagingResponse': 
                     [{'status': 'S', 
@@ -244,21 +876,8 @@ class SMS(SandboxResource):
                   'timestamp': True,
                   'key': self.config['key'], 
                   'sig': True}
-        params = self.sign_params(params, self.config['secret'])
-        try:
-            response = self.get('sms.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
-        #We only report the first error we find
-        errs = [k for k in data.keys() if k != 'MessagingResponse']
-        if errs:
-            raise errors.SandboxError(errs[0])
-        if not 'MessagingResponse' in data.keys():
-            raise errors.ParsingError("Missing a MessagingResponse",
-                response)
-        return data
+        return self.call('sms.json', params, 
+                         results.decoder(results.SmsResult))
 
 
 class Presence(SandboxResource):
@@ -267,10 +886,15 @@ class Presence(SandboxResource):
     :Parameters: config (:class:`Config`) - The Sandbox configuration.
     """
 
-    def get_presence(self, mdn):
+    idempotent = True
+
+    @deadline.bounded
+    def get_presence(self, mdn, decoder=None):
         """Get the presence status of an MDN.
         
-        :Parameters: mdn (string) - The MDN to check for reachability.
+        :Parameters: 
+            * mdn (string) - The MDN to check for reachability.
+            * decoder (function) - Decodes the response body (default=None).
 
         :Returns: (dict) - The raw Sandbox JSON data.
         
@@ -285,16 +909,11 @@ class Presence(SandboxResource):
                   'key': self.config['key'], 
                   'sig': True}
 
-        params = self.sign_params(params, self.config['secret'])
-        try:
-            response = self.get('presence.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+        data = self.call('presence.json', params, decoder)
 
         return data
 
+    @deadline.bounded
     def reachable(self, mdn):
         """Check if an MDN is reachable.
         
@@ -311,15 +930,23 @@ class Presence(SandboxResource):
             This is a convenience method. The same data can be extracted using
             the `get_presence()` method.
         """
-        data = self.get_presence(mdn)
-        try:
-            status = data['status']
-        except KeyError as e:
-            raise errors.ParsingError("KeyError: '%s'." % status, data)
-        if status != 'Reachable' and status != 'Unreachable':
-            raise errors.ParsingError("ValueError: 'status' is incorrect.", 
-                                      data)
-        return (status == 'Reachable')
+        return self.status(mdn).reachable
+
+    @deadline.bounded
+    def status(self, mdn):
+        """Get the presence status of an MDN as a result object.
+
+        :Parameters: mdn (string) - The MDN to check for reachability.
+
+        :Returns: (:class:`sprintkit.results.PresenceResult`)
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.SandboxError`
+            * :class:`sprintkit.errors.ParsingError`
+        """
+        return self.get_presence(mdn, 
+                                 results.decoder(results.PresenceResult, mdn))
 
 
 class Location(SandboxResource):
@@ -328,10 +955,15 @@ class Location(SandboxResource):
     :Parameters: config (:class:`Config`) - The Sandbox configuration.
     """
 
-    def get_location(self, mdn):
+    idempotent = True
+
+    @deadline.bounded
+    def get_location(self, mdn, decoder=None):
         """Get the location data for an `mdn`.
         
-        :Parameters: mdn (string) - The MDN to get location fix for (10 digits).
+        :Parameters: 
+            * mdn (string) - The MDN to get location fix for (10 digits).
+            * decoder (function) - Decodes the response body (default=None).
 
         :Returns: (dict) - The raw Sandbox location data in JSON format.
 
@@ -345,16 +977,11 @@ class Location(SandboxResource):
                  'key': self.config['key'], 
                  'sig': True}
 
-        params = self.sign_params(params, self.config['secret'])
-        try:
-            response = self.get('location.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+        data = self.call('location.json', params, decoder)
 
         return data
 
+    @deadline.bounded
     def locate(self, mdn):
         """Get the location data for an `mdn` (a convenience method).
 
@@ -407,15 +1034,21 @@ class Perimeter(SandboxResource):
         a set of center coordinates and radius, then call its methods to check
         if devices are within the perimeter.
     """
+
+    idempotent = True
+
     def __init__(self, coordinates, radius, config=None, **kwargs):
         self.coordinates = Coordinates(coordinates)
         self.radius = radius
         super(Perimeter, self).__init__(config, **kwargs)
 
-    def get_perimeter(self, mdn):
+    @deadline.bounded
+    def get_perimeter(self, mdn, decoder=None):
         """Check if an mdn is inside this Perimeter.
         
-        :Parameters: mdn (string): The mdn of the device to check
+        :Parameters: 
+            * mdn (string): The mdn of the device to check
+            * decoder (function) - Decodes the response body (default=None).
 
         :Returns: (dict) - The raw Sandbox JSON data.
 
@@ -434,15 +1067,10 @@ class Perimeter(SandboxResource):
                  'timestamp': True, 
                  'key': self.config['key'], 
                  'sig': True}
-        params = self.sign_params(params, self.config['secret'])
-        try:
-            response = self.get('geofence/checkPerimeter.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+        data = self.call('geofence/checkPerimeter.json', params, decoder)
         return data
     
+    @deadline.bounded
     def inside(self, mdn):
         """Returns True if the mdn is inside this Perimeter.
 
@@ -462,18 +1090,9 @@ class Perimeter(SandboxResource):
             instead.
         
         """
-        data = self.get_perimeter(mdn)
-
-        try:
-            status = data['CurrentLocation'] 
-        except KeyError as e:
-            raise errors.ParsingError("Missing the CurrentLocation field", data) 
-
-        if status != 'INSIDE' and status != 'OUTSIDE': 
-            raise errors.ParsingError("ValueError for CurrentLocation", data)
-
-        return (status == 'INSIDE')
+        return self.status(mdn).inside
 
+    @deadline.bounded
     def check(self, mdn):
         """Check if an MDN is inside this Perimeter (a convenience
         method).
@@ -498,31 +1117,30 @@ class Perimeter(SandboxResource):
                 lon = Gps2dFix.coordinates.longitude
                 (lat, lon) = Gps2dFix.coordinates
         """
-        data = self.get_perimeter(mdn)
-        timestamp = datetime.now()
+        result = self.status(mdn)
+        fix = Gps2dFix(datetime.now(), result.coordinates, 
+                       errors={'hepe':result.accuracy})
+        return (result.inside, fix)
 
-        try:
-            lat = float(data['Latitude'])
-            lon = float(data['Longitude'])
-            accuracy = float(data['Accuracy'])
-            status = data['CurrentLocation'] 
-        except KeyError as e:
-            raise errors.ParsingError("Missing %s" % e, data)
-        except ValueError as e:
-            raise errors.ParsingError(e, data)
+    @deadline.bounded
+    def status(self, mdn):
+        """Check if an MDN is inside this Perimeter, returning a result
+        object.
 
-        coord = Coordinates((lat,lon))
-        fix = Gps2dFix(timestamp, coord, errors={'hepe':accuracy})
-        try:
-            status = data['CurrentLocation'] 
-        except KeyError as e:
-            raise errors.ParsingError("Missing the CurrentLocation field", data) 
-        if status != 'INSIDE' and status != 'OUTSIDE': 
-            raise errors.ParsingError("ValueError for CurrentLocation", data)
-        inside = (status == 'INSIDE')
+        :Parameters: mdn (string): The mdn of the device to check the perimeter for.
 
-        return (inside, fix)
+        :Returns: (:class:`sprintkit.results.PerimeterResult`) - Whether the
+            device is inside, and its location.
 
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.SandboxError`
+            * :class:`sprintkit.errors.ParsingError`
+        """
+        return self.get_perimeter(mdn, 
+                                  results.decoder(results.PerimeterResult, mdn))
+
+    @deadline.bounded
     def distance_to(self, mdn):
         """Calculate the distance from the Perimeter to the `mdn`.
         
@@ -558,15 +1176,24 @@ class Fence(SandboxResource):
         * days (string): The days of week to monitor fence [SMTWHFA].
         * start_time (string): The time when fence becomes active "HHMM".
         * end_time (string): The time with fence becomes inactive "HHMM".
+        * notify_event (string): The events that trigger a notification,
+            'in', 'out' or 'both' (default='both').
+        * geofence (:class:`GeoFence`): The GeoFence that listed the fence,
+            whose membership index is told when its devices or recipients
+            change (default=None).
 
     .. note::
         This object is not intended to be instantiated by the end user
         directly, instead it is returned when calling the GeoFence.fences()
         method.
 
+        `activate` and `deactivate` calls on one Fence are made one at a
+        time, so its `status` always matches the last change made.
+
     """
     def __init__(self, fenceid, name, coordinates, radius, days, start_time, 
-                 end_time, status, config=None, **kwargs):
+                 end_time, status, config=None, notify_event='both',
+                 geofence=None, **kwargs):
         self.fenceid = fenceid
         self.name = name
         self.coordinates = coordinates
@@ -575,8 +1202,52 @@ class Fence(SandboxResource):
         self.start_time = start_time
         self.end_time = end_time
         self.status = status
+        self.notify_event = notify_event
+        self.geofence = geofence
+        self._status_lock = threading.Lock()
         super(Fence, self).__init__(config, **kwargs)
 
+    def _members_changed(self):
+        """Expire this fence in the membership index of its GeoFence."""
+        membership = getattr(self.geofence, '_membership', None)
+        if membership is not None:
+            membership.invalidate(self.fenceid)
+
+    @property
+    def schedule(self):
+        """The :class:`sprintkit.schedule.Schedule` compiled from this
+        Fence's `days`, `start_time` and `end_time`."""
+        return Schedule.compile(self.days, self.start_time, self.end_time)
+
+    def is_active_at(self, when):
+        """Check locally if this Fence is being monitored at a given time.
+
+        :Parameters: when (datetime) - The time to check, in the fence's
+            local time.
+
+        :Returns: (bool) - True if the Fence is active and `when` falls
+            within its schedule.
+
+        .. note::
+            This method does not call the Sandbox, it uses the `status` and
+            schedule that were retrieved with the Fence.
+        """
+        return self.status == 'active' and self.schedule.is_active_at(when)
+
+    def next_transition(self, when=None):
+        """Find when this Fence's schedule next turns on or off.
+
+        :Parameters: when (datetime) - The time to start from
+            (default=datetime.now()).
+
+        :Returns: (datetime) - The time of the next transition, or None if
+            the schedule covers the whole week.
+        """
+        if when is None:
+            when = datetime.now()
+        return self.schedule.next_transition(when)
+
+    @deadline.bounded
     def activate(self):
         """Activate this Fence.
 
@@ -593,25 +1264,27 @@ class Fence(SandboxResource):
                  'key': self.config['key'], 
                  'sig': True}
 
-        params = self.sign_params(params, self.config['secret'])
+        self._status_lock.acquire()
         try:
-            response = self.get('geofence/activate.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            try:
+                data = self.call('geofence/activate.json', params)
+            finally:
+                self.invalidate('geofence/list.json')
 
-        try:
-            message = data['Message']
-        except KeyError:
-            raise errors.ParsingError("Missing a `Message` field.", data)
+            try:
+                message = data['Message']
+            except KeyError:
+                raise errors.ParsingError("Missing a `Message` field.", data)
 
-        if message == 'FENCE_ACTIVATED':
-            self.status = 'active'
-            return data
-        else:
-            raise errors.GeoFenceError(message)
+            if message == 'FENCE_ACTIVATED':
+                self.status = 'active'
+                return data
+            else:
+                raise errors.GeoFenceError(message)
+        finally:
+            self._status_lock.release()
     
+    @deadline.bounded
     def deactivate(self):
         """De-activate this Fence.
         
@@ -628,16 +1301,20 @@ class Fence(SandboxResource):
                   'key': self.config['key'], 
                   'sig': True}
 
-        params = self.sign_params(params, self.config['secret'])
+        self._status_lock.acquire()
         try:
-            response = self.get('geofence/deactivate.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            try:
+                data = self.call('geofence/deactivate.json', params)
+            finally:
+                self.invalidate('geofence/list.json')
+            if data.get('Message') == 'FENCE_DEACTIVATED':
+                self.status = 'inactive'
+        finally:
+            self._status_lock.release()
 
         return data
 
+    @deadline.bounded
     def get_devices(self):
         """Returns the devices associated with this fence.
         
@@ -654,16 +1331,11 @@ class Fence(SandboxResource):
                   'key': self.config['key'], 
                   'sig': True}
 
-        params = self.sign_params(params, self.config['secret'])
-        try:
-            response = self.get('geofence/listDevices.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+        data = self.cached_call('geofence/listDevices.json', params)
 
         return data
 
+    @deadline.bounded
     def devices(self):
         """Returns the devices associated with this fence (a convenience
         method).
@@ -693,7 +1365,34 @@ class Fence(SandboxResource):
             devices[device['MDN']] = int(device['DeviceID'])
         return devices
 
+    @deadline.bounded
+    def iter_devices(self):
+        """Iterate over the devices associated with this fence.
+
+        :Returns: (generator) - (mdn, deviceid) pairs, decoded one at a time
+            as the Sandbox response is read.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.SandboxError`
+
+        .. note::
+            This yields the same data as `devices()`, but its memory use
+            does not grow with the number of devices.
+        """
+        params = {'fenceId': self.fenceid,
+                  'timestamp': True, 
+                  'key': self.config['key'], 
+                  'sig': True}
+        for device in self.iter_call('geofence/listDevices.json', params,
+                                     decoding.iter_list, 'Device'):
+            if 'Message' in device:
+                return
+            yield (device['MDN'], int(device['DeviceID']))
+
 
+    @deadline.bounded
     def add_device(self, mdn):
         """Add a device to be monitored inside this Fence.
         
@@ -713,13 +1412,12 @@ class Fence(SandboxResource):
                   'key': self.config['key'], 
                   'sig': True}
 
-        params = self.sign_params(params, self.config['secret'])
         try:
-            response = self.get('geofence/addDevice.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            data = self.call('geofence/addDevice.json', params)
+        finally:
+            self.invalidate('geofence/listDevices.json',
+                            {'fenceId': self.fenceid})
+            self._members_changed()
 
         try:
             message = data['Message']
@@ -731,6 +1429,7 @@ class Fence(SandboxResource):
         else:
             return data
     
+    @deadline.bounded
     def delete_device(self, mdn):
         """Delete a device associated with this Fence.
 
@@ -761,13 +1460,12 @@ class Fence(SandboxResource):
                   'key': self.config['key'], 
                   'sig': True}
 
-        params = self.sign_params(params, self.config['secret'])
         try:
-            response = self.get('geofence/deleteDevice.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            data = self.call('geofence/deleteDevice.json', params)
+        finally:
+            self.invalidate('geofence/listDevices.json',
+                            {'fenceId': self.fenceid})
+            self._members_changed()
 
         try:
             message = data['Message']
@@ -780,6 +1478,7 @@ class Fence(SandboxResource):
             return data
 
 
+    @deadline.bounded
     def get_recipients(self):
         """Get the recipients of notification of geofence events.
 
@@ -795,15 +1494,10 @@ class Fence(SandboxResource):
                   'timestamp': True, 
                   'key': self.config['key'], 
                   'sig': True}
-        params = self.sign_params(params, self.config['secret'])
-        try:
-            response = self.get('geofence/listRecipients.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+        data = self.cached_call('geofence/listRecipients.json', params)
         return data
 
+    @deadline.bounded
     def recipients(self):
         """Get the recipients of notification of geofence events.
 
@@ -832,6 +1526,30 @@ class Fence(SandboxResource):
                 return recipients
         return recipients
 
+    @deadline.bounded
+    def iter_recipients(self):
+        """Iterate over the recipients of notification of geofence events.
+
+        :Returns: (generator) - (mdnurl, recipientid) pairs, decoded one at
+            a time as the Sandbox response is read.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.SandboxError`
+        """
+        params = {'fenceId': self.fenceid,
+                  'timestamp': True, 
+                  'key': self.config['key'], 
+                  'sig': True}
+        for recipient in self.iter_call('geofence/listRecipients.json', params,
+                                        decoding.iter_list, 'Recipient'):
+            try:
+                yield (recipient['MDNURL'], int(recipient['RecipientID']))
+            except (KeyError, ValueError):
+                return
+
+    @deadline.bounded
     def add_recipient(self, recipient):
         """Add a recipient for a Fence notification event.
         
@@ -850,15 +1568,15 @@ class Fence(SandboxResource):
                   'timestamp': True, 
                   'key': self.config['key'], 
                   'sig': True}
-        params = self.sign_params(params, self.config['secret'])
         try:
-            response = self.get('geofence/addRecipient.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            data = self.call('geofence/addRecipient.json', params)
+        finally:
+            self.invalidate('geofence/listRecipients.json',
+                            {'fenceId': self.fenceid})
+            self._members_changed()
         return data
 
+    @deadline.bounded
     def delete_recipient(self, recipient):
         """Delete a recipient of a geofence notification.
         
@@ -880,13 +1598,12 @@ class Fence(SandboxResource):
                   'timestamp': True, 
                   'key': self.config['key'], 
                   'sig': True}
-        params = self.sign_params(params, self.config['secret'])
         try:
-            response = self.get('geofence/deleteRecipient.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            data = self.call('geofence/deleteRecipient.json', params)
+        finally:
+            self.invalidate('geofence/listRecipients.json',
+                            {'fenceId': self.fenceid})
+            self._members_changed()
         return data
 
 
@@ -897,9 +1614,13 @@ class GeoFence(SandboxResource):
     
     """
    
-    def get_fences(self):
+    @deadline.bounded
+    def get_fences(self, decoder=None):
         """Get all of the geofences associated with a Sandbox user account.
         
+        :Parameters: decoder (function) - Decodes the response body
+            (default=None).
+
         :Returns: (dict) - The raw Sandbox JSON data.
         
         :Raises: 
@@ -927,15 +1648,10 @@ class GeoFence(SandboxResource):
         params = {'timestamp': True, 
                  'key': self.config['key'], 
                  'sig': True}
-        params = self.sign_params(params, self.config['secret'])
-        try:
-            response = self.get('geofence/list.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+        data = self.cached_call('geofence/list.json', params, decoder)
         return data
 
+    @deadline.bounded
     def fences(self, match=None):
         """Get all of the geofences associated with a Sandbox user account.
 
@@ -959,42 +1675,122 @@ class GeoFence(SandboxResource):
         
         """
         fences = []
-        data = self.get_fences()
-        try:
-            for fence in data['Fence']:
-                if 'Message' in fence.keys():
-                    return []
-                fenceid = int(fence['FenceID'])
-                name = fence['Name']
-                lat = float(fence['Latitude'])
-                lon = float(fence['Longitude'])
-                coordinates = Coordinates((lat,lon))
-                radius = int(fence['Dimensions'])
-                days = fence['Days']
-                start_time = fence['StartTime']
-                end_time = fence['EndTime']
-                status = fence['Status'].lower()
-                if match:
-                    if isinstance(match, str) and match == name:
-                        fences.append(Fence(fenceid, name, coordinates, radius, 
-                                            days, start_time, end_time, status, 
-                                            self.config))
-                    elif isinstance(match, int) and match == fenceid:
-                        fences.append(Fence(fenceid, name, coordinates, radius, 
-                                            days, start_time, end_time, status, 
-                                            self.config))
-                    else:
-                        continue
+        for record in self.records():
+            if match:
+                if isinstance(match, str) and match == record.name:
+                    fences.append(self._make_fence(record))
+                elif isinstance(match, int) and match == record.fenceid:
+                    fences.append(self._make_fence(record))
                 else:
-                    fences.append(Fence(fenceid, name, coordinates, radius, days, 
-                                     start_time, end_time, status, self.config))
+                    continue
+            else:
+                fences.append(self._make_fence(record))
+        return fences
+
+    @deadline.bounded
+    def records(self):
+        """Get all of the geofences associated with a Sandbox user account
+        as compact records.
+
+        :Returns: (list) - A list of :class:`sprintkit.results.FenceRecord`.
 
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.SandboxError`
 
+        .. note::
+            Unlike `fences()` this does not create a Fence (and its
+            connection settings) for each geofence, which makes it the
+            cheaper choice when only the fence data is needed.
+        """
+        data = self.get_fences(results.fence_records)
+        try:
+            return data['Fence']
         except KeyError as e:
             raise errors.ParsingError("KeyError '%s'." % e, data)
-        return fences
 
+    @deadline.bounded
+    def iter_fences(self):
+        """Iterate over the geofences associated with a Sandbox user account.
+
+        :Returns: (generator) - Fence objects, created one at a time as the
+            Sandbox response is read.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.SandboxError`
+
+        .. note::
+            This yields the same fences as `fences()`, but its memory use
+            does not grow with the number of fences in the account.
+        """
+        params = {'timestamp': True, 
+                 'key': self.config['key'], 
+                 'sig': True}
+        for fence in self.iter_call('geofence/list.json', params,
+                                    decoding.iter_list, 'Fence'):
+            if 'Message' in fence:
+                return
+            yield self._make_fence(results.FenceRecord.from_data(fence))
+
+    def _make_fence(self, record):
+        """Create a Fence from a :class:`sprintkit.results.FenceRecord`."""
+        return Fence(record.fenceid, record.name, record.coordinates,
+                     record.radius, record.days, record.start_time,
+                     record.end_time, record.status, self.config,
+                     record.notify_event, geofence=self,
+                     executor=self.executor,
+                     governor=self.governor, breakers=self.breakers,
+                     metrics=self.metrics, hooks=self.hooks,
+                     cache=self.cache, transport=self.transport)
+
+
+    def membership(self, ttl=None, concurrency=None):
+        """Get an index of the fences that monitor each device and notify
+        each recipient.
+
+        :Parameters:
+            * ttl (integer) - Seconds before a fence's entries are reloaded
+                (default=None, 300 or the value last given).
+            * concurrency (integer) - The number of fences loaded at once
+                (default=None, 8 or the value last given).
+
+        :Returns: (:class:`sprintkit.membership.Membership`)
+
+        .. note::
+            The index is created on the first call and shared by later
+            calls on this GeoFence, which only reload the fences that have
+            expired. A `ttl` or `concurrency` given to a later call
+            changes the shared index. To find the fences monitoring an
+            MDN::
+
+                fenceids = geofence.membership().fences_for_mdn(mdn)
 
+        """
+        membership = getattr(self, '_membership', None)
+        if membership is None:
+            _membership_lock.acquire()
+            try:
+                membership = getattr(self, '_membership', None)
+                if membership is None:
+                    membership = self._membership = Membership(self)
+            finally:
+                _membership_lock.release()
+        if ttl is not None:
+            membership.ttl = ttl
+        if concurrency is not None:
+            membership.concurrency = concurrency
+        return membership
+
+    def _fences_changed(self):
+        """Expire the list of fences in the membership index."""
+        membership = getattr(self, '_membership', None)
+        if membership is not None:
+            membership.invalidate_list()
+
+    @deadline.bounded
     def add_fence(self, name, start_time, end_time, coordinates, 
                   radius, interval, days, notify_event):
         """Add a fence to a Sandbox user account.
@@ -1055,23 +1851,23 @@ class GeoFence(SandboxResource):
                   'timestamp': True,
                   'key': self.config['key'],
                   'sig': True}
-        params = self.sign_params(params, self.config['secret'])
         try:
-            response = self.get('geofence/add.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            data = self.call('geofence/add.json', params)
+        finally:
+            self.invalidate('geofence/list.json')
+            self._fences_changed()
         if data['message'] == 'FENCE_ADDED':
             fenceid = int(data['ID'])
             fence = [fence for fence in self.fences() if fence.fenceid == fenceid]
             if len(fence) == 1:
+                fence[0].notify_event = notify_event.lower()
                 return fence[0]
             else:
                 raise errors.GeoFenceError("FENCE_NOTADDED")
         else:
             raise errors.GeoFenceError(data['message'])
 
+    @deadline.bounded
     def delete_fence(self, fence):
         """Delete a geofence from this account.
         
@@ -1089,13 +1885,14 @@ class GeoFence(SandboxResource):
                   'timestamp': True, 
                   'key': self.config['key'], 
                   'sig': True}
-        params = self.sign_params(params, self.config['secret'])
         try:
-            response = self.get('geofence/delete.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            data = self.call('geofence/delete.json', params)
+        finally:
+            self.invalidate('geofence/list.json')
+            for endpoint in ('geofence/listDevices.json',
+                             'geofence/listRecipients.json'):
+                self.invalidate(endpoint, {'fenceId': fence.fenceid})
+            self._fences_changed()
         return data
 
 
@@ -1107,6 +1904,7 @@ class Account(SandboxResource):
 
     """
 
+    @deadline.bounded
     def get_devices(self, status=None, mdn=None):
         """Retrieve devices associated with this developer account.
 
@@ -1153,18 +1951,55 @@ class Account(SandboxResource):
                   'timestamp': True,
                   'sig': True}
         if status:
-            params[status] = status
+            params['status'] = status
         if mdn:
-            params[mdn] = mdn
-        params = self.sign_params(params, self.config['secret'])
-        try:
-            response = self.get('devices.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            params['mdn'] = mdn
+        data = self.cached_call('devices.json', params)
         return data
         
+    @deadline.bounded
+    def iter_devices(self, status=None):
+        """Iterate over the devices associated with this developer account.
+
+        :Optional Parameters:
+            * status (string) - The authorization status criteria to filter
+                on, see `get_devices()`.
+
+        :Returns: (generator) - :class:`sprintkit.results.DeviceStatus`
+            objects, decoded one at a time as the Sandbox response is read.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.SandboxError`
+        """
+        params = {'key': self.config['key'],
+                  'timestamp': True,
+                  'sig': True}
+        if status:
+            params['status'] = status
+        for status, mdn in self.iter_call('devices.json', params, 
+                                          decoding.iter_groups, 'devices'):
+            yield results.DeviceStatus(mdn, status)
+
+    @deadline.bounded
+    def devices(self, status=None):
+        """Get the devices associated with this developer account.
+
+        :Optional Parameters:
+            * status (string) - The authorization status criteria to filter
+                on, see `get_devices()`.
+
+        :Returns: (list) - A list of :class:`sprintkit.results.DeviceStatus`.
+
+        :Raises: 
+            * :class:`sprintkit.errors.ConnectionError`
+            * :class:`sprintkit.errors.ParsingError`
+            * :class:`sprintkit.errors.SandboxError`
+        """
+        return list(self.iter_devices(status))
+
+    @deadline.bounded
     def add_device(self, mdn):
         """Add a device to this developer account.
         
@@ -1193,15 +2028,13 @@ class Account(SandboxResource):
                   'key': self.config['key'],
                   'timestamp': True,
                   'sig': True}
-        params = self.sign_params(params, self.config['secret'])
         try:
-            response = self.get('device.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            data = self.call('device.json', params)
+        finally:
+            self.invalidate('devices.json')
         return data
 
+    @deadline.bounded
     def delete_device(self, mdn):
         """Delete a device from this developer account.
         
@@ -1225,12 +2058,73 @@ class Account(SandboxResource):
                   'key': self.config['key'],
                   'timestamp': True,
                   'sig': True}
-        params = self.sign_params(params, self.config['secret'])
         try:
-            response = self.get('device.json', params_dict=params)
-        except (RequestError, RequestTimeout) as e:
-            raise errors.ConnectionError(str(e))
-        data = self.parse_response(response)
-        self.parse_errors(data)
+            data = self.call('device.json', params)
+        finally:
+            self.invalidate('devices.json')
         return data
 
+    @deadline.bounded
+    def add_devices(self, mdns, concurrency=8, progress=None, checkpoint=None,
+                    records=False):
+        """Add many devices to this developer account concurrently.
+
+        :Parameters:
+            * mdns (iterable) - The MDNs to add to this account.
+            * concurrency (integer) - The number of requests kept in flight.
+            * progress (callable) - Called as ``progress(summary, mdn, error)``
+                after each MDN completes.
+            * checkpoint (string) - Path to a file of completed MDNs.
+            * records (bool) - Keep an :class:`sprintkit.errors.ErrorRecord`
+                of each failure in `summary.records`.
+
+        :Returns: (:class:`sprintkit.bulk.BulkSummary`) - The successes,
+            failures and error codes of the run.
+
+        .. note::
+            Each MDN is added with `add_device()`. An MDN counts as a
+            success only if the Sandbox responds with `SUCCESS`, a `FAILED`
+            response is recorded with the error code `FAILED`. See
+            :func:`sprintkit.bulk.run_bulk` for how the `checkpoint` file is
+            used to resume an interrupted run.
+
+        """
+        return run_bulk(lambda mdn: self._change_device(self.add_device, mdn),
+                        mdns, concurrency, progress, checkpoint, records)
+
+    @deadline.bounded
+    def delete_devices(self, mdns, concurrency=8, progress=None,
+                       checkpoint=None, records=False):
+        """Delete many devices from this developer account concurrently.
+
+        :Parameters:
+            * mdns (iterable) - The MDNs to delete from this account.
+            * concurrency (integer) - The number of requests kept in flight.
+            * progress (callable) - Called as ``progress(summary, mdn, error)``
+                after each MDN completes.
+            * checkpoint (string) - Path to a file of completed MDNs.
+            * records (bool) - Keep an :class:`sprintkit.errors.ErrorRecord`
+                of each failure in `summary.records`.
+
+        :Returns: (:class:`sprintkit.bulk.BulkSummary`) - The successes,
+            failures and error codes of the run.
+
+        """
+        return run_bulk(
+            lambda mdn: self._change_device(self.delete_device, mdn),
+            mdns, concurrency, progress, checkpoint, records)
+
+    def _change_device(self, method, mdn):
+        """Call `add_device` or `delete_device` and raise a
+        :class:`sprintkit.errors.SandboxError` unless it succeeded."""
+        data = method(mdn)
+        try:
+            response = data['response']
+        except KeyError:
+            raise errors.ParsingError("Missing a `response` field.", data)
+        if response != 'SUCCESS':
+            error = errors.SandboxError(response)
+            error.endpoint = 'device.json'
+            error.mdn = mdn
+            raise error
+        return data
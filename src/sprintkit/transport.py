@@ -0,0 +1,217 @@
+"""
+sprintkit.transport
+===================
+
+Records Sandbox responses to a file and replays them without a network,
+for repeatable tests and benchmarks.
+
+:Copyright: (c) 2011 by Sprint.
+:License: MIT, see LICENSE for more details.
+"""
+
+from cStringIO import StringIO
+import gzip
+import json
+import threading
+import time
+
+from sprintkit import errors
+from sprintkit.cache import query
+
+
+class RecordedResponse(object):
+    """A response read from a recording, in place of a restkit Response.
+
+    :Attributes:
+        * body (string) - The response body.
+        * status_int (integer) - The HTTP status.
+
+    .. note::
+        Like a connection returned to the pool, a replayed response holds
+        its place among the :class:`Replayer`'s concurrent responses until
+        its body has been read or the stream of its body is closed.
+    """
+    __slots__ = ['body', 'status_int', '_release']
+
+    def __init__(self, body, status_int=200, release=None):
+        self.body = body
+        self.status_int = status_int
+        self._release = release
+
+    def body_string(self):
+        self.close()
+        return self.body
+
+    def body_stream(self):
+        return _Stream(self.body, self.close)
+
+    def close(self):
+        """Stop holding a place among the replayer's concurrent
+        responses."""
+        release = self._release
+        if release is not None:
+            self._release = None
+            release()
+
+
+class _Stream(object):
+    """A file-like body that calls `on_close` when it is closed."""
+    __slots__ = ['_file', '_on_close']
+
+    def __init__(self, body, on_close):
+        self._file = StringIO(body)
+        self._on_close = on_close
+
+    def read(self, size=-1):
+        return self._file.read(size)
+
+    def close(self):
+        self._file.close()
+        self._on_close()
+
+
+class Recorder(object):
+    """A transport that sends the requests to the Sandbox and records each
+    response.
+
+    :Parameters: path (string) - The recording file, which is replaced.
+
+    .. note::
+        Give it to the resources whose requests should be recorded, for
+        example ``Location(config, transport=Recorder('locate.rec.gz'))``,
+        and call :meth:`close` when they are done. The recording is a
+        gzipped file of JSON lines, one per response, holding the
+        endpoint, the request parameters, the seconds the response took
+        and its body. The `timestamp`, `sig` and `key` parameters are left
+        out, so that a recording matches the same requests when they are
+        replayed later or with another account.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.recorded = 0
+        self._file = gzip.open(path, 'wb')
+        self._lock = threading.Lock()
+
+    def fetch(self, resource, endpoint, params):
+        """Send a request with `resource` and record the response.
+
+        :Returns: (:class:`RecordedResponse`)
+        """
+        start = time.time()
+        response = resource.get(endpoint, params_dict=params)
+        body = response.body_string()
+        self.record(endpoint, params, body, time.time() - start)
+        return RecordedResponse(body, response.status_int)
+
+    def record(self, endpoint, params, body, elapsed=0):
+        """Add a response to the recording without sending a request, for
+        example to write a recording for a test by hand.
+
+        :Parameters:
+            * endpoint (string) - The endpoint, for example 'location.json'.
+            * params (dict) - The request parameters.
+            * body (string) - The response body.
+            * elapsed (float) - The seconds the response takes.
+        """
+        line = json.dumps([endpoint, query(params), elapsed,
+                           body.decode('utf-8')])
+        self._lock.acquire()
+        try:
+            self._file.write(line + '\n')
+            self.recorded += 1
+        finally:
+            self._lock.release()
+
+    def close(self):
+        """Finish writing the recording."""
+        self._lock.acquire()
+        try:
+            self._file.close()
+        finally:
+            self._lock.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
+
+
+class Replayer(object):
+    """A transport that answers requests from a recording made by
+    :class:`Recorder`, without a network.
+
+    :Parameters:
+        * path (string) - The recording file.
+        * speed (float) - How much faster than recorded the responses
+            arrive, 0 to answer at once (default=1, the recorded speed).
+        * concurrency (integer) - The most responses replayed at once,
+            like the connections of a server (default=None, no limit). A
+            response counts from the request until its body has been read.
+
+    :Attributes: replayed (integer) - The responses replayed.
+
+    .. note::
+        Requests are matched by endpoint and parameters, less `timestamp`,
+        `sig` and `key`. When a request was recorded several times its
+        responses are replayed in turn, starting over after the last one.
+        A request that was not recorded raises
+        :class:`sprintkit.errors.ConnectionError`.
+
+        The resource still signs the request, goes through its governor,
+        breakers, metrics and hooks, and reads and decodes the body, so a
+        benchmark runs the same code as production apart from the socket.
+    """
+
+    def __init__(self, path, speed=1, concurrency=None):
+        self.path = path
+        self.speed = speed
+        self.replayed = 0
+        self._responses = {}
+        self._turns = {}
+        self._lock = threading.Lock()
+        self._slots = None
+        if concurrency:
+            self._slots = threading.BoundedSemaphore(concurrency)
+        recording = gzip.open(path, 'rb')
+        try:
+            for line in recording:
+                (endpoint, params, elapsed, body) = json.loads(line)
+                self._responses.setdefault((endpoint, params), []).append(
+                    (elapsed, body.encode('utf-8')))
+        finally:
+            recording.close()
+
+    def fetch(self, resource, endpoint, params):
+        """Answer a request from the recording.
+
+        :Returns: (:class:`RecordedResponse`)
+
+        :Raises: :class:`sprintkit.errors.ConnectionError`
+        """
+        key = (endpoint, query(params))
+        responses = self._responses.get(key)
+        if responses is None:
+            raise errors.ConnectionError("No recorded response to %s?%s" % key)
+        self._lock.acquire()
+        try:
+            turn = self._turns.get(key, 0)
+            self._turns[key] = turn + 1
+            self.replayed += 1
+        finally:
+            self._lock.release()
+        (elapsed, body) = responses[turn % len(responses)]
+        if self._slots is None:
+            if self.speed:
+                time.sleep(elapsed / self.speed)
+            return RecordedResponse(body)
+        self._slots.acquire()
+        try:
+            if self.speed:
+                time.sleep(elapsed / self.speed)
+        except:
+            self._slots.release()
+            raise
+        return RecordedResponse(body, release=self._slots.release)
@@ -14,6 +14,12 @@ class AccountTests(SandboxResourceTest):
         devices = self.account.get_devices()
         self.assertTrue(isinstance(devices, dict))
 
+    def test_iter_devices(self):
+        from sprintkit.results import DeviceStatus
+        devices = list(self.account.iter_devices())
+        self.assertTrue(all(isinstance(device, DeviceStatus) 
+                            for device in devices))
+
     def test_add_device(self):
         #self.fail('Test disabled for your protection. Be careful!')
         result = self.account.add_device(params.optin_mdn)
@@ -24,6 +30,18 @@ class AccountTests(SandboxResourceTest):
         result = self.account.delete_device(params.optin_mdn)
         self.assertTrue(isinstance(result, dict))
 
+    def test_add_devices(self):
+        #self.fail('Test disabled for your protection. Be careful!')
+        from sprintkit.bulk import BulkSummary
+        summary = self.account.add_devices([params.optin_mdn])
+        self.assertTrue(isinstance(summary, BulkSummary))
+
+    def test_delete_devices(self):
+        #self.fail('Test disabled for your protection. Be careful!')
+        from sprintkit.bulk import BulkSummary
+        summary = self.account.delete_devices([params.optin_mdn])
+        self.assertTrue(isinstance(summary, BulkSummary))
+
 
 def account_suite():
     suite = TestLoader().loadTestsFromTestCase(AccountTests)
@@ -18,6 +18,11 @@ class GeoFenceTests(SandboxResourceTest):
         fences = self.geofence.fences()
         self.assertTrue(isinstance(fences, list))
 
+    def test_iter_fences(self):
+        fences = list(self.geofence.iter_fences())
+        self.assertEqual([fence.fenceid for fence in fences],
+                         [fence.fenceid for fence in self.geofence.fences()])
+
     def test_add_fence(self):
         name = uuid4().hex
         fence = self.geofence.add_fence(name, '0600', '1600', SPRINTHQ, 2000, 5, 
@@ -73,6 +78,15 @@ class GeoFenceTests(SandboxResourceTest):
 
         delete_result = self.geofence.delete_fence(fence)
 
+    def test_membership(self):
+        name = uuid4().hex
+        fence = self.geofence.add_fence(name, '0600', '1600', SPRINTHQ, 2000, 5, 
+                                        'SMTWHF', 'both')
+        fence.add_device(params.valid_mdn)
+        fenceids = self.geofence.membership().fences_for_mdn(params.valid_mdn)
+        delete_result = self.geofence.delete_fence(fence)
+        self.assertTrue(fence.fenceid in fenceids)
+
     def test_get_recipients(self):
         name = uuid4().hex
         fence = self.geofence.add_fence(name, '0600', '1600', SPRINTHQ, 2000, 5, 
@@ -98,6 +112,24 @@ class GeoFenceTests(SandboxResourceTest):
         delete_result = self.geofence.delete_fence(fence)
         self.assertEqual(delete_status['Message'], 'RECIPIENT_DELETED')
 
+    def test_cache(self):
+        from sprintkit.cache import ResponseCache
+        from sprintkit.services import GeoFence
+        cache = ResponseCache()
+        geofence = GeoFence(self.get_Config(), cache=cache)
+        records = geofence.records()
+        self.assertEqual(geofence.records(), records)
+        self.assertEqual(cache.hits, 1)
+        name = uuid4().hex
+        fence = geofence.add_fence(name, '0600', '1600', SPRINTHQ, 2000, 5,
+                                   'SMTWHF', 'both')
+        fence.add_device(params.valid_mdn)
+        devices = fence.devices()
+        geofence.delete_fence(fence)
+        self.assertTrue(params.valid_mdn in devices)
+        self.assertFalse(fence.fenceid in
+                         [record.fenceid for record in geofence.records()])
+
 
 def geofence_suite():
     suite = TestLoader().loadTestsFromTestCase(GeoFenceTests)
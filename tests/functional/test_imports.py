@@ -0,0 +1,51 @@
+import subprocess
+import sys
+from unittest import main, TestCase, TestLoader
+
+
+SCRIPT = """
+import sys, time
+start = time.time()
+%s
+print time.time() - start
+print ' '.join(sorted(sys.modules))
+"""
+
+
+class ImportTests(TestCase):
+
+    heavy = ('restkit', 'sprintkit.services', 'ConfigParser', 'json')
+    max_seconds = 0.5
+
+    def run_import(self, statement):
+        process = subprocess.Popen([sys.executable, '-c', SCRIPT % statement],
+                                   stdout=subprocess.PIPE)
+        output = process.communicate()[0].splitlines()
+        self.assertEqual(process.returncode, 0)
+        return float(output[0]), set(output[1].split())
+
+    def test_gps_does_not_import_services(self):
+        seconds, modules = self.run_import(
+            "from sprintkit.gps import Coordinates")
+        for module in self.heavy:
+            self.assertFalse(module in modules, module)
+        self.assertTrue(seconds < self.max_seconds)
+
+    def test_package_is_lazy(self):
+        seconds, modules = self.run_import("import sprintkit")
+        self.assertFalse('restkit' in modules)
+        self.assertTrue(seconds < self.max_seconds)
+
+    def test_services_load_on_first_use(self):
+        seconds, modules = self.run_import(
+            "import sprintkit; sprintkit.Location")
+        self.assertTrue('restkit' in modules)
+
+
+def test_suite():
+    suite = TestLoader().loadTestsFromTestCase(ImportTests)
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="test_suite")
@@ -18,6 +18,12 @@ class PresenceTests(SandboxResourceTest):
         status = self.presence.reachable(params.valid_mdn)
         self.assertTrue(isinstance(status, bool)) 
     
+    def test_status_valid_mdn(self):
+        from sprintkit.results import PresenceResult
+        result = self.presence.status(params.valid_mdn)
+        self.assertTrue(isinstance(result, PresenceResult))
+        self.assertEqual(result.reachable, result['status'] == 'Reachable')
+
     def test_reachable_with_invalid_mdn(self):
         self.assertRaises(SandboxError, self.presence.reachable, 
                           params.invalid_mdn)
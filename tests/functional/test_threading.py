@@ -0,0 +1,70 @@
+import threading
+from unittest import main, TestLoader
+
+from sprintkit.gps import Gps2dFix
+
+from fixtures import SandboxResourceTest
+import params
+
+
+class ThreadingTests(SandboxResourceTest):
+
+    threads = 64
+    requests_per_thread = 4
+
+    def setUp(self):
+        from sprintkit.services import Location, Presence
+        config = self.get_Config()
+        self.location = Location(config)
+        self.presence = Presence(config)
+
+    def run_threads(self, target):
+        failures = []
+
+        def worker():
+            try:
+                for i in range(self.requests_per_thread):
+                    target()
+            except Exception as e:
+                failures.append(e)
+
+        threads = [threading.Thread(target=worker)
+                   for i in range(self.threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(failures, [])
+
+    def test_shared_location(self):
+        def locate():
+            fix = self.location.locate(params.valid_mdn)
+            self.assertTrue(isinstance(fix, Gps2dFix))
+        self.run_threads(locate)
+
+    def test_shared_presence(self):
+        def reachable():
+            self.assertTrue(isinstance(
+                self.presence.reachable(params.valid_mdn), bool))
+        self.run_threads(reachable)
+
+    def test_sign_params_does_not_mutate(self):
+        query = {'mdn': params.valid_mdn, 'timestamp': True,
+                 'key': self.location.config['key'], 'sig': True}
+        original = dict(query)
+
+        def sign():
+            signed = self.location.sign_params(query,
+                                               self.location.config['secret'])
+            self.assertEqual(len(signed['sig']), 32)
+        self.run_threads(sign)
+        self.assertEqual(query, original)
+
+
+def test_suite():
+    suite = TestLoader().loadTestsFromTestCase(ThreadingTests)
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="test_suite")
@@ -0,0 +1 @@
+"""These are SprintKit unit tests, which run without the Sandbox"""
@@ -0,0 +1,41 @@
+import json
+import os
+import shutil
+import tempfile
+from unittest import TestCase
+
+from sprintkit.transport import Recorder, Replayer
+
+
+class ReplayTest(TestCase):
+    """Runs the services against Sandbox responses recorded by the test."""
+
+    def get_Config(self):
+        from sprintkit.services import Config
+        config = Config(os.devnull)
+        config.update({'key': 'testkey', 'secret': 'testsecret',
+                       'protocol': 'http', 'host': 'sandbox.invalid',
+                       'path': '/developerSandbox/resources/v1'})
+        return config
+
+    def path(self, name):
+        """Returns the path of a file in a directory removed after the
+        test."""
+        if not hasattr(self, 'directory'):
+            self.directory = tempfile.mkdtemp()
+            self.addCleanup(shutil.rmtree, self.directory)
+        return os.path.join(self.directory, name)
+
+    def get_Replayer(self, responses, **options):
+        """Record `responses`, a list of (endpoint, params, data) or
+        (endpoint, params, data, elapsed), and return a Replayer of them.
+        `data` is encoded to JSON unless it is a string."""
+        path = self.path('responses.rec.gz')
+        recorder = Recorder(path)
+        with recorder:
+            for response in responses:
+                (endpoint, params, data) = response[:3]
+                if not isinstance(data, str):
+                    data = json.dumps(data)
+                recorder.record(endpoint, params, data, *response[3:])
+        return Replayer(path, **options)
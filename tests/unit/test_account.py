@@ -0,0 +1,51 @@
+from unittest import main, TestLoader
+
+from fixtures import ReplayTest
+
+
+class AccountTests(ReplayTest):
+
+    def get_Account(self, responses):
+        from sprintkit.services import Account
+        self.replayer = self.get_Replayer(responses, speed=0)
+        return Account(self.get_Config(), transport=self.replayer)
+
+    def test_get_devices_filters(self):
+        account = self.get_Account([
+            ('devices.json', {'status': 'a'}, {'a': ['5551112222']}),
+            ('devices.json', {'mdn': '5551113333'}, {'d': ['5551113333']})])
+        self.assertEqual(account.get_devices(status='a'),
+                         {'a': ['5551112222']})
+        self.assertEqual(account.get_devices(mdn='5551113333'),
+                         {'d': ['5551113333']})
+
+    def test_add_devices_records(self):
+        account = self.get_Account([
+            ('device.json', {'method': 'add', 'mdn': '5551112222'},
+             {'response': 'SUCCESS'}),
+            ('device.json', {'method': 'add', 'mdn': '5551113333'},
+             {'response': 'FAILED'})])
+        summary = account.add_devices(['5551112222', '5551113333'],
+                                      records=True)
+        self.assertEqual(summary.succeeded, ['5551112222'])
+        self.assertEqual(summary.failed, {'5551113333': 'FAILED'})
+        record = summary.records['5551113333']
+        self.assertEqual((record.code, record.endpoint, record.mdn),
+                         ('FAILED', 'device.json', '5551113333'))
+
+    def test_delete_devices_records(self):
+        account = self.get_Account([
+            ('device.json', {'method': 'delete', 'mdn': '5551112222'},
+             {'response': 'FAILED'})])
+        summary = account.delete_devices(['5551112222'], records=True)
+        self.assertEqual(summary.records['5551112222'].code, 'FAILED')
+        summary = account.delete_devices(['5551112222'])
+        self.assertEqual(summary.records, {})
+
+
+def account_suite():
+    return TestLoader().loadTestsFromTestCase(AccountTests)
+
+
+if __name__ == "__main__":
+    main(defaultTest="account_suite")
@@ -0,0 +1,206 @@
+from unittest import TestCase, main, TestLoader
+
+from sprintkit import deadline, errors
+from sprintkit.breaker import (CLOSED, HALF_OPEN, OPEN, Breakers,
+                               CircuitBreaker, is_failure)
+from sprintkit.hooks import Hooks
+
+from fixtures import ReplayTest
+
+
+class CircuitBreakerTests(TestCase):
+
+    def setUp(self):
+        self.breaker = CircuitBreaker('location.json', failure_rate=0.5,
+                                      window=4, min_requests=4,
+                                      reset_timeout=0)
+
+    def fail(self, count=1):
+        for i in range(count):
+            token = self.breaker.before()
+            self.breaker.record(errors.ConnectionError("down"), token)
+
+    def succeed(self, count=1):
+        for i in range(count):
+            token = self.breaker.before()
+            self.breaker.record(None, token)
+
+    def open(self):
+        self.fail(4)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_opens_at_failure_rate(self):
+        self.succeed(2)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.fail(1)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.opened, 1)
+
+    def test_min_requests(self):
+        self.fail(3)
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_request_errors_are_not_failures(self):
+        for i in range(4):
+            self.breaker.record(errors.SandboxError('INVALID_MDN'),
+                                self.breaker.before())
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.failures(), 0.0)
+
+    def test_closed_requests_are_not_probes(self):
+        self.assertEqual(self.breaker.before(), None)
+
+    def test_open_rejects(self):
+        self.breaker.reset_timeout = 60
+        self.open()
+        self.assertRaises(errors.CircuitOpenError, self.breaker.before)
+        self.assertEqual(self.breaker.rejected, 1)
+        self.assertTrue(0 < self.breaker.retry_after() <= 60)
+
+    def test_half_open_admits_probes(self):
+        self.open()
+        token = self.breaker.before()
+        self.assertNotEqual(token, None)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertRaises(errors.CircuitOpenError, self.breaker.before)
+
+    def test_probe_success_closes(self):
+        self.open()
+        self.breaker.record(None, self.breaker.before())
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.failures(), 0.0)
+
+    def test_probe_failure_reopens(self):
+        self.open()
+        self.breaker.record(errors.TimeoutError("slow"),
+                            self.breaker.before())
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker.opened, 2)
+
+    def test_stale_results_do_not_close(self):
+        stale = [self.breaker.before() for i in range(3)]
+        self.open()
+        probe = self.breaker.before()
+        for token in stale:
+            self.breaker.record(None, token)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertEqual(self.breaker._probing, 1)
+        self.breaker.record(None, probe)
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker._probing, 0)
+
+    def test_stale_results_while_open(self):
+        stale = self.breaker.before()
+        self.breaker.reset_timeout = 60
+        self.open()
+        self.breaker.record(None, stale)
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_probes_of_an_earlier_round(self):
+        self.open()
+        first = self.breaker.before()
+        self.breaker.record(errors.ConnectionError("down"), None)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker._open()
+        second = self.breaker.before()
+        self.breaker.record(None, first)
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.assertEqual(self.breaker._probing, 1)
+        self.breaker.record(errors.ConnectionError("down"), second)
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertEqual(self.breaker._probing, 0)
+
+    def test_several_probes(self):
+        self.breaker.probes = 2
+        self.open()
+        tokens = [self.breaker.before(), self.breaker.before()]
+        self.assertRaises(errors.CircuitOpenError, self.breaker.before)
+        self.breaker.record(None, tokens[0])
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.breaker.record(errors.ConnectionError("down"), tokens[1])
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.failures(), 1.0)
+
+
+class IsFailureTests(TestCase):
+
+    def test_errors(self):
+        self.assertTrue(is_failure(errors.ConnectionError("down")))
+        self.assertTrue(is_failure(errors.SandboxError('FAILURE')))
+        self.assertFalse(is_failure(errors.SandboxError('INVALID_MDN')))
+        self.assertTrue(is_failure(errors.HttpError(503)))
+        self.assertFalse(is_failure(errors.HttpError(404)))
+        self.assertFalse(is_failure(ValueError()))
+
+
+class BreakersTests(TestCase):
+
+    def test_one_breaker_per_endpoint(self):
+        breakers = Breakers(min_requests=1, reset_timeout=60)
+        breaker = breakers.get('location.json')
+        self.assertTrue(breakers.get('location.json') is breaker)
+        breaker.record(errors.ConnectionError("down"), breaker.before())
+        self.assertEqual(breakers.states(), {'location.json': OPEN})
+        self.assertEqual(breakers.get('presence.json').state, CLOSED)
+
+
+class ResourceTests(ReplayTest):
+
+    def setUp(self):
+        from sprintkit.services import Location
+        replayer = self.get_Replayer([
+            ('location.json', {'mdn': '5551112222'},
+             {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'})], speed=0)
+        self.breakers = Breakers(min_requests=1, reset_timeout=0)
+        self.location = Location(self.get_Config(), breakers=self.breakers,
+                                 transport=replayer)
+        self.breaker = self.breakers.get('location.json')
+
+    def half_open(self):
+        self.breaker.record(errors.ConnectionError("down"),
+                            self.breaker.before())
+        self.assertEqual(self.breaker.state, OPEN)
+
+    def test_probe(self):
+        self.half_open()
+        self.location.get_location('5551112222')
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_failing_hook(self):
+        def before_request(event):
+            raise ValueError("hook")
+        self.location.hooks = Hooks(before_request)
+        self.half_open()
+        self.assertRaises(ValueError, self.location.get_location,
+                          '5551112222')
+        self.location.hooks = None
+        # The failed call did not use up the probe.
+        self.location.get_location('5551112222')
+        self.assertEqual(self.breaker.state, CLOSED)
+
+    def test_expired_deadline(self):
+        for i in range(3):
+            with deadline.within(deadline.Deadline(0)):
+                self.assertRaises(errors.TimeoutError,
+                                  self.location.get_location, '5551112222')
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.snapshot()['requests'], 0)
+        self.half_open()
+        with deadline.within(deadline.Deadline(0)):
+            self.assertRaises(errors.TimeoutError,
+                              self.location.get_location, '5551112222')
+        self.location.get_location('5551112222')
+        self.assertEqual(self.breaker.state, CLOSED)
+
+
+def breaker_suite():
+    suite = TestLoader().loadTestsFromTestCase(CircuitBreakerTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(IsFailureTests))
+    suite.addTests(TestLoader().loadTestsFromTestCase(BreakersTests))
+    suite.addTests(TestLoader().loadTestsFromTestCase(ResourceTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="breaker_suite")
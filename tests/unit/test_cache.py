@@ -0,0 +1,198 @@
+from unittest import TestCase, main, TestLoader
+import time
+
+from sprintkit import errors
+from sprintkit.cache import ResponseCache, query
+
+from fixtures import ReplayTest
+
+
+def fence(fenceid):
+    return {'Status': 'Active', 'FenceID': str(fenceid),
+            'Name': 'fence%d' % fenceid, 'Days': 'MTWHF',
+            'Latitude': '38.91', 'Longitude': '-94.65',
+            'StartTime': '0600', 'EndTime': '1800', 'Dimensions': '2000',
+            'LastMonitorTime': 'NEVER'}
+
+
+def devices(*mdns):
+    return {'Device': [{'MDN': mdn, 'DeviceID': str(i)}
+                       for i, mdn in enumerate(mdns)]}
+
+
+def fenceids(records):
+    return [record.fenceid for record in records]
+
+
+PARAMS = {'fenceId': 1, 'timestamp': '2011-06-26', 'sig': 'abc',
+          'key': 'testkey'}
+
+
+class ResponseCacheTests(ReplayTest):
+
+    def test_query(self):
+        self.assertEqual(query(PARAMS), 'fenceId=1')
+        self.assertEqual(query({'b': 2, 'a': 1}), 'a=1&b=2')
+
+    def test_lookup(self):
+        cache = ResponseCache()
+        self.assertEqual(cache.lookup('k', 'geofence/list.json', {}), None)
+        self.assertTrue(cache.store('k', 'geofence/listDevices.json', PARAMS,
+                                    'body'))
+        (body, age) = cache.lookup('k', 'geofence/listDevices.json',
+                                   {'fenceId': 1})
+        self.assertEqual(body, 'body')
+        self.assertTrue(0 <= age < 1)
+        self.assertEqual(cache.lookup('other', 'geofence/listDevices.json',
+                                      {'fenceId': 1}), None)
+        self.assertEqual(cache.lookup('k', 'geofence/listDevices.json',
+                                      {'fenceId': 2}), None)
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=0.05, stale_if_error=0.1)
+        cache.store('k', 'geofence/list.json', {}, 'body')
+        found = cache.lookup('k', 'geofence/list.json', {})
+        self.assertTrue(cache.fresh(found))
+        time.sleep(0.06)
+        found = cache.lookup('k', 'geofence/list.json', {})
+        self.assertFalse(cache.fresh(found))
+        self.assertTrue(cache.usable(found))
+        time.sleep(0.1)
+        found = cache.lookup('k', 'geofence/list.json', {})
+        self.assertFalse(cache.usable(found))
+        self.assertFalse(cache.fresh(None))
+        self.assertFalse(cache.usable(None))
+        self.assertEqual((cache.hits, cache.misses, cache.stale), (1, 2, 1))
+
+    def test_unchanged(self):
+        cache = ResponseCache()
+        cache.store('k', 'geofence/list.json', {}, 'body')
+        self.assertFalse(cache.store('k', 'geofence/list.json', {}, 'body'))
+        self.assertEqual(cache.unchanged, 1)
+        self.assertTrue(cache.store('k', 'geofence/list.json', {}, 'new'))
+        self.assertEqual(cache.lookup('k', 'geofence/list.json', {})[0],
+                         'new')
+
+    def test_invalidate(self):
+        cache = ResponseCache()
+        for fenceid in (1, 2):
+            cache.store('k', 'geofence/listDevices.json',
+                        {'fenceId': fenceid}, 'body')
+        cache.store('k', 'geofence/list.json', {}, 'body')
+        cache.invalidate('k', 'geofence/listDevices.json', {'fenceId': 1})
+        self.assertEqual(cache.lookup('k', 'geofence/listDevices.json',
+                                      {'fenceId': 1}), None)
+        self.assertNotEqual(cache.lookup('k', 'geofence/listDevices.json',
+                                         {'fenceId': 2}), None)
+        cache.invalidate('k', 'geofence/listDevices.json')
+        self.assertEqual(cache.lookup('k', 'geofence/listDevices.json',
+                                      {'fenceId': 2}), None)
+        self.assertNotEqual(cache.lookup('k', 'geofence/list.json', {}),
+                            None)
+        cache.clear()
+        self.assertEqual(cache.lookup('k', 'geofence/list.json', {}), None)
+
+    def test_file(self):
+        path = self.path('cache.db')
+        ResponseCache(path).store('k', 'geofence/list.json', {}, 'body\0')
+        self.assertEqual(
+            ResponseCache(path).lookup('k', 'geofence/list.json', {})[0],
+            'body\0')
+
+
+class CachedCallTests(ReplayTest):
+
+    def get_GeoFence(self, responses, **options):
+        from sprintkit.services import GeoFence
+        self.replayer = self.get_Replayer(responses, speed=0)
+        self.cache = ResponseCache(**options)
+        return GeoFence(self.get_Config(), cache=self.cache,
+                        transport=self.replayer)
+
+    def test_hit(self):
+        geofence = self.get_GeoFence([
+            ('geofence/list.json', {}, {'Fence': [fence(1)]})])
+        self.assertEqual(fenceids(geofence.records()), [1])
+        self.assertEqual(fenceids(geofence.records()), [1])
+        self.assertEqual(self.replayer.replayed, 1)
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_expiry(self):
+        geofence = self.get_GeoFence([
+            ('geofence/list.json', {}, {'Fence': [fence(1)]}),
+            ('geofence/list.json', {}, {'Fence': [fence(1), fence(2)]})],
+            ttl=0.05)
+        self.assertEqual(len(geofence.records()), 1)
+        self.assertEqual(len(geofence.records()), 1)
+        time.sleep(0.06)
+        self.assertEqual(len(geofence.records()), 2)
+        self.assertEqual(self.replayer.replayed, 2)
+
+    def test_invalidated_by_writes(self):
+        geofence = self.get_GeoFence([
+            ('geofence/list.json', {}, {'Fence': [fence(1)]}),
+            ('geofence/listDevices.json', {'fenceId': 1},
+             devices('5551112222')),
+            ('geofence/listDevices.json', {'fenceId': 1},
+             devices('5551112222', '5551113333')),
+            ('geofence/addDevice.json', {'fenceId': 1, 'mdn': '5551113333'},
+             {'Message': 'DEVICE_ADDED'})])
+        (fence1,) = geofence.fences()
+        self.assertEqual(fence1.devices(), {'5551112222': 0})
+        self.assertEqual(fence1.devices(), {'5551112222': 0})
+        fence1.add_device('5551113333')
+        self.assertEqual(fence1.devices(),
+                         {'5551112222': 0, '5551113333': 1})
+        self.assertEqual(self.replayer.replayed, 4)
+
+    def test_invalidated_by_failed_writes(self):
+        geofence = self.get_GeoFence([
+            ('geofence/list.json', {}, {'Fence': [fence(1)]}),
+            ('geofence/listDevices.json', {'fenceId': 1},
+             devices('5551112222'))])
+        (fence1,) = geofence.fences()
+        fence1.devices()
+        # The change may have been made even though no answer arrived.
+        self.assertRaises(errors.ConnectionError, fence1.add_device,
+                          '5551113333')
+        fence1.devices()
+        self.assertEqual(self.replayer.replayed, 3)
+
+    def test_stale_if_error(self):
+        geofence = self.get_GeoFence([
+            ('geofence/list.json', {}, {'Fence': [fence(1)]})],
+            ttl=0.05, stale_if_error=60)
+        geofence.records()
+        time.sleep(0.06)
+        geofence.transport = self.get_Replayer([])
+        self.assertEqual(fenceids(geofence.records()), [1])
+        self.assertEqual(self.cache.stale, 1)
+
+    def test_too_stale(self):
+        geofence = self.get_GeoFence([
+            ('geofence/list.json', {}, {'Fence': [fence(1)]})], ttl=0.05)
+        geofence.records()
+        time.sleep(0.06)
+        geofence.transport = self.get_Replayer([])
+        self.assertRaises(errors.ConnectionError, geofence.records)
+        self.assertEqual(self.cache.stale, 0)
+
+    def test_errors_are_not_stored(self):
+        geofence = self.get_GeoFence([
+            ('geofence/list.json', {}, {'error': 'UNEXPECTED_ERROR'}),
+            ('geofence/list.json', {}, {'Fence': [fence(1)]})],
+            stale_if_error=60)
+        self.assertRaises(errors.SandboxError, geofence.records)
+        self.assertEqual(len(geofence.records()), 1)
+        self.assertEqual(len(geofence.records()), 1)
+        self.assertEqual(self.replayer.replayed, 2)
+
+
+def cache_suite():
+    suite = TestLoader().loadTestsFromTestCase(ResponseCacheTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(CachedCallTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="cache_suite")
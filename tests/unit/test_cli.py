@@ -0,0 +1,151 @@
+from cStringIO import StringIO
+import csv
+import json
+import sys
+import time
+from unittest import main, TestLoader
+
+from sprintkit import cli
+
+from fixtures import ReplayTest
+
+
+CONFIG = """[sprintkit]
+key = testkey
+secret = testsecret
+protocol = http
+host = sandbox.invalid
+path = /developerSandbox/resources/v1
+"""
+
+MDNS = ['5551110000', '5551110001', '5551110002', '0001110003']
+
+MANY = ['55522200%02d' % i for i in range(16)]
+
+
+class CliTests(ReplayTest):
+
+    def setUp(self):
+        responses = []
+        for i, mdn in enumerate(MDNS):
+            if mdn.startswith('000'):
+                data = {'error': 'INVALID_MDN'}
+            else:
+                data = {'lat': '38.9%i' % i, 'lon': '-94.65',
+                        'accuracy': '30'}
+            responses.append(('location.json', {'mdn': mdn}, data))
+            responses.append(('presence.json', {'mdn': mdn},
+                              {'status': 'Reachable'}))
+        for mdn in MANY:
+            responses.append(('location.json', {'mdn': mdn}, {
+                'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'}, 0.2))
+        responses.append(('geofence/list.json', {}, {'Fence': [{
+            'Status': 'Active', 'FenceID': '7', 'Name': 'hq',
+            'Days': 'MTWHF', 'Latitude': '38.91', 'Longitude': '-94.65',
+            'StartTime': '0600', 'EndTime': '1800', 'Dimensions': '2000',
+            'LastMonitorTime': 'NEVER'}]}))
+        self.get_Replayer(responses)
+        self.write('sprintkit.conf', CONFIG)
+        self.write('mdns.txt', '# test devices\n\n' + '\n'.join(MDNS) + '\n')
+        self.write('many.txt', '\n'.join(MANY))
+        # Keep the usage and configuration errors out of the test output.
+        self.addCleanup(setattr, sys, 'stderr', sys.stderr)
+        sys.stderr = StringIO()
+
+    def write(self, name, text):
+        stream = open(self.path(name), 'w')
+        try:
+            stream.write(text)
+        finally:
+            stream.close()
+
+    def read(self, name):
+        stream = open(self.path(name))
+        try:
+            return stream.read()
+        finally:
+            stream.close()
+
+    def run_cli(self, *argv):
+        return cli.main(['--config', self.path('sprintkit.conf'), '--replay',
+                         self.path('responses.rec.gz'), '--output',
+                         self.path('output'), '--quiet'] + list(argv))
+
+    def rows(self):
+        return [json.loads(line)
+                for line in self.read('output').splitlines()]
+
+    def test_parser(self):
+        args = cli.make_parser().parse_args(['locate', 'a.txt', 'b.txt'])
+        self.assertEqual((args.command, args.files, args.concurrency,
+                          args.format, args.timeout, args.resume),
+                         ('locate', ['a.txt', 'b.txt'], 8, 'jsonl', None,
+                          None))
+        args = cli.make_parser().parse_args([
+            '--concurrency', '16', '--rate', '20', '--timeout', '1.5',
+            '--format', 'csv', 'perimeter', '--lat', '38.9', '--lon',
+            '-94.6', '--radius', '2000'])
+        self.assertEqual((args.concurrency, args.rate, args.timeout,
+                          args.format, args.lat, args.lon, args.radius),
+                         (16, 20.0, 1.5, 'csv', 38.9, -94.6, 2000))
+
+    def test_usage_errors(self):
+        parser = cli.make_parser()
+        for argv in (['perimeter', '--lat', '38.9'],
+                     ['--format', 'xml', 'locate'],
+                     ['--record', 'a', '--replay', 'b', 'locate'], []):
+            self.assertRaises(SystemExit, parser.parse_args, argv)
+
+    def test_missing_config(self):
+        self.assertEqual(cli.main(['--config', self.path('missing.conf'),
+                                   'fences']), 2)
+
+    def test_read_mdns(self):
+        self.assertEqual(list(cli.read_mdns([self.path('mdns.txt')])), MDNS)
+
+    def test_locate(self):
+        self.assertEqual(self.run_cli('locate', self.path('mdns.txt')), 1)
+        rows = dict((row['mdn'], row) for row in self.rows())
+        self.assertEqual(rows['5551110001'],
+                         {'mdn': '5551110001', 'latitude': 38.91,
+                          'longitude': -94.65, 'accuracy': 30})
+        self.assertEqual(rows['0001110003'],
+                         {'mdn': '0001110003', 'error': 'INVALID_MDN'})
+        self.assertEqual(len(rows), 4)
+
+    def test_csv(self):
+        self.assertEqual(self.run_cli('--format', 'csv', 'presence',
+                                      self.path('mdns.txt')), 0)
+        rows = list(csv.reader(open(self.path('output'))))
+        self.assertEqual(rows[0], ['mdn', 'reachable', 'error'])
+        self.assertEqual(sorted(rows[1:]), [[mdn, 'True', '']
+                                            for mdn in sorted(MDNS)])
+
+    def test_resume(self):
+        self.write('done.txt', '5551110000\n')
+        self.assertEqual(self.run_cli('--resume', self.path('done.txt'),
+                                      'locate', self.path('mdns.txt')), 1)
+        self.assertEqual(sorted(row['mdn'] for row in self.rows()),
+                         sorted(MDNS[1:]))
+        self.assertEqual(sorted(self.read('done.txt').split()), MDNS[:3])
+
+    def test_fences(self):
+        self.assertEqual(self.run_cli('fences'), 0)
+        (row,) = self.rows()
+        self.assertEqual((row['fenceid'], row['name'], row['radius']),
+                         (7, 'hq', 2000))
+
+    def test_timeout_keeps_concurrency(self):
+        start = time.time()
+        self.assertEqual(self.run_cli('--timeout', '5', '--concurrency', '16',
+                                      'locate', self.path('many.txt')), 0)
+        self.assertTrue(time.time() - start < 0.4)
+        self.assertEqual(len(self.rows()), 16)
+
+
+def cli_suite():
+    return TestLoader().loadTestsFromTestCase(CliTests)
+
+
+if __name__ == "__main__":
+    main(defaultTest="cli_suite")
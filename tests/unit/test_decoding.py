@@ -0,0 +1,126 @@
+from unittest import TestCase, main, TestLoader
+import json
+
+from sprintkit.decoding import iter_groups, iter_list
+
+
+class Chunks(object):
+    """A stream that returns `chunks` one per read."""
+
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+
+    def read(self, size=-1):
+        if self.chunks:
+            return self.chunks.pop(0)
+        return ''
+
+
+def splits(document):
+    """Yield `document` whole, split in two at every offset, and one byte
+    at a time."""
+    yield [document]
+    for offset in range(1, len(document)):
+        yield [document[:offset], document[offset:]]
+    yield list(document)
+
+
+LIST = json.dumps({
+    'Message': 'OK',
+    'Device': [{'MDN': '5551112222', 'DeviceID': '1'},
+               {'MDN': '5551113333', 'Note': 'say "hi" \\ {not} [an] "end"',
+                'Nested': {'a': [1, {'b': None}], 'c': {}}},
+               [], {}, 'a "quoted" string', 12345, -1.5e3, 0.25, True, None],
+    'Count': 10,
+    'After': {'x': ['}', ']', '{']}}, indent=1)
+
+GROUPS = json.dumps({
+    'Total': 3,
+    'Fences': {'active': [{'FenceID': '1', 'Name': 'a\\"b}'}, 7.5],
+               'empty': [],
+               'inactive': [{'FenceID': '2', 'Name': u'caf\xe9 \\u00e9'}]},
+    'Status': 'done'})
+
+
+class IterListTests(TestCase):
+
+    def check(self, document, name):
+        for chunks in splits(document):
+            extra = {}
+            items = list(iter_list(Chunks(chunks), name, extra))
+            expected_extra = json.loads(document)
+            expected_items = []
+            if isinstance(expected_extra.get(name), list):
+                expected_items = expected_extra.pop(name)
+            self.assertEqual(items, expected_items, chunks)
+            self.assertEqual(extra, expected_extra, chunks)
+
+    def test_split_everywhere(self):
+        self.check(LIST, 'Device')
+
+    def test_empty_list(self):
+        self.check('{"Device": [], "Message": "NONE"}', 'Device')
+        self.check('{"Device" : [ ] }', 'Device')
+
+    def test_empty_object(self):
+        self.check('{}', 'Device')
+        self.check(' { } ', 'Device')
+
+    def test_missing_list(self):
+        self.check('{"error": "INVALID_MDN", "code": 400}', 'Device')
+
+    def test_not_a_list(self):
+        self.check('{"Device": {"MDN": "5551112222"}}', 'Device')
+
+    def test_numbers(self):
+        self.check('{"Device": [1, 22, 333.25, -4e-2, 5E+3, 0]}', 'Device')
+
+    def test_truncated(self):
+        for end in range(len(LIST)):
+            for chunks in ([LIST[:end]], list(LIST[:end])):
+                extra = {}
+                items = iter_list(Chunks(chunks), 'Device', extra)
+                self.assertRaises(ValueError, list, items)
+
+    def test_malformed(self):
+        for document in ('[1, 2]', '{"Device": [1 2]}', '{"Device" [1]}',
+                         '{"Device": [1], "a": 1 "b": 2}'):
+            self.assertRaises(ValueError, list,
+                              iter_list(Chunks([document]), 'Device', {}))
+
+
+class IterGroupsTests(TestCase):
+
+    def check(self, document, name):
+        for chunks in splits(document):
+            expected = json.loads(document)
+            groups = expected.pop(name, {})
+            extra = {}
+            pairs = list(iter_groups(Chunks(chunks), name, extra))
+            self.assertEqual(sorted(pairs),
+                             sorted((group, item)
+                                    for group, items in groups.items()
+                                    for item in items), chunks)
+            self.assertEqual(extra, expected, chunks)
+
+    def test_split_everywhere(self):
+        self.check(GROUPS, 'Fences')
+
+    def test_empty(self):
+        self.check('{"Fences": {}, "Total": 0}', 'Fences')
+        self.check('{"Fences": {"active": []}}', 'Fences')
+
+    def test_truncated(self):
+        for end in range(len(GROUPS)):
+            pairs = iter_groups(Chunks(list(GROUPS[:end])), 'Fences', {})
+            self.assertRaises(ValueError, list, pairs)
+
+
+def decoding_suite():
+    suite = TestLoader().loadTestsFromTestCase(IterListTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(IterGroupsTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="decoding_suite")
@@ -0,0 +1,110 @@
+import pickle
+import threading
+from unittest import TestCase, main, TestLoader
+
+from sprintkit import deadline, errors
+from sprintkit.hedging import HedgePolicy
+
+
+def annotated(error):
+    error.endpoint = 'location.json'
+    error.mdn = '5551112222'
+    error.elapsed = 0.25
+    error.attempt = 2
+    return error
+
+
+class ErrorTests(TestCase):
+
+    def test_codes(self):
+        self.assertEqual(errors.ConnectionError("down").code,
+                         'ConnectionError')
+        self.assertEqual(errors.SandboxError('invalid_mdn').code,
+                         'INVALID_MDN')
+        self.assertEqual(errors.HttpError(503).code, 'HTTP_503')
+
+    def test_messages(self):
+        self.assertEqual(str(errors.SandboxError('INVALID_MDN')),
+                         "This is not a valid 10 digit MDN.")
+        self.assertEqual(str(errors.GeoFenceError('FENCE_NOTFOUND')),
+                         "Could not find a fence with this Fence ID.")
+        self.assertEqual(str(errors.SandboxError('NEW_CODE')),
+                         "Unknown Sandbox Error: NEW_CODE")
+
+    def test_record(self):
+        record = annotated(errors.SandboxError('INVALID_MDN')).record()
+        self.assertEqual(record, errors.ErrorRecord(
+            'INVALID_MDN', "This is not a valid 10 digit MDN.",
+            'location.json', '5551112222', 0.25, 2))
+
+    def test_record_mdn(self):
+        record = errors.TimeoutError("The deadline passed.").record(
+            '5551113333')
+        self.assertEqual(record, errors.ErrorRecord(
+            'TimeoutError', "The deadline passed.", None, '5551113333', None,
+            None))
+        error = annotated(errors.TimeoutError("The deadline passed."))
+        self.assertEqual(error.record('5551113333').mdn, '5551112222')
+
+    def assertPickles(self, error):
+        copy = pickle.loads(pickle.dumps(annotated(error),
+                                         pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(type(copy), type(error))
+        self.assertEqual(str(copy), str(error))
+        self.assertEqual(copy.record(), error.record())
+        return copy
+
+    def test_pickle(self):
+        self.assertPickles(errors.SprintkitError("failed"))
+        self.assertPickles(errors.ConnectionError("down"))
+        self.assertPickles(errors.TimeoutError("The deadline passed."))
+        copy = self.assertPickles(errors.SandboxError('INVALID_MDN'))
+        self.assertEqual(copy.error, 'INVALID_MDN')
+        copy = self.assertPickles(errors.GeoFenceError('DEVICE_NOTFOUND'))
+        self.assertEqual(copy.msg, "This GeoFence device does not exist.")
+        copy = self.assertPickles(errors.ParsingError("bad", '{"a": '))
+        self.assertEqual((copy.error, copy.data), ("bad", '{"a": '))
+        copy = self.assertPickles(errors.HttpError(503, 'busy'))
+        self.assertEqual(copy.status, 503)
+
+    def test_pickle_circuit_open(self):
+        error = errors.CircuitOpenError('location.json', 12.5)
+        copy = pickle.loads(pickle.dumps(error))
+        self.assertEqual((copy.endpoint, copy.retry_after),
+                         ('location.json', 12.5))
+
+
+class Hanging(object):
+    """A resource whose requests never finish."""
+    metrics = None
+
+    def sign(self, endpoint, params):
+        return params
+
+    def perform(self, endpoint, params, decoder=None, attempt=1):
+        threading.Event().wait()
+
+
+class HedgeTimeoutTests(TestCase):
+
+    def test_diagnostics(self):
+        policy = HedgePolicy(initial_delay=0.01)
+        with deadline.Deadline(0.05):
+            try:
+                policy.call(Hanging(), 'location.json',
+                            {'mdn': '5551112222'})
+            except errors.TimeoutError as e:
+                error = e
+        self.assertEqual((error.endpoint, error.mdn, error.attempt),
+                         ('location.json', '5551112222', 2))
+        self.assertTrue(error.elapsed >= 0.04)
+
+
+def errors_suite():
+    suite = TestLoader().loadTestsFromTestCase(ErrorTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(HedgeTimeoutTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="errors_suite")
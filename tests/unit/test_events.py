@@ -0,0 +1,248 @@
+import json
+import threading
+import time
+from cStringIO import StringIO
+from unittest import TestCase, main, TestLoader
+from wsgiref import util
+
+from sprintkit import errors
+from sprintkit.events import (Dispatcher, EventReceiver, FenceCatalog,
+                              FenceEvent, parse_events)
+
+from fixtures import ReplayTest
+
+
+def fence(fenceid):
+    return {'Status': 'Active', 'FenceID': str(fenceid),
+            'Name': 'fence%d' % fenceid, 'Days': 'MTWHF',
+            'Latitude': '38.91', 'Longitude': '-94.65',
+            'StartTime': '0600', 'EndTime': '1800', 'Dimensions': '2000',
+            'LastMonitorTime': 'NEVER'}
+
+
+class ParseEventsTests(TestCase):
+
+    def test_json(self):
+        body = json.dumps({'fenceId': '12', 'mdn': 5551112222,
+                           'event': 'IN', 'timestamp': '2011-06-26'})
+        (event,) = parse_events(body, 'application/json')
+        self.assertEqual((event.fenceid, event.mdn, event.event,
+                          event.timestamp),
+                         (12, '5551112222', 'in', '2011-06-26'))
+
+    def test_json_list(self):
+        body = json.dumps([{'FenceID': 1, 'MDN': '5551112222', 'Event': 'in'},
+                           {'fenceid': 2, 'mdn': '5551113333',
+                            'event': 'out'}])
+        events = parse_events(body)
+        self.assertEqual([(event.fenceid, event.event) for event in events],
+                         [(1, 'in'), (2, 'out')])
+
+    def test_form(self):
+        (event,) = parse_events('fenceId=7&mdn=5551112222&event=out',
+                                'application/x-www-form-urlencoded')
+        self.assertEqual((event.fenceid, event.mdn, event.event),
+                         (7, '5551112222', 'out'))
+        self.assertEqual(event.timestamp, None)
+
+    def test_malformed(self):
+        self.assertRaises(errors.ParsingError, parse_events, '{"fenceId": ',
+                          'application/json')
+
+    def test_missing_field(self):
+        self.assertRaises(errors.ParsingError, parse_events,
+                          'fenceId=7&event=out')
+
+    def test_bad_fenceid(self):
+        self.assertRaises(errors.ParsingError, parse_events,
+                          json.dumps({'fenceId': 'x', 'mdn': '5551112222',
+                                      'event': 'in'}))
+
+
+class Catalog(object):
+
+    def __init__(self, fences):
+        self.fences = fences
+
+    def get(self, fenceid):
+        if fenceid not in self.fences:
+            raise errors.ConnectionError("unreachable")
+        return self.fences[fenceid]
+
+
+class EventReceiverTests(TestCase):
+
+    def setUp(self):
+        self.published = []
+        self.dispatcher = Dispatcher()
+        self.dispatcher.publish = self.published.append
+        self.receiver = EventReceiver(self.dispatcher,
+                                      Catalog({7: 'fence 7'}))
+
+    def request(self, method, body='', content_type='application/json'):
+        environ = {'REQUEST_METHOD': method, 'CONTENT_TYPE': content_type,
+                   'CONTENT_LENGTH': str(len(body)),
+                   'wsgi.input': StringIO(body)}
+        util.setup_testing_defaults(environ)
+        statuses = []
+
+        def start_response(status, headers):
+            statuses.append(status)
+
+        output = ''.join(self.receiver(environ, start_response))
+        return statuses[0], output
+
+    def test_post(self):
+        body = json.dumps([{'fenceId': 7, 'mdn': '5551112222', 'event': 'in'},
+                           {'fenceId': 8, 'mdn': '5551112222',
+                            'event': 'out'}])
+        self.assertEqual(self.request('POST', body), ('200 OK', 'OK\n'))
+        self.assertEqual([(event.fenceid, event.fence)
+                          for event in self.published],
+                         [(7, 'fence 7'), (8, None)])
+
+    def test_malformed(self):
+        status, output = self.request('POST', 'fenceId=7')
+        self.assertEqual(status, '400 Bad Request')
+        self.assertEqual(self.published, [])
+
+    def test_get(self):
+        status, output = self.request('GET')
+        self.assertEqual(status, '405 Method Not Allowed')
+
+
+class DispatcherTests(TestCase):
+
+    def events(self, count):
+        return [FenceEvent(i, '5551112222', 'in') for i in range(count)]
+
+    def test_batches(self):
+        dispatcher = Dispatcher(batch_size=3, batch_wait=0.01)
+        batches = []
+        dispatcher.subscribe(batches.append)
+        events = self.events(7)
+        for event in events:
+            dispatcher.publish(event)
+        dispatcher.start()
+        dispatcher.stop()
+        self.assertEqual([len(batch) for batch in batches], [3, 3, 1])
+        self.assertEqual(sum(batches, []), events)
+
+    def test_stop_delivers_queued_events(self):
+        dispatcher = Dispatcher(batch_size=500, batch_wait=10)
+        batches = []
+        dispatcher.subscribe(batches.append)
+        dispatcher.start()
+        events = self.events(5)
+        for event in events:
+            dispatcher.publish(event)
+        dispatcher.stop()
+        self.assertEqual(batches, [events])
+        self.assertEqual(dispatcher._thread, None)
+
+    def test_failing_subscriber(self):
+        dispatcher = Dispatcher(batch_size=2, batch_wait=0.01)
+        batches = []
+
+        def fail(batch):
+            raise ValueError("subscriber bug")
+
+        dispatcher.subscribe(fail)
+        dispatcher.subscribe(batches.append)
+        for event in self.events(4):
+            dispatcher.publish(event)
+        dispatcher.start()
+        dispatcher.stop()
+        self.assertEqual([len(batch) for batch in batches], [2, 2])
+
+    def test_publish_blocks_when_full(self):
+        import Queue
+        dispatcher = Dispatcher(maxsize=1)
+        dispatcher.publish(self.events(1)[0])
+        self.assertRaises(Queue.Full, dispatcher.publish,
+                          self.events(1)[0], 0.01)
+
+
+class Down(object):
+    """A transport for a Sandbox that cannot be reached."""
+
+    def __init__(self):
+        self.requests = 0
+
+    def fetch(self, resource, endpoint, params):
+        self.requests += 1
+        raise errors.ConnectionError("down")
+
+
+class FenceCatalogTests(ReplayTest):
+
+    def get_Catalog(self, lists, **options):
+        from sprintkit.services import GeoFence
+        self.replayer = self.get_Replayer([
+            ('geofence/list.json', {}, {'Fence': [fence(fenceid)
+                                                  for fenceid in fenceids]},
+             elapsed)
+            for (fenceids, elapsed) in lists])
+        self.geofence = GeoFence(self.get_Config(), transport=self.replayer)
+        return FenceCatalog(self.geofence, **options)
+
+    def test_get(self):
+        catalog = self.get_Catalog([([1, 2], 0)])
+        record = catalog.get(1)
+        self.assertEqual((record.fenceid, record.name), (1, 'fence1'))
+        self.assertEqual(catalog.get(2).fenceid, 2)
+        self.assertEqual(catalog.get(3), None)
+        self.assertEqual(self.replayer.replayed, 1)
+
+    def test_ttl(self):
+        catalog = self.get_Catalog([([1], 0), ([1, 2], 0)], ttl=0.05)
+        self.assertEqual(catalog.get(2), None)
+        time.sleep(0.06)
+        self.assertEqual(catalog.get(2).fenceid, 2)
+        self.assertEqual(self.replayer.replayed, 2)
+
+    def test_outage(self):
+        catalog = self.get_Catalog([([1], 0)], ttl=0.05, retry=0.2)
+        catalog.get(1)
+        down = self.geofence.transport = Down()
+        time.sleep(0.06)
+        for i in range(5):
+            self.assertEqual(catalog.get(1).fenceid, 1)
+        self.assertEqual(down.requests, 1)
+        time.sleep(0.2)
+        self.assertEqual(catalog.get(1).fenceid, 1)
+        self.assertEqual(down.requests, 2)
+
+    def test_first_load_fails(self):
+        catalog = self.get_Catalog([], retry=60)
+        down = self.geofence.transport = Down()
+        self.assertRaises(errors.ConnectionError, catalog.get, 1)
+        self.assertEqual(catalog.get(1), None)
+        self.assertEqual(down.requests, 1)
+
+    def test_lookups_during_reload(self):
+        catalog = self.get_Catalog([([1], 0), ([1, 2], 0.3)], ttl=0.05)
+        catalog.get(1)
+        time.sleep(0.06)
+        reload = threading.Thread(target=catalog.get, args=(1,))
+        reload.start()
+        time.sleep(0.05)
+        start = time.time()
+        self.assertEqual(catalog.get(1).fenceid, 1)
+        self.assertEqual(catalog.get(2), None)
+        self.assertTrue(time.time() - start < 0.1)
+        reload.join()
+        self.assertEqual(catalog.get(2).fenceid, 2)
+        self.assertEqual(self.replayer.replayed, 2)
+
+
+def events_suite():
+    suite = TestLoader().loadTestsFromTestCase(ParseEventsTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(EventReceiverTests))
+    suite.addTests(TestLoader().loadTestsFromTestCase(DispatcherTests))
+    suite.addTests(TestLoader().loadTestsFromTestCase(FenceCatalogTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="events_suite")
@@ -0,0 +1,97 @@
+from unittest import main, TestLoader
+import time
+
+from sprintkit import hooks
+from sprintkit.metrics import Registry
+from sprintkit.pipeline import GatedLocator, UNREACHABLE
+
+from fixtures import ReplayTest
+
+
+class GatedLocatorTests(ReplayTest):
+
+    def setUp(self):
+        from sprintkit.services import Location, Presence
+        replayer = self.get_Replayer([
+            ('presence.json', {'mdn': '5551112222'}, {'status': 'Reachable'}),
+            ('presence.json', {'mdn': '5551113333'},
+             {'status': 'Unreachable'}),
+            ('presence.json', {'mdn': '0001112222'},
+             {'error': 'INVALID_MDN'}),
+            ('presence.json', {'mdn': '5551114444'}, {'status': 'Reachable'}),
+            ('location.json', {'mdn': '5551112222'},
+             {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'})], speed=0)
+        self.replayer = replayer
+        config = self.get_Config()
+        self.metrics = Registry()
+        self.gated = GatedLocator(Presence(config, transport=replayer),
+                                  Location(config, transport=replayer),
+                                  negative_ttl=60, concurrency=2,
+                                  metrics=self.metrics)
+
+    def test_locate_if_reachable(self):
+        fixes = self.gated.locate_if_reachable(
+            ['5551112222', '5551113333', '0001112222', '5551114444'])
+        self.assertEqual(fixes.keys(), ['5551112222'])
+        self.assertEqual(fixes['5551112222'].coordinates.latitude, 38.9)
+        summary = self.gated.summary
+        self.assertEqual(summary.succeeded, ['5551112222'])
+        self.assertEqual(summary.failed,
+                         {'5551113333': UNREACHABLE,
+                          '0001112222': 'INVALID_MDN',
+                          '5551114444': 'ConnectionError'})
+        self.assertEqual(self.gated.cached, 0)
+
+    def test_negative_ttl(self):
+        self.gated.locate_if_reachable(['5551113333'])
+        replayed = self.replayer.replayed
+        self.gated.locate_if_reachable(['5551113333', '5551112222'])
+        self.assertEqual(self.gated.cached, 1)
+        self.assertEqual(self.gated.summary.failed,
+                         {'5551113333': UNREACHABLE})
+        # Only the presence and location of the reachable MDN were sent.
+        self.assertEqual(self.replayer.replayed, replayed + 2)
+
+    def test_negative_ttl_expires(self):
+        self.gated.negative_ttl = 0.05
+        self.gated.locate_if_reachable(['5551113333'])
+        time.sleep(0.1)
+        self.gated.locate_if_reachable(['5551113333'])
+        self.assertEqual(self.gated.cached, 0)
+        self.assertEqual(self.gated.summary.failed,
+                         {'5551113333': UNREACHABLE})
+        self.assertEqual(self.replayer.replayed, 2)
+
+    def test_metrics(self):
+        self.gated.locate_if_reachable(
+            ['5551112222', '5551113333', '0001112222', '5551114444'])
+        snapshot = self.metrics.snapshot()
+        self.assertEqual(sorted(snapshot), ['location', 'presence'])
+        presence = snapshot['presence']
+        self.assertEqual(presence['requests'], 4)
+        self.assertEqual(presence['errors'], {'INVALID_MDN': 1})
+        self.assertEqual(presence['phases']['network']['count'], 3)
+        location = snapshot['location']
+        self.assertEqual(location['requests'], 2)
+        self.assertEqual(location['errors'], {'ConnectionError': 1})
+        self.assertEqual(location['phases']['network']['count'], 1)
+        text = self.metrics.prometheus()
+        self.assertTrue('sprintkit_requests_total{endpoint="presence"} 4'
+                        in text.splitlines())
+
+    def test_context(self):
+        seen = []
+        self.gated.presence.hooks = hooks.Hooks(
+            lambda event: seen.append(event.context))
+        with hooks.bind(trace_id='t1'):
+            self.gated.locate_if_reachable(['5551112222', '5551113333'])
+        self.assertEqual(seen, [{'trace_id': 't1'}] * 2)
+
+
+def gated_suite():
+    suite = TestLoader().loadTestsFromTestCase(GatedLocatorTests)
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="gated_suite")
@@ -0,0 +1,43 @@
+from unittest import TestCase, main, TestLoader
+import time
+
+from sprintkit import deadline, errors
+from sprintkit.governor import RateLimiter
+
+
+class RateLimiterTests(TestCase):
+
+    def test_burst(self):
+        limiter = RateLimiter(2)
+        self.assertTrue(limiter.try_acquire())
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+
+    def test_acquire_waits(self):
+        limiter = RateLimiter(20, burst=1)
+        limiter.acquire()
+        start = time.time()
+        limiter.acquire()
+        self.assertTrue(time.time() - start >= 0.04)
+
+    def test_acquire_within_deadline(self):
+        limiter = RateLimiter(20, burst=1)
+        limiter.acquire()
+        with deadline.Deadline(1):
+            limiter.acquire()
+
+    def test_deadline_passes_first(self):
+        limiter = RateLimiter(1)
+        limiter.acquire()
+        start = time.time()
+        with deadline.Deadline(0.2):
+            self.assertRaises(errors.TimeoutError, limiter.acquire)
+        self.assertTrue(time.time() - start < 0.1)
+
+
+def governor_suite():
+    return TestLoader().loadTestsFromTestCase(RateLimiterTests)
+
+
+if __name__ == "__main__":
+    main(defaultTest="governor_suite")
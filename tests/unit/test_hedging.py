@@ -0,0 +1,87 @@
+from unittest import main, TestLoader
+import threading
+
+from sprintkit import deadline
+from sprintkit.executor import Executor
+
+from sprintkit.errors import TimeoutError
+from sprintkit.hedging import HedgePolicy
+from sprintkit.metrics import Registry
+
+from fixtures import ReplayTest
+
+
+LOCATION = {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'}
+
+
+class HedgePolicyTests(ReplayTest):
+
+    def get_Location(self, elapsed):
+        from sprintkit.services import Location
+        replayer = self.get_Replayer([
+            ('location.json', {'mdn': '5551112222'}, LOCATION, seconds)
+            for seconds in elapsed])
+        self.metrics = Registry()
+        self.policy = HedgePolicy(initial_delay=0.05)
+        return Location(self.get_Config(), hedge=self.policy,
+                        metrics=self.metrics, transport=replayer,
+                        executor=Executor(workers=1))
+
+    def test_hedge_wins(self):
+        location = self.get_Location([0.5, 0])
+        self.assertEqual(location.get_location('5551112222'), LOCATION)
+        self.assertEqual((self.policy.hedged, self.policy.hedge_wins), (1, 1))
+        metrics = self.metrics.snapshot()['location.json']
+        self.assertEqual((metrics['hedged'], metrics['hedge_wins']), (1, 1))
+        text = self.metrics.prometheus()
+        self.assertTrue('sprintkit_hedged_total{endpoint="location.json"} 1'
+                        in text)
+        self.assertTrue('sprintkit_hedge_wins_total{endpoint="location.json"}'
+                        ' 1' in text)
+
+    def test_first_request_wins(self):
+        location = self.get_Location([0.1, 0.5])
+        location.get_location('5551112222')
+        metrics = self.metrics.snapshot()['location.json']
+        self.assertEqual((metrics['hedged'], metrics['hedge_wins']), (1, 0))
+
+    def test_latency(self):
+        location = self.get_Location([0.5, 0])
+        location.get_location('5551112222')
+        # The hedge's own latency, without the delay before it was sent.
+        self.assertEqual(len(self.policy._latencies), 1)
+        self.assertTrue(self.policy._latencies[0] < 0.05)
+
+    def test_busy_executor(self):
+        location = self.get_Location([0.5, 0])
+        release = threading.Event()
+        location.executor.submit(release.wait)
+        try:
+            with deadline.within(deadline.Deadline(1)):
+                self.assertEqual(location.get_location('5551112222'),
+                                 LOCATION)
+        finally:
+            release.set()
+        self.assertEqual(self.policy.hedge_wins, 1)
+
+    def test_no_time_to_hedge(self):
+        location = self.get_Location([0.5, 0])
+        with deadline.within(deadline.Deadline(0.04)):
+            self.assertRaises(TimeoutError, location.get_location,
+                              '5551112222')
+        self.assertEqual(self.policy.hedged, 0)
+
+    def test_not_hedged(self):
+        location = self.get_Location([0])
+        location.get_location('5551112222')
+        metrics = self.metrics.snapshot()['location.json']
+        self.assertEqual((metrics['hedged'], metrics['hedge_wins']), (0, 0))
+        self.assertEqual(self.policy.requests, 1)
+
+
+def hedging_suite():
+    return TestLoader().loadTestsFromTestCase(HedgePolicyTests)
+
+
+if __name__ == "__main__":
+    main(defaultTest="hedging_suite")
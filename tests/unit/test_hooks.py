@@ -0,0 +1,120 @@
+from unittest import TestCase, main, TestLoader
+import threading
+
+from sprintkit import errors
+from sprintkit.bulk import run_bulk
+from sprintkit.executor import Executor
+from sprintkit.hooks import Hooks, bind, context, redact
+
+from fixtures import ReplayTest
+
+
+class ContextTests(TestCase):
+
+    def test_redact(self):
+        params = {'mdn': '5551112222', 'key': 'testkey', 'sig': 'abc',
+                  'secret': 'testsecret'}
+        self.assertEqual(redact(params),
+                         {'mdn': '5551112222', 'key': '***', 'sig': '***',
+                          'secret': '***'})
+        self.assertEqual(params['key'], 'testkey')
+
+    def test_bind(self):
+        self.assertEqual(context(), {})
+        with bind(trace_id='a'):
+            with bind(span='b'):
+                self.assertEqual(context(), {'trace_id': 'a', 'span': 'b'})
+            self.assertEqual(context(), {'trace_id': 'a'})
+        self.assertEqual(context(), {})
+
+
+class HooksTests(ReplayTest):
+
+    def setUp(self):
+        from sprintkit.services import Location
+        replayer = self.get_Replayer([
+            ('location.json', {'mdn': '5551112222'},
+             {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'}),
+            ('location.json', {'mdn': '5551113333'},
+             {'lat': '38.8', 'lon': '-94.64', 'accuracy': '30'}),
+            ('location.json', {'mdn': '0001112222'},
+             {'error': 'INVALID_MDN'})], speed=0)
+        self.calls = []
+        self.lock = threading.Lock()
+        hooks = Hooks(self.hook('before'), self.hook('after'),
+                      self.hook('error'))
+        self.location = Location(self.get_Config(), hooks=hooks,
+                                 transport=replayer,
+                                 executor=Executor(workers=2))
+
+    def hook(self, name):
+        def callback(event):
+            self.lock.acquire()
+            try:
+                self.calls.append((name, event.params.get('mdn'), event,
+                                   threading.current_thread()))
+            finally:
+                self.lock.release()
+        return callback
+
+    def names(self):
+        return [(name, mdn) for (name, mdn, event, thread) in self.calls]
+
+    def test_after_response(self):
+        data = self.location.get_location('5551112222')
+        self.assertEqual(self.names(), [('before', '5551112222'),
+                                        ('after', '5551112222')])
+        event = self.calls[1][2]
+        self.assertEqual(event.endpoint, 'location.json')
+        self.assertEqual(event.params['key'], '***')
+        self.assertEqual(event.params['sig'], '***')
+        self.assertEqual(event.result, data)
+        self.assertEqual(event.error, None)
+        self.assertTrue(event.elapsed >= 0)
+
+    def test_on_error(self):
+        self.assertRaises(errors.SandboxError, self.location.get_location,
+                          '0001112222')
+        self.assertEqual(self.names(), [('before', '0001112222'),
+                                        ('error', '0001112222')])
+        event = self.calls[1][2]
+        self.assertEqual(event.error.code, 'INVALID_MDN')
+        self.assertEqual(event.result, None)
+
+    def test_register(self):
+        self.location.hooks.register(after_response=self.hook('second'))
+        self.location.get_location('5551112222')
+        self.assertEqual([name for (name, mdn) in self.names()],
+                         ['before', 'after', 'second'])
+
+    def test_submit_context(self):
+        with bind(trace_id='t1'):
+            future = self.location.submit('location.json',
+                                          {'mdn': '5551112222'})
+        future.result()
+        for (name, mdn, event, thread) in self.calls:
+            self.assertEqual(event.context, {'trace_id': 't1'})
+            self.assertNotEqual(thread, threading.current_thread())
+
+    def test_run_bulk_context(self):
+        with bind(trace_id='t2'):
+            summary = run_bulk(self.location.get_location,
+                               ['5551112222', '5551113333', '0001112222'],
+                               concurrency=3)
+        self.assertEqual(len(summary.succeeded), 2)
+        self.assertEqual(len(summary.failed), 1)
+        self.assertEqual(len(self.calls), 6)
+        for (name, mdn, event, thread) in self.calls:
+            self.assertEqual(event.context, {'trace_id': 't2'})
+            self.assertNotEqual(thread, threading.current_thread())
+        self.assertEqual(context(), {})
+
+
+def hooks_suite():
+    suite = TestLoader().loadTestsFromTestCase(ContextTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(HooksTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="hooks_suite")
@@ -0,0 +1,169 @@
+import random
+import threading
+import time
+from unittest import main, TestLoader
+
+from fixtures import ReplayTest
+
+
+def fence(fenceid):
+    return {'Status': 'Active', 'FenceID': str(fenceid),
+            'Name': 'fence%d' % fenceid, 'Days': 'MTWHF',
+            'Latitude': '38.91', 'Longitude': '-94.65',
+            'StartTime': '0600', 'EndTime': '1800', 'Dimensions': '2000',
+            'LastMonitorTime': 'NEVER'}
+
+
+def devices(*mdns):
+    return {'Device': [{'MDN': mdn, 'DeviceID': str(i)}
+                       for i, mdn in enumerate(mdns)]}
+
+
+def recipients(*urls):
+    return {'Recipient': [{'MDNURL': url, 'RecipientID': str(i)}
+                          for i, url in enumerate(urls)]}
+
+
+class MembershipTests(ReplayTest):
+
+    def get_GeoFence(self, responses, **options):
+        from sprintkit.services import GeoFence
+        self.replayer = self.get_Replayer([
+            ('geofence/list.json', {}, {'Fence': [fence(1), fence(2)]}),
+            ('geofence/listDevices.json', {'fenceId': 2},
+             devices('5551112222')),
+            ('geofence/listRecipients.json', {'fenceId': 1},
+             recipients('http://example.com/1')),
+            ('geofence/listRecipients.json', {'fenceId': 2},
+             recipients('http://example.com/2'))] + responses, **options)
+        return GeoFence(self.get_Config(), transport=self.replayer)
+
+    def test_index(self):
+        geofence = self.get_GeoFence([
+            ('geofence/listDevices.json', {'fenceId': 1},
+             devices('5551112222', '5551113333'))])
+        membership = geofence.membership()
+        self.assertEqual(membership.fences_for_mdn('5551112222'),
+                         set([1, 2]))
+        self.assertEqual(membership.fences_for_mdn('5551113333'), set([1]))
+        self.assertEqual(
+            membership.fences_for_recipient('http://example.com/2'),
+            set([2]))
+        self.assertEqual(membership.devices(),
+                         {'5551112222': set([1, 2]),
+                          '5551113333': set([1])})
+        self.assertEqual(self.replayer.replayed, 5)
+
+    def test_options(self):
+        geofence = self.get_GeoFence([])
+        membership = geofence.membership()
+        self.assertEqual((membership.ttl, membership.concurrency), (300, 8))
+        self.assertTrue(geofence.membership(ttl=60, concurrency=2)
+                        is membership)
+        self.assertEqual((membership.ttl, membership.concurrency), (60, 2))
+        self.assertTrue(geofence.membership() is membership)
+        self.assertEqual(membership.ttl, 60)
+
+    def test_jitter(self):
+        geofence = self.get_GeoFence([
+            ('geofence/listDevices.json', {'fenceId': 1}, devices())])
+        random.seed(1)
+        membership = geofence.membership(ttl=100)
+        membership.devices()
+        expires = [membership._expires(fenceid) - membership._loaded[fenceid]
+                   for fenceid in (1, 2)]
+        for seconds in expires:
+            self.assertTrue(80 <= seconds <= 100)
+        self.assertNotEqual(expires[0], expires[1])
+
+    def test_reload_expired_only(self):
+        geofence = self.get_GeoFence([
+            ('geofence/listDevices.json', {'fenceId': 1}, devices())])
+        membership = geofence.membership()
+        membership.devices()
+        self.assertEqual(self.replayer.replayed, 5)
+        membership.devices()
+        self.assertEqual(self.replayer.replayed, 5)
+        membership.invalidate(1)
+        membership.devices()
+        self.assertEqual(self.replayer.replayed, 7)
+
+    def test_add_device(self):
+        geofence = self.get_GeoFence([
+            ('geofence/listDevices.json', {'fenceId': 1}, devices()),
+            ('geofence/addDevice.json', {'fenceId': 1, 'mdn': '5551113333'},
+             {'Message': 'DEVICE_ADDED'}),
+            ('geofence/listDevices.json', {'fenceId': 1},
+             devices('5551113333'))])
+        membership = geofence.membership()
+        self.assertEqual(membership.fences_for_mdn('5551113333'), set())
+        membership.fences[1].add_device('5551113333')
+        self.assertEqual(membership.fences_for_mdn('5551113333'), set([1]))
+
+    def test_delete_fence(self):
+        geofence = self.get_GeoFence([
+            ('geofence/listDevices.json', {'fenceId': 1}, devices()),
+            ('geofence/delete.json', {'fenceId': 2},
+             {'message': 'FENCE_DELETED'}),
+            ('geofence/list.json', {}, {'Fence': [fence(1)]})])
+        membership = geofence.membership()
+        self.assertEqual(membership.fences_for_mdn('5551112222'), set([2]))
+        geofence.delete_fence(membership.fences[2])
+        self.assertEqual(membership.fences_for_mdn('5551112222'), set())
+        self.assertEqual(list(membership.fences), [1])
+
+    def test_queries_do_not_wait_for_a_refresh(self):
+        geofence = self.get_GeoFence([
+            ('geofence/listDevices.json', {'fenceId': 1}, devices()),
+            ('geofence/listDevices.json', {'fenceId': 1}, devices(), 0.5)])
+        membership = geofence.membership()
+        membership.devices()
+        membership.invalidate(1)
+        thread = threading.Thread(target=membership.devices)
+        thread.start()
+        time.sleep(0.1)
+        start = time.time()
+        self.assertEqual(membership.fences_for_mdn('5551112222'), set([2]))
+        self.assertTrue(time.time() - start < 0.1)
+        thread.join()
+
+    def test_first_query_waits(self):
+        geofence = self.get_GeoFence([
+            ('geofence/listDevices.json', {'fenceId': 1}, devices(), 0.2)])
+        membership = geofence.membership()
+        found = []
+        threads = [threading.Thread(target=lambda: found.append(
+            membership.fences_for_mdn('5551112222'))) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(found, [set([2])] * 4)
+        self.assertEqual(self.replayer.replayed, 5)
+
+    def test_failed_fence_is_retried_later(self):
+        from sprintkit.hooks import Hooks
+        geofence = self.get_GeoFence([])
+        loads = []
+        geofence.hooks = Hooks(lambda event: loads.append(
+            event.params.get('fenceId')))
+        membership = geofence.membership()
+        membership.retry = 0.2
+        # The devices of fence 1 were not recorded, so loading it fails.
+        self.assertEqual(membership.fences_for_mdn('5551112222'), set([2]))
+        self.assertEqual(loads.count('1'), 1)
+        for i in range(3):
+            membership.fences_for_mdn('5551112222')
+        self.assertEqual(loads.count('1'), 1)
+        time.sleep(0.25)
+        membership.fences_for_mdn('5551112222')
+        self.assertEqual(loads.count('1'), 2)
+        self.assertEqual(loads.count('2'), 2)
+
+
+def membership_suite():
+    return TestLoader().loadTestsFromTestCase(MembershipTests)
+
+
+if __name__ == "__main__":
+    main(defaultTest="membership_suite")
@@ -0,0 +1,106 @@
+from unittest import TestCase, main, TestLoader
+
+from sprintkit import errors
+from sprintkit.metrics import Histogram, Registry
+
+from fixtures import ReplayTest
+
+
+class HistogramTests(TestCase):
+
+    def test_buckets(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0, 3.0):
+            histogram.observe(value)
+        snapshot = histogram.snapshot()
+        self.assertEqual(snapshot['buckets'],
+                         [(0.1, 2), (1.0, 3), ('+Inf', 5)])
+        self.assertEqual(snapshot['count'], 5)
+        self.assertAlmostEqual(snapshot['sum'], 5.65)
+
+    def test_empty(self):
+        self.assertEqual(Histogram((1,)).snapshot(),
+                         {'count': 0, 'sum': 0,
+                          'buckets': [(1, 0), ('+Inf', 0)]})
+
+
+class RegistryTests(ReplayTest):
+
+    def setUp(self):
+        from sprintkit.services import Location
+        replayer = self.get_Replayer([
+            ('location.json', {'mdn': '5551112222'},
+             {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'}),
+            ('location.json', {'mdn': '0001112222'},
+             {'error': 'INVALID_MDN'}),
+            ('location.json', {'mdn': '5551113333'}, '{"lat": ')], speed=0)
+        self.metrics = Registry()
+        self.location = Location(self.get_Config(), metrics=self.metrics,
+                                 transport=replayer)
+
+    def test_requests(self):
+        self.location.get_location('5551112222')
+        self.location.get_location('5551112222')
+        snapshot = self.metrics.snapshot()['location.json']
+        self.assertEqual(snapshot['requests'], 2)
+        self.assertEqual(snapshot['errors'], {})
+        for phase in ('sign', 'network', 'decode', 'check'):
+            self.assertEqual(snapshot['phases'][phase]['count'], 2)
+        self.assertEqual(snapshot['sizes']['buckets'][0], (256, 2))
+
+    def test_errors(self):
+        self.assertRaises(errors.SandboxError, self.location.get_location,
+                          '0001112222')
+        self.assertRaises(errors.SandboxError, self.location.get_location,
+                          '0001112222')
+        self.assertRaises(errors.ParsingError, self.location.get_location,
+                          '5551113333')
+        self.assertRaises(errors.ConnectionError, self.location.get_location,
+                          '5551114444')
+        snapshot = self.metrics.snapshot()['location.json']
+        self.assertEqual(snapshot['requests'], 4)
+        self.assertEqual(snapshot['errors'],
+                         {'INVALID_MDN': 2, 'ParsingError': 1,
+                          'ConnectionError': 1})
+        self.assertEqual(snapshot['phases']['network']['count'], 3)
+        self.assertEqual(snapshot['phases']['check']['count'], 0)
+
+    def test_prometheus(self):
+        self.location.get_location('5551112222')
+        self.assertRaises(errors.SandboxError, self.location.get_location,
+                          '0001112222')
+        lines = self.metrics.prometheus().splitlines()
+        for line in ('# TYPE sprintkit_requests_total counter',
+                     'sprintkit_requests_total{endpoint="location.json"} 2',
+                     '# TYPE sprintkit_errors_total counter',
+                     'sprintkit_errors_total{endpoint="location.json",'
+                     'code="INVALID_MDN"} 1',
+                     '# TYPE sprintkit_phase_seconds histogram',
+                     'sprintkit_phase_seconds_bucket{endpoint="location.json",'
+                     'phase="network",le="+Inf"} 2',
+                     'sprintkit_phase_seconds_count{endpoint="location.json",'
+                     'phase="check"} 1',
+                     'sprintkit_response_bytes_bucket{endpoint='
+                     '"location.json",le="256"} 2',
+                     'sprintkit_response_bytes_count{endpoint='
+                     '"location.json"} 2'):
+            self.assertTrue(line in lines, line)
+        for line in lines:
+            if not line.startswith('#'):
+                (name, value) = line.rsplit(' ', 1)
+                float(value)
+
+    def test_reset(self):
+        self.location.get_location('5551112222')
+        self.metrics.reset()
+        self.assertEqual(self.metrics.snapshot(), {})
+
+
+def metrics_suite():
+    suite = TestLoader().loadTestsFromTestCase(HistogramTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(RegistryTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="metrics_suite")
@@ -0,0 +1,180 @@
+from unittest import main, TestLoader
+from datetime import datetime
+import math
+
+from sprintkit.events import Dispatcher
+from sprintkit.gps import Coordinates, EARTH_RADIUS, Gps2dFix
+from sprintkit.monitor import FenceIndex, Monitor
+from sprintkit.services import Fence
+
+from fixtures import ReplayTest
+
+
+CENTER = (38.9, -94.65)
+# A Monday inside and outside the fences' 0600-1600 schedule.
+DAY = datetime(2011, 6, 27, 12, 0)
+NIGHT = datetime(2011, 6, 27, 20, 0)
+
+
+def north(meters, center=CENTER):
+    """Returns the point `meters` north of `center`."""
+    return (center[0] + math.degrees(meters / float(EARTH_RADIUS)), center[1])
+
+
+def fix(point, hepe=0, when=DAY):
+    return Gps2dFix(when, Coordinates(point), errors={'hepe': hepe})
+
+
+class FenceTest(ReplayTest):
+
+    def make_fence(self, fenceid, center=CENTER, radius=1000,
+                   notify_event='both', status='active'):
+        return Fence(fenceid, fenceid, Coordinates(center), radius,
+                     'SMTWHFA', '0600', '1600', status, self.get_Config(),
+                     notify_event=notify_event)
+
+
+class FenceIndexTests(FenceTest):
+
+    def test_candidates(self):
+        index = FenceIndex([self.make_fence('a')])
+        self.assertEqual(list(index.candidates(*CENTER)), ['a'])
+        self.assertEqual(list(index.candidates(*north(900))), ['a'])
+        self.assertEqual(list(index.candidates(10.0, 10.0)), [])
+
+    def test_cell_boundary(self):
+        # The fence straddles the boundary between two rows of cells.
+        center = (38.95, -94.625)
+        index = FenceIndex([self.make_fence('a', center, 500)])
+        below = (38.9499999, -94.625)
+        self.assertNotEqual(index._cell(*center), index._cell(*below))
+        self.assertEqual(list(index.candidates(*center)), ['a'])
+        self.assertEqual(list(index.candidates(*below)), ['a'])
+
+    def test_add_remove(self):
+        index = FenceIndex([self.make_fence('a'),
+                            self.make_fence('b', radius=50000)])
+        self.assertEqual(sorted(index.candidates(*CENTER)), ['a', 'b'])
+        index.add(self.make_fence('a', (10.0, 10.0)))
+        self.assertEqual(list(index.candidates(*CENTER)), ['b'])
+        self.assertEqual(list(index.candidates(10.0, 10.0)), ['a'])
+        index.remove('a')
+        index.remove('b')
+        index.remove('missing')
+        self.assertEqual(index._cells, {})
+        self.assertEqual(index.fences, {})
+
+
+class MonitorTests(FenceTest):
+
+    def get_Monitor(self, *fences, **options):
+        self.dispatcher = Dispatcher()
+        return Monitor(FenceIndex(fences), self.dispatcher, **options)
+
+    def published(self):
+        """Returns the events queued on the dispatcher."""
+        queue = self.dispatcher.queue
+        return [queue.get_nowait() for i in range(queue.qsize())]
+
+    def test_enter_exit(self):
+        monitor = self.get_Monitor(self.make_fence('a'))
+        self.assertEqual(monitor.update('5551112222', fix(north(2000))), [])
+        (event,) = monitor.update('5551112222', fix(CENTER))
+        self.assertEqual((event.fenceid, event.mdn, event.event),
+                         ('a', '5551112222', 'in'))
+        self.assertEqual(event.timestamp, DAY)
+        self.assertEqual(monitor.inside('5551112222'), ('a',))
+        self.assertEqual(monitor.update('5551112222', fix(north(500))), [])
+        (event,) = monitor.update('5551112222', fix(north(2000)))
+        self.assertEqual(event.event, 'out')
+        self.assertEqual(monitor.inside('5551112222'), ())
+        self.assertEqual([e.event for e in self.published()], ['in', 'out'])
+
+    def test_fence_edge(self):
+        monitor = self.get_Monitor(self.make_fence('a'))
+        self.assertEqual(monitor.update('5551112222', fix(north(1000.5))),
+                         [])
+        (event,) = monitor.update('5551112222', fix(north(999.5)))
+        self.assertEqual(event.event, 'in')
+        (event,) = monitor.update('5551112222', fix(north(1000.5)))
+        self.assertEqual(event.event, 'out')
+
+    def test_hysteresis(self):
+        monitor = self.get_Monitor(self.make_fence('a'))
+        # Within one HEPE inside the edge is not enough to enter...
+        self.assertEqual(monitor.update('5551112222', fix(north(980), 50)), [])
+        (event,) = monitor.update('5551112222', fix(north(940), 50))
+        self.assertEqual(event.event, 'in')
+        # ...nor within one HEPE outside it to leave.
+        for meters in (1040, 960, 1049, 1000):
+            self.assertEqual(monitor.update('5551112222',
+                                            fix(north(meters), 50)), [])
+        self.assertEqual(monitor.inside('5551112222'), ('a',))
+        (event,) = monitor.update('5551112222', fix(north(1060), 50))
+        self.assertEqual(event.event, 'out')
+        self.assertEqual(len(self.published()), 2)
+
+    def test_hysteresis_small_fence(self):
+        # A HEPE larger than the radius still lets a device enter at half
+        # the radius.
+        monitor = self.get_Monitor(self.make_fence('a', radius=100))
+        self.assertEqual(monitor.update('5551112222', fix(north(60), 500)),
+                         [])
+        (event,) = monitor.update('5551112222', fix(north(40), 500))
+        self.assertEqual(event.event, 'in')
+
+    def test_notify_event(self):
+        monitor = self.get_Monitor(self.make_fence('in', notify_event='in'),
+                                   self.make_fence('out', notify_event='out'))
+        events = monitor.update('5551112222', fix(CENTER))
+        self.assertEqual([(e.fenceid, e.event) for e in events],
+                         [('in', 'in')])
+        self.assertEqual(sorted(monitor.inside('5551112222')), ['in', 'out'])
+        events = monitor.update('5551112222', fix(north(2000)))
+        self.assertEqual([(e.fenceid, e.event) for e in events],
+                         [('out', 'out')])
+        self.assertEqual(len(self.published()), 2)
+
+    def test_schedule(self):
+        monitor = self.get_Monitor(self.make_fence('a'))
+        self.assertEqual(monitor.update('5551112222', fix(CENTER, when=NIGHT)),
+                         [])
+        self.assertEqual(monitor.inside('5551112222'), ())
+        (event,) = monitor.update('5551112222', fix(CENTER))
+        self.assertEqual(event.event, 'in')
+        # Leaving while the fence is inactive is not noticed until it is
+        # active again.
+        self.assertEqual(monitor.update('5551112222',
+                                        fix(north(2000), when=NIGHT)), [])
+        self.assertEqual(monitor.inside('5551112222'), ('a',))
+        (event,) = monitor.update('5551112222', fix(north(2000)))
+        self.assertEqual(event.event, 'out')
+
+    def test_inactive_fence(self):
+        monitor = self.get_Monitor(self.make_fence('a', status='inactive'))
+        self.assertEqual(monitor.update('5551112222', fix(CENTER)), [])
+        monitor.use_schedule = False
+        (event,) = monitor.update('5551112222', fix(CENTER))
+        self.assertEqual(event.event, 'in')
+
+    def test_feed(self):
+        monitor = self.get_Monitor(self.make_fence('a'),
+                                   self.make_fence('b', north(5000)))
+        events = list(monitor.feed([('5551112222', fix(CENTER)),
+                                    ('5551113333', fix(north(5000))),
+                                    ('5551112222', fix(north(5000)))]))
+        self.assertEqual([(e.mdn, e.fenceid, e.event) for e in events],
+                         [('5551112222', 'a', 'in'),
+                          ('5551113333', 'b', 'in'),
+                          ('5551112222', 'a', 'out'),
+                          ('5551112222', 'b', 'in')])
+
+
+def monitor_suite():
+    suite = TestLoader().loadTestsFromTestCase(FenceIndexTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(MonitorTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="monitor_suite")
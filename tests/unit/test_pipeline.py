@@ -0,0 +1,100 @@
+import pickle
+import threading
+import time
+from unittest import TestCase, main, TestLoader
+
+from sprintkit import deadline, hooks
+from sprintkit.pipeline import FixBatch, LocationPipeline, distances
+
+from fixtures import ReplayTest
+
+
+class FixBatchTests(TestCase):
+
+    def test_pickle(self):
+        batch = FixBatch()
+        batch.append('5551112222', 38.9, -94.65, 30)
+        batch.append('5551113333', 39.1, -94.5, 500)
+        copy = pickle.loads(pickle.dumps(batch, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(list(copy), list(batch))
+        self.assertEqual(list(copy), [('5551112222', 38.9, -94.65, 30.0),
+                                      ('5551113333', 39.1, -94.5, 500.0)])
+
+    def test_empty(self):
+        copy = pickle.loads(pickle.dumps(FixBatch()))
+        self.assertEqual(len(copy), 0)
+        self.assertEqual(list(copy), [])
+
+
+MDNS = ['55511%05d' % i for i in range(10)]
+
+
+class LocationPipelineTests(ReplayTest):
+
+    def get_Pipeline(self, elapsed=0, **options):
+        from sprintkit.services import Location
+        self.replayer = self.get_Replayer([
+            ('location.json', {'mdn': mdn},
+             {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'}, elapsed)
+            for mdn in MDNS])
+        location = Location(self.get_Config(), transport=self.replayer)
+        return LocationPipeline(location, **options)
+
+    def test_batches(self):
+        pipeline = self.get_Pipeline(batch_size=4)
+        batches = list(pipeline.batches(MDNS))
+        self.assertEqual(sorted(len(batch) for batch in batches), [2, 4, 4])
+        self.assertEqual(sorted(mdn for batch in batches
+                                for (mdn, lat, lon, hepe) in batch), MDNS)
+        self.assertEqual(len(pipeline.summary.succeeded), 10)
+
+    def test_map(self):
+        pipeline = self.get_Pipeline(batch_size=3, processes=2)
+        results = list(pipeline.map(distances, MDNS, 38.9, -94.65))
+        self.assertEqual(len(results), 4)
+        found = dict(pair for result in results for pair in result)
+        self.assertEqual(sorted(found), MDNS)
+        for meters in found.values():
+            self.assertTrue(meters < 1)
+
+    def test_context(self):
+        pipeline = self.get_Pipeline(batch_size=4)
+        seen = []
+        pipeline.location.hooks = hooks.Hooks(
+            lambda event: seen.append(event.context))
+        with hooks.bind(trace_id='t1'):
+            list(pipeline.batches(MDNS))
+        self.assertEqual(seen, [{'trace_id': 't1'}] * len(MDNS))
+
+    def test_deadline(self):
+        pipeline = self.get_Pipeline(elapsed=0.05, concurrency=1)
+        with deadline.within(deadline.Deadline(0.12)):
+            batches = list(pipeline.batches(MDNS))
+        located = sum(len(batch) for batch in batches)
+        self.assertTrue(0 < located < len(MDNS))
+        self.assertEqual(len(pipeline.summary.succeeded), located)
+        self.assertEqual(set(pipeline.summary.failed.values()),
+                         set(['TimeoutError']))
+
+    def test_stop_early(self):
+        pipeline = self.get_Pipeline(elapsed=0.02, batch_size=1,
+                                     concurrency=1)
+        running = threading.active_count()
+        batches = pipeline.batches(MDNS)
+        batches.next()
+        batches.close()
+        stop = time.time() + 2
+        while threading.active_count() > running and time.time() < stop:
+            time.sleep(0.01)
+        self.assertEqual(threading.active_count(), running)
+        self.assertTrue(self.replayer.replayed < len(MDNS))
+
+
+def pipeline_suite():
+    suite = TestLoader().loadTestsFromTestCase(FixBatchTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(LocationPipelineTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="pipeline_suite")
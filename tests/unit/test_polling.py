@@ -0,0 +1,164 @@
+from unittest import TestCase, main, TestLoader
+from datetime import datetime
+import time
+
+from sprintkit.gps import Coordinates, Gps2dFix
+from sprintkit.polling import PollingScheduler, Track
+
+from fixtures import ReplayTest
+
+
+def fix(lat, lon, hepe=30):
+    return Gps2dFix(datetime.now(), Coordinates((lat, lon)),
+                    errors={'hepe': hepe})
+
+
+class AdaptTests(TestCase):
+
+    def setUp(self):
+        self.scheduler = PollingScheduler(None, 10, target_distance=500,
+                                          min_interval=60, max_interval=3600,
+                                          initial_interval=300)
+        self.track = Track('5551112222', 300, 0)
+        self.track.fix = fix(38.9, -94.65)
+        self.track.located = 1000.0
+
+    def test_first_fix(self):
+        track = Track('5551112222', 300, 0)
+        self.assertEqual(self.scheduler.adapt(track, fix(38.9, -94.65), 1100),
+                         300)
+
+    def test_stationary(self):
+        interval = self.scheduler.adapt(self.track, fix(38.9, -94.65), 1300)
+        self.assertEqual(interval, (300 + 3600) / 2.0)
+
+    def test_noise(self):
+        # Less movement than the HEPE of the fixes is not movement.
+        interval = self.scheduler.adapt(self.track,
+                                        fix(38.9002, -94.65, hepe=100), 1300)
+        self.assertEqual(interval, (300 + 3600) / 2.0)
+
+    def test_moving(self):
+        moved = fix(38.91, -94.65)
+        distance = moved.coordinates - self.track.fix.coordinates - 30
+        interval = self.scheduler.adapt(self.track, moved, 1300)
+        self.assertAlmostEqual(interval, (300 + 500 * 300.0 / distance) / 2.0)
+        self.assertTrue(interval < 300)
+
+
+class BudgetTests(TestCase):
+
+    def test_due(self):
+        scheduler = PollingScheduler(None, 2)
+        now = time.time()
+        for (index, mdn) in enumerate(['5551110001', '5551110002',
+                                       '5551110003', '5551110004']):
+            scheduler.track(mdn, due=now - index)
+        scheduler.track('5551110005', due=now + 60)
+        taken = scheduler.due(now)
+        self.assertEqual([track.mdn for track in taken],
+                         ['5551110004', '5551110003'])
+        self.assertEqual(scheduler.due(now), [])
+        scheduler.budget._tokens = scheduler.budget.burst
+        self.assertEqual([track.mdn for track in scheduler.due(now)],
+                         ['5551110002', '5551110001'])
+
+    def test_untrack(self):
+        scheduler = PollingScheduler(None, 10)
+        scheduler.track('5551110001', due=1)
+        scheduler.track('5551110002', due=2)
+        scheduler.untrack('5551110001')
+        self.assertEqual(scheduler.next_due(), 2)
+        self.assertEqual([track.mdn for track in scheduler.due(10)],
+                         ['5551110002'])
+        self.assertEqual(scheduler.next_due(), None)
+
+
+class PollTests(ReplayTest):
+
+    def setUp(self):
+        from sprintkit.services import Location
+        replayer = self.get_Replayer([
+            ('location.json', {'mdn': '5551112222'},
+             {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'}),
+            ('location.json', {'mdn': '5551113333'},
+             {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'}),
+            ('location.json', {'mdn': '5551113333'},
+             {'lat': '38.95', 'lon': '-94.65', 'accuracy': '30'})], speed=0)
+        self.fixes = []
+        location = Location(self.get_Config(), transport=replayer)
+        self.scheduler = PollingScheduler(location, 100,
+                                          on_fix=self.on_fix,
+                                          min_interval=60, max_interval=3600,
+                                          initial_interval=300)
+
+    def on_fix(self, mdn, fix):
+        self.fixes.append((mdn, fix.coordinates.latitude))
+
+    def test_poll(self):
+        scheduler = self.scheduler
+        scheduler.track('5551112222')
+        scheduler.track('5551113333')
+        summary = scheduler.poll()
+        self.assertEqual(sorted(summary.succeeded),
+                         ['5551112222', '5551113333'])
+        self.assertEqual(sorted(self.fixes), [('5551112222', 38.9),
+                                              ('5551113333', 38.9)])
+        stationary = scheduler.tracks['5551112222']
+        moving = scheduler.tracks['5551113333']
+        self.assertEqual(stationary.interval, 300)
+        self.assertTrue(stationary.due > time.time() + 290)
+        self.assertEqual(scheduler.poll().succeeded, [])
+        summary = scheduler.poll(now=time.time() + 300)
+        self.assertEqual(len(summary.succeeded), 2)
+        self.assertEqual(stationary.interval, (300 + 3600) / 2.0)
+        # Half way from 300 towards the few milliseconds between the polls.
+        self.assertTrue(150 <= moving.interval < 151)
+        scheduler.poll(now=time.time() + 3600)
+        self.assertTrue(75 <= moving.interval < 76)
+        scheduler.poll(now=time.time() + 3600)
+        self.assertEqual(moving.interval, 60)
+        self.assertTrue(3000 < stationary.interval < 3600)
+        self.assertEqual(moving.fix.coordinates.latitude, 38.95)
+
+    def test_failure(self):
+        scheduler = self.scheduler
+        scheduler.track('5551114444', interval=1000)
+        summary = scheduler.poll()
+        self.assertEqual(summary.failed.keys(), ['5551114444'])
+        track = scheduler.tracks['5551114444']
+        self.assertEqual(track.interval, 2000)
+        self.assertEqual(track.failures, 1)
+        scheduler.poll(now=time.time() + 2000)
+        self.assertEqual(track.interval, 3600)
+        self.assertEqual(track.failures, 2)
+        self.assertEqual(self.fixes, [])
+
+
+    def test_on_fix_fails(self):
+        def on_fix(mdn, fix):
+            raise ValueError(mdn)
+        scheduler = self.scheduler
+        scheduler.on_fix = on_fix
+        scheduler.concurrency = 1
+        now = time.time()
+        scheduler.track('5551112222', due=now - 2)
+        scheduler.track('5551113333', due=now - 1)
+        self.assertRaises(ValueError, scheduler.poll)
+        located = scheduler.tracks['5551112222']
+        self.assertTrue(located.due > now + 290)
+        # The device that was not polled is still due.
+        self.assertEqual(scheduler.next_due(), now - 1)
+        self.assertRaises(ValueError, scheduler.poll)
+        self.assertTrue(scheduler.next_due() > now + 290)
+
+
+def polling_suite():
+    suite = TestLoader().loadTestsFromTestCase(AdaptTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(BudgetTests))
+    suite.addTests(TestLoader().loadTestsFromTestCase(PollTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="polling_suite")
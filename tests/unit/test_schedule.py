@@ -0,0 +1,163 @@
+from unittest import TestCase, main, TestLoader
+from datetime import datetime
+
+from sprintkit.gps import SPRINTHQ
+from sprintkit.schedule import (MINUTES_PER_WEEK, Schedule, ScheduleIndex,
+                                minute_of_week, parse_time)
+from sprintkit.services import Fence
+
+from fixtures import ReplayTest
+
+
+# Days of the week of Sunday, June 26 2011, which ends in July.
+SUNDAY = 26
+MONDAY = 27
+TUESDAY = 28
+FRIDAY = 1
+SATURDAY = 2
+
+
+def at(day, hour, minute=0, second=0):
+    if day < SUNDAY:
+        return datetime(2011, 7, day, hour, minute, second)
+    return datetime(2011, 6, day, hour, minute, second)
+
+
+class TimeTests(TestCase):
+
+    def test_parse_time(self):
+        self.assertEqual(parse_time('0000'), 0)
+        self.assertEqual(parse_time('0630'), 390)
+        self.assertEqual(parse_time('2359'), 1439)
+        for value in ('630', '06:30', '2400', '0760', 'abcd'):
+            self.assertRaises(ValueError, parse_time, value)
+
+    def test_minute_of_week(self):
+        self.assertEqual(minute_of_week(at(SUNDAY, 0)), 0)
+        self.assertEqual(minute_of_week(at(MONDAY, 1, 30)), 1440 + 90)
+        self.assertEqual(minute_of_week(at(SATURDAY, 23, 59)),
+                         MINUTES_PER_WEEK - 1)
+
+
+class ScheduleTests(TestCase):
+
+    def test_daytime(self):
+        schedule = Schedule('SMTWHF', '0600', '1600')
+        self.assertTrue(schedule.is_active_at(at(SUNDAY, 7)))
+        self.assertFalse(schedule.is_active_at(at(SATURDAY, 7)))
+        self.assertFalse(schedule.is_active_at(at(MONDAY, 5, 59)))
+        self.assertTrue(schedule.is_active_at(at(MONDAY, 6)))
+        self.assertTrue(schedule.is_active_at(at(MONDAY, 15, 59)))
+        self.assertFalse(schedule.is_active_at(at(MONDAY, 16)))
+
+    def test_bad_days(self):
+        self.assertRaises(ValueError, Schedule, 'MX', '0600', '1600')
+        self.assertEqual(Schedule('mt', '0600', '1600').days, 'MT')
+
+    def test_overnight(self):
+        schedule = Schedule('F', '2200', '0200')
+        self.assertFalse(schedule.is_active_at(at(FRIDAY, 21, 59)))
+        self.assertTrue(schedule.is_active_at(at(FRIDAY, 22)))
+        self.assertTrue(schedule.is_active_at(at(SATURDAY, 1, 59)))
+        self.assertFalse(schedule.is_active_at(at(SATURDAY, 2)))
+        self.assertFalse(schedule.is_active_at(at(SATURDAY, 22)))
+
+    def test_saturday_wraps_to_sunday(self):
+        schedule = Schedule('A', '2200', '0200')
+        self.assertTrue(schedule.is_active_at(at(SATURDAY, 23, 59)))
+        self.assertTrue(schedule.is_active_at(at(SUNDAY, 0)))
+        self.assertTrue(schedule.is_active_at(at(SUNDAY, 1, 59)))
+        self.assertFalse(schedule.is_active_at(at(SUNDAY, 2)))
+        self.assertFalse(schedule.is_active_at(at(SUNDAY, 22)))
+        self.assertEqual(bin(schedule.mask).count('1'), 240)
+
+    def test_start_equals_end(self):
+        schedule = Schedule('M', '0800', '0800')
+        self.assertFalse(schedule.is_active_at(at(MONDAY, 7, 59)))
+        self.assertTrue(schedule.is_active_at(at(MONDAY, 8)))
+        self.assertTrue(schedule.is_active_at(at(TUESDAY, 7, 59)))
+        self.assertFalse(schedule.is_active_at(at(TUESDAY, 8)))
+        self.assertEqual(schedule.next_transition(at(MONDAY, 9)),
+                         at(TUESDAY, 8))
+
+    def test_whole_week(self):
+        schedule = Schedule('SMTWHFA', '0000', '0000')
+        self.assertTrue(schedule.is_active_at(at(SATURDAY, 23, 59)))
+        self.assertEqual(schedule.next_transition(at(MONDAY, 9)), None)
+        self.assertEqual(Schedule('', '0600', '1600').next_transition(
+            at(MONDAY, 9)), None)
+
+    def test_next_transition(self):
+        schedule = Schedule('SMTWHF', '0600', '1600')
+        self.assertEqual(schedule.next_transition(at(SUNDAY, 7)),
+                         at(SUNDAY, 16))
+        self.assertEqual(schedule.next_transition(at(SUNDAY, 15, 59, 30)),
+                         at(SUNDAY, 16))
+        self.assertEqual(schedule.next_transition(at(SUNDAY, 16)),
+                         at(MONDAY, 6))
+        # From Friday evening the next start is on Sunday.
+        self.assertEqual(schedule.next_transition(at(FRIDAY, 17)),
+                         datetime(2011, 7, 3, 6, 0))
+
+    def test_next_transition_wraps(self):
+        schedule = Schedule('A', '2200', '0200')
+        self.assertEqual(schedule.next_transition(at(SATURDAY, 23, 30)),
+                         datetime(2011, 7, 3, 2, 0))
+        self.assertEqual(schedule.next_transition(at(SUNDAY, 1)),
+                         at(SUNDAY, 2))
+        self.assertEqual(schedule.next_transition(at(SUNDAY, 3)),
+                         at(SATURDAY, 22))
+
+    def test_compile(self):
+        schedule = Schedule.compile('MT', '0600', '1600')
+        self.assertTrue(Schedule.compile('MT', '0600', '1600') is schedule)
+        self.assertFalse(Schedule.compile('MT', '0600', '1700') is schedule)
+
+
+class ScheduleIndexTests(ReplayTest):
+
+    def make_fence(self, fenceid, days, start, end, status='active'):
+        return Fence(fenceid, fenceid, SPRINTHQ, 2000, days, start, end,
+                     status, self.get_Config())
+
+    def test_fence_schedule(self):
+        fence = self.make_fence('a', 'SMTWHF', '0600', '1600')
+        self.assertTrue(fence.schedule is
+                        Schedule.compile('SMTWHF', '0600', '1600'))
+        self.assertTrue(fence.is_active_at(at(SUNDAY, 7)))
+        self.assertFalse(fence.is_active_at(at(SATURDAY, 7)))
+        self.assertEqual(fence.next_transition(at(SUNDAY, 7)),
+                         at(SUNDAY, 16))
+        fence.status = 'inactive'
+        self.assertFalse(fence.is_active_at(at(SUNDAY, 7)))
+
+    def test_active_at(self):
+        index = ScheduleIndex([
+            self.make_fence('day', 'MTWHF', '0600', '1600'),
+            self.make_fence('day2', 'MTWHF', '0600', '1600'),
+            self.make_fence('night', 'A', '2200', '0200'),
+            self.make_fence('off', 'SMTWHFA', '0000', '0000', 'inactive')])
+        self.assertEqual(len(index.groups), 2)
+        self.assertEqual(sorted(fence.fenceid for fence in
+                                index.active_at(at(MONDAY, 12))),
+                         ['day', 'day2'])
+        self.assertEqual([fence.fenceid for fence in
+                          index.active_at(at(SUNDAY, 1))], ['night'])
+        self.assertEqual(index.active_at(at(SUNDAY, 12)), [])
+        self.assertEqual(index.next_transition(at(SUNDAY, 1)),
+                         at(SUNDAY, 2))
+        self.assertEqual(index.next_transition(at(SUNDAY, 3)),
+                         at(MONDAY, 6))
+        self.assertEqual(ScheduleIndex([]).next_transition(at(SUNDAY, 3)),
+                         None)
+
+
+def schedule_suite():
+    suite = TestLoader().loadTestsFromTestCase(TimeTests)
+    suite.addTests(TestLoader().loadTestsFromTestCase(ScheduleTests))
+    suite.addTests(TestLoader().loadTestsFromTestCase(ScheduleIndexTests))
+    return suite
+
+
+if __name__ == "__main__":
+    main(defaultTest="schedule_suite")
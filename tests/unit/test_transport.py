@@ -0,0 +1,90 @@
+import threading
+import time
+from unittest import main, TestLoader
+
+from sprintkit import errors
+from sprintkit.transport import RecordedResponse, Recorder, Replayer
+
+from fixtures import ReplayTest
+
+
+LOCATION = {'lat': '38.9', 'lon': '-94.65', 'accuracy': '30'}
+
+
+class Sandbox(object):
+    """Stands in for a resource when recording."""
+
+    def get(self, endpoint, params_dict):
+        return RecordedResponse('{"status": "Reachable"}')
+
+
+class ReplayerTests(ReplayTest):
+
+    def test_replay(self):
+        from sprintkit.services import Location
+        replayer = self.get_Replayer([
+            ('location.json', {'mdn': '5551112222'}, LOCATION)], speed=0)
+        location = Location(self.get_Config(), transport=replayer)
+        fix = location.locate('5551112222')
+        self.assertEqual(tuple(fix.coordinates), (38.9, -94.65))
+        self.assertEqual(replayer.replayed, 1)
+
+    def test_turns(self):
+        replayer = self.get_Replayer([
+            ('presence.json', {'mdn': '5551112222'}, '1'),
+            ('presence.json', {'mdn': '5551112222'}, '2')], speed=0)
+        params = {'mdn': '5551112222', 'key': 'k', 'sig': 's',
+                  'timestamp': 't'}
+        bodies = [replayer.fetch(None, 'presence.json', params).body_string()
+                  for i in range(3)]
+        self.assertEqual(bodies, ['1', '2', '1'])
+
+    def test_miss(self):
+        replayer = self.get_Replayer([
+            ('presence.json', {'mdn': '5551112222'}, '1')], speed=0)
+        self.assertRaises(errors.ConnectionError, replayer.fetch, None,
+                          'presence.json', {'mdn': '5551113333'})
+
+    def test_speed(self):
+        replayer = self.get_Replayer([
+            ('presence.json', {}, '1', 0.1)], speed=2)
+        start = time.time()
+        replayer.fetch(None, 'presence.json', {}).body_string()
+        self.assertTrue(0.05 <= time.time() - start < 0.1)
+
+    def test_concurrency(self):
+        replayer = self.get_Replayer([
+            ('presence.json', {}, '1')], speed=0, concurrency=1)
+        first = replayer.fetch(None, 'presence.json', {})
+        fetched = []
+        thread = threading.Thread(target=lambda: fetched.append(
+            replayer.fetch(None, 'presence.json', {})))
+        thread.start()
+        thread.join(0.05)
+        self.assertEqual(fetched, [])
+        stream = first.body_stream()
+        self.assertEqual(stream.read(), '1')
+        stream.close()
+        thread.join(1)
+        self.assertEqual(len(fetched), 1)
+        fetched[0].body_string()
+        replayer.fetch(None, 'presence.json', {}).body_string()
+
+    def test_record(self):
+        path = self.path('recorded.rec.gz')
+        with Recorder(path) as recorder:
+            response = recorder.fetch(Sandbox(), 'presence.json',
+                                      {'mdn': '5551112222', 'sig': 's'})
+        self.assertEqual(recorder.recorded, 1)
+        replayer = Replayer(path, speed=0)
+        replayed = replayer.fetch(None, 'presence.json',
+                                  {'mdn': '5551112222', 'sig': 't'})
+        self.assertEqual(replayed.body_string(), response.body_string())
+
+
+def transport_suite():
+    return TestLoader().loadTestsFromTestCase(ReplayerTests)
+
+
+if __name__ == "__main__":
+    main(defaultTest="transport_suite")